@@ -0,0 +1,76 @@
+import argparse
+import csv
+import os
+import sys
+import tempfile
+import time
+
+from database_manager.db_manager import DBManager
+from database_manager.card_importer import import_cards_file
+
+try:
+    import resource
+except ImportError:
+    resource = None
+
+
+# ----| Imports a generated spreadsheet into a fresh database and reports time and memory. |---- #
+# ----| Run from the project folder with: python -m benchmarks.bench_import --rows 500000 |---- #
+
+def peak_rss_mb():
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ----| linux reports kilobytes, macOS bytes |---- #
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+def write_spreadsheet(file_path, rows, text_size):
+    padding = "x" * max(text_size - 20, 0)
+    with open(file_path, "w", newline="", encoding="utf-8") as handle:
+        writer = csv.writer(handle)
+        writer.writerow(["Front", "Back"])
+        for number in range(rows):
+            writer.writerow([f"Question {number} {padding}", f"Answer {number}\n{padding}"])
+
+
+def run(rows, text_size, batch_size):
+    with tempfile.TemporaryDirectory() as temp_dir:
+        file_path = os.path.join(temp_dir, "deck.csv")
+        write_spreadsheet(file_path, rows, text_size)
+
+        database_manager = DBManager(os.path.join(temp_dir, "flashcard_app.db"))
+        database_manager.add_deck("Benchmark")
+        deck_id = database_manager.get_deck_id_by_name("Benchmark")
+
+        rss_samples = []
+        start_rss = peak_rss_mb()
+        start = time.perf_counter()
+        imported = import_cards_file(
+            database_manager, deck_id, file_path,
+            lambda percent, imported_rows: rss_samples.append(peak_rss_mb()),
+            batch_size=batch_size
+        )
+        elapsed = time.perf_counter() - start
+        database_manager.close()
+
+        return {
+            "rows": imported,
+            "file_mb": round(os.path.getsize(file_path) / (1024 * 1024), 1),
+            "seconds": round(elapsed, 2),
+            "rows_per_second": round(imported / elapsed),
+            "peak_rss_start_mb": start_rss and round(start_rss, 1),
+            "peak_rss_after_first_batch_mb": rss_samples and rss_samples[0] and round(rss_samples[0], 1),
+            "peak_rss_end_mb": rss_samples and rss_samples[-1] and round(rss_samples[-1], 1),
+        }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the streaming csv importer.")
+    parser.add_argument("--rows", type=int, default=500_000)
+    parser.add_argument("--text-size", type=int, default=60, help="approximate characters per cell")
+    parser.add_argument("--batch-size", type=int, default=2000)
+    args = parser.parse_args()
+
+    for key, value in run(args.rows, args.text_size, args.batch_size).items():
+        print(f"{key}: {value}")
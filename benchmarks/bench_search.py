@@ -0,0 +1,83 @@
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+from database_manager.db_manager import DBManager
+from benchmarks.collection import make_vocabulary
+
+
+# ----| Times DBManager.search_cards on a generated collection, the budget is 50 ms per query on a million cards. |---- #
+# ----| Run from the project folder with: python -m benchmarks.bench_search --cards 1000000 |---- #
+# ----| the database is built on the first run and reused after that, building a million cards takes a few minutes |---- #
+
+BUDGET_MS = 50
+
+
+def build_collection(database_manager, cards, decks, words, cumulative_weights, seed):
+    generator = random.Random(seed)
+    for number in range(decks):
+        database_manager.add_deck(f"Deck {number}")
+        deck_id = database_manager.get_deck_id_by_name(f"Deck {number}")
+        rows = (
+            (
+                "<p>" + " ".join(generator.choices(words, cum_weights=cumulative_weights, k=generator.randint(2, 8))) + "</p>",
+                "<p>" + " ".join(generator.choices(words, cum_weights=cumulative_weights, k=generator.randint(5, 20))) + "</p>",
+                None,
+                None,
+            )
+            for _ in range(cards // decks)
+        )
+        database_manager.add_cards(deck_id, rows, batch_size=5000)
+
+
+def run(db_path, cards, decks, repeat):
+    words, cumulative_weights = make_vocabulary(30_000, seed=1)
+    database_manager = DBManager(db_path)
+    if not database_manager.get_all_decks():
+        start = time.perf_counter()
+        build_collection(database_manager, cards, decks, words, cumulative_weights, seed=2)
+        print(f"built {cards} cards in {time.perf_counter() - start:.1f}s")
+
+    deck_id = database_manager.get_all_decks()[0][0]
+    queries = [
+        words[0],                      # on most cards
+        words[0][:2],                  # short prefix while typing
+        words[1] + " " + words[7],     # two common words
+        words[100],                    # fairly common
+        words[5000],                   # rare
+        words[3][:4] + "zz",           # no match
+        words[5] + " " + words[9][:3],
+    ]
+
+    results = []
+    for query in queries:
+        for scope in (None, deck_id):
+            timings = []
+            for page in range(repeat):
+                start = time.perf_counter()
+                hits = database_manager.search_cards(query, scope, 50, 50 * (page % 2))
+                timings.append((time.perf_counter() - start) * 1000)
+            results.append((query, "all decks" if scope is None else "one deck", len(hits), max(timings),
+                            statistics.median(timings)))
+    database_manager.close()
+    return results
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the full text card search.")
+    parser.add_argument("--cards", type=int, default=1_000_000)
+    parser.add_argument("--decks", type=int, default=20)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--db", default=os.path.join(tempfile.gettempdir(), "flashcard_search_benchmark.db"))
+    args = parser.parse_args()
+
+    over_budget = 0
+    for query, scope, hit_count, worst_ms, median_ms in run(args.db, args.cards, args.decks, args.repeat):
+        flag = "  OVER BUDGET" if worst_ms > BUDGET_MS else ""
+        over_budget += bool(flag)
+        print(f"{query!r:22} {scope:9} hits={hit_count:3} median={median_ms:6.1f}ms worst={worst_ms:6.1f}ms{flag}")
+    sys.exit(1 if over_budget else 0)
@@ -0,0 +1,88 @@
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+import time
+
+from benchmarks.collection import ensure_collection, parse_size
+
+
+# ----| Times a cold start of the app: importing main.py, building MainWindow, the first frame on screen and the |---- #
+# ----| deferred startup work (MainWindow.finish_startup), each run in a fresh interpreter. |---- #
+# ----| Run from the project folder with: python -m benchmarks.bench_startup --size 100k |---- #
+# ----| the window is drawn offscreen unless --platform is given, e.g. --platform windows or --platform xcb |---- #
+
+# ----| runs in the child interpreter, prints one json line with the timings in ms since the interpreter started |---- #
+CHILD = r"""
+import json, sys, time
+started = time.perf_counter()
+import main
+imported = time.perf_counter()
+from PySide6.QtWidgets import QApplication
+from PySide6.QtCore import QObject, QEvent, QTimer
+
+timings = {}
+
+class FirstFrame(QObject):
+    def eventFilter(self, watched, event):
+        if event.type() == QEvent.Paint and "first_frame" not in timings:
+            timings["first_frame"] = time.perf_counter()
+            QTimer.singleShot(0, done)
+        return False
+
+def done():
+    if "first_frame" in timings and "startup_done" in timings:
+        app.quit()
+
+finish_startup = main.MainWindow.finish_startup
+def timed_finish_startup(self):
+    finish_startup(self)
+    timings["startup_done"] = time.perf_counter()
+    done()
+main.MainWindow.finish_startup = timed_finish_startup
+
+app = QApplication([])
+app.setStyle("Fusion")
+first_frame = FirstFrame()
+app.installEventFilter(first_frame)
+window = main.MainWindow(sys.argv[1])
+constructed = time.perf_counter()
+window.show()
+app.exec()
+window.grade_writer.close()
+
+result = {"import_ms": imported - started, "window_ms": constructed - started,
+          "first_frame_ms": timings["first_frame"] - started, "startup_done_ms": timings["startup_done"] - started}
+print(json.dumps({name: round(value * 1000, 1) for name, value in result.items()}))
+"""
+
+
+def run(db_path, repeat, platform):
+    project_folder = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    env = dict(os.environ, QT_QPA_PLATFORM=platform) if platform else os.environ
+    runs = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        output = subprocess.run([sys.executable, "-c", CHILD, db_path], cwd=project_folder, env=env,
+                                capture_output=True, text=True, check=True).stdout
+        timings = json.loads(output.strip().splitlines()[-1])
+        timings["process_ms"] = round((time.perf_counter() - start) * 1000, 1)
+        runs.append(timings)
+    return runs
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the app's cold start.")
+    parser.add_argument("--size", default="100k", help="10k, 100k, 1m or a card count")
+    parser.add_argument("--decks", type=int, default=50)
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--platform", default="offscreen")
+    args = parser.parse_args()
+
+    db_path, parameters = ensure_collection(parse_size(args.size), args.decks)
+    runs = run(db_path, args.repeat, args.platform)
+    for name in ("import_ms", "window_ms", "first_frame_ms", "startup_done_ms", "process_ms"):
+        values = [timings[name] for timings in runs]
+        print(f"{name:16} median={statistics.median(values):7.1f}ms worst={max(values):7.1f}ms")
@@ -0,0 +1,348 @@
+import argparse
+import itertools
+import json
+import os
+import platform
+import shutil
+import sqlite3
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from datetime import datetime
+
+from database_manager.db_manager import DBManager
+from database_manager.db_manager import review_row
+from database_manager.statistics import load_statistics, day_number, day_start, FORECAST_DAYS
+from database_manager import sm2
+from benchmarks.collection import ensure_collection, make_vocabulary, parse_size
+
+
+# ----| Times every DBManager method, and the main Qt operations drawn offscreen, on generated collections and |---- #
+# ----| writes the results to a json file that a later run can be compared with. |---- #
+# ----| Run from the project folder with: python -m benchmarks.bench_suite --sizes 10k 100k --output before.json |---- #
+# ----| then after a change: python -m benchmarks.bench_suite --sizes 10k 100k --compare before.json |---- #
+# ----| or compare two saved runs: python -m benchmarks.bench_suite --compare before.json after.json |---- #
+
+# ----| a case is slower when its median grew by more than this share and by more than MIN_DIFFERENCE_MS |---- #
+REGRESSION_THRESHOLD = 0.2
+MIN_DIFFERENCE_MS = 1.0
+
+
+# ----| a case with a setup gets what setup returns, the setup itself isn't timed |---- #
+def time_case(function, repeat, setup=None):
+    timings = []
+    for _ in range(repeat):
+        argument = setup() if setup else None
+        start = time.perf_counter()
+        function(argument) if setup else function()
+        timings.append((time.perf_counter() - start) * 1000)
+    # ----| the first call also pays for cold caches, it is kept apart from the median of the rest |---- #
+    warm = timings[1:] or timings
+    return {
+        "first_ms": round(timings[0], 3),
+        "median_ms": round(statistics.median(warm), 3),
+        "min_ms": round(min(warm), 3),
+        "max_ms": round(max(warm), 3),
+        "runs": len(timings),
+    }
+
+
+# ----| ids and words the cases work on, taken from the largest deck of the collection |---- #
+def collection_context(database_manager, seed):
+    decks = database_manager.get_all_decks()
+    deck_id, deck_name = max(decks, key=lambda deck: deck[3])[:2]
+    cursor = database_manager.connection.cursor()
+    cursor.execute("SELECT id FROM cards WHERE deck_id = ? ORDER BY id", (deck_id,))
+    card_ids = [row[0] for row in cursor.fetchall()]
+    # ----| the card of the deck with the most answers logged, for the review history of one card |---- #
+    cursor.execute("SELECT card_id FROM revlog WHERE deck_id = ? GROUP BY card_id ORDER BY COUNT(*) DESC LIMIT 1",
+                   (deck_id,))
+    reviewed_id = (cursor.fetchone() or card_ids[:1])[0]
+    cursor.execute("SELECT filename FROM images LIMIT 500")
+    image_filenames = [row[0] for row in cursor.fetchall()]
+    words = make_vocabulary(30_000, seed)[0]
+    return {"deck_id": deck_id, "deck_name": deck_name, "card_ids": card_ids, "image_filenames": image_filenames,
+            "words": words, "reviewed_id": reviewed_id}
+
+
+def read_cases(database_manager, context):
+    deck_id = context["deck_id"]
+    words = context["words"]
+    middle_id = context["card_ids"][len(context["card_ids"]) // 2]
+    reviewed_id = context["reviewed_id"]
+    now = int(time.time())
+    today = day_number()
+    forecast_end = day_start(today + FORECAST_DAYS)
+
+    return [
+        ("database_init", database_manager.database_init),
+        ("get_all_decks", database_manager.get_all_decks),
+        ("check_existing", lambda: database_manager.check_existing(context["deck_name"])),
+        ("get_deck_id_by_name", lambda: database_manager.get_deck_id_by_name(context["deck_name"])),
+        ("refresh_deck_stats", database_manager.refresh_deck_stats),
+        ("update_deck_stats", lambda: database_manager.update_deck_stats(deck_id)),
+        ("check_deck_counters", lambda: database_manager.check_deck_counters(repair=False)),
+        ("get_next_due_time", database_manager.get_next_due_time),
+        ("get_deck_card_count", lambda: database_manager.get_deck_card_count(deck_id)),
+        ("get_deck_cards_page first", lambda: database_manager.get_deck_cards_page(deck_id)),
+        ("get_deck_cards_page middle", lambda: database_manager.get_deck_cards_page(deck_id, middle_id)),
+        ("get_deck_cards", lambda: database_manager.get_deck_cards(deck_id)),
+        ("iter_deck_cards", lambda: sum(1 for _ in database_manager.iter_deck_cards(deck_id))),
+        ("get_card", lambda: database_manager.get_card(middle_id)),
+        ("get_card_texts", lambda: database_manager.get_card_texts(middle_id)),
+        ("get_sm2_intervals", lambda: database_manager.get_sm2_intervals(middle_id)),
+        ("get_new_cards", lambda: database_manager.get_new_cards(deck_id)),
+        ("get_due_cards", lambda: database_manager.get_due_cards(deck_id)),
+        ("count_missing_card_texts", database_manager.count_missing_card_texts),
+        ("backfill_card_texts", database_manager.backfill_card_texts),
+        ("search_cards common word", lambda: database_manager.search_cards(words[0])),
+        ("search_cards rare word", lambda: database_manager.search_cards(words[5000])),
+        ("search_cards prefix", lambda: database_manager.search_cards(words[1][:2])),
+        ("search_cards one deck", lambda: database_manager.search_cards(f"{words[1]} {words[7]}", deck_id)),
+        ("search_candidates", lambda: database_manager.search_candidates(f'"{words[2]}"')),
+        ("get_referenced_images", lambda: database_manager.get_referenced_images(context["image_filenames"])),
+        ("check_legacy_timestamps", database_manager.check_legacy_timestamps),
+        ("count_unconverted_timestamps", database_manager.count_unconverted_timestamps),
+        ("get_card_reviews", lambda: database_manager.get_card_reviews(reviewed_id)),
+        ("get_reviews_between last week", lambda: database_manager.get_reviews_between(now - 7 * 86400, now)),
+        ("get_daily_stats year", lambda: database_manager.get_daily_stats(today - 364)),
+        ("get_daily_stats year one deck", lambda: database_manager.get_daily_stats(today - 364, deck_id)),
+        ("get_due_times", lambda: database_manager.get_due_times(forecast_end)),
+        ("get_due_times one deck", lambda: database_manager.get_due_times(forecast_end, deck_id)),
+        ("load_statistics", lambda: load_statistics(database_manager, None, 365)),
+        ("load_statistics one deck", lambda: load_statistics(database_manager, deck_id, 365)),
+    ]
+
+
+def write_cases(database_manager, context):
+    deck_id = context["deck_id"]
+    words = context["words"]
+    sample_ids = itertools.cycle(context["card_ids"])
+
+    def add_and_delete_deck():
+        database_manager.add_deck("Benchmark scratch deck")
+        database_manager.del_deck(database_manager.get_deck_id_by_name("Benchmark scratch deck"))
+
+    def update_card():
+        card_id = next(sample_ids)
+        database_manager.update_card(card_id, f"<p>{words[3]} edited</p>", f"<p>{words[9]}</p>")
+
+    # ----| the newest cards of the deck, the ones the add_cards case put there |---- #
+    def newest_card_ids():
+        cursor = database_manager.connection.cursor()
+        cursor.execute("SELECT id FROM cards WHERE deck_id = ? ORDER BY id DESC LIMIT 100", (deck_id,))
+        return [row[0] for row in cursor.fetchall()]
+
+    # ----| 100 new cards of the deck graded like the study window does it, with their revlog rows |---- #
+    def graded_new_cards():
+        states, reviews = [], []
+        for card in database_manager.get_new_cards(deck_id)[:100]:
+            state = sm2.next_state(card, 3)
+            states.append((card["id"], state))
+            reviews.append(review_row(card["id"], deck_id, card, state, 3, 4000))
+        return states, reviews
+
+    # ----| 1000 cards of the deck put back to the text timestamps an older version stored |---- #
+    def legacy_timestamp_cards():
+        database_manager.connection.execute(
+            """
+            UPDATE cards
+            SET created = strftime('%Y-%m-%dT%H:%M:%f', created_at, 'unixepoch', 'localtime'),
+                next_review = strftime('%Y-%m-%dT%H:%M:%S', next_review_at, 'unixepoch', 'localtime'),
+                created_at = NULL, next_review_at = NULL
+            WHERE id IN (SELECT id FROM cards WHERE deck_id = ? ORDER BY id LIMIT 1000)
+            """,
+            (deck_id,)
+        )
+        database_manager.connection.commit()
+
+    return [
+        ("add_deck + del_deck empty", add_and_delete_deck),
+        ("rename_deck", lambda: database_manager.rename_deck(context["deck_name"], deck_id)),
+        ("add_card", lambda: database_manager.add_card(deck_id, f"<p>{words[4]}</p>", f"<p>{words[5]}</p>")),
+        ("add_cards 1000", lambda: database_manager.add_cards(
+            deck_id, ((f"<p>{words[n]}</p>", f"<p>{words[n + 1]}</p>", None, None) for n in range(1000))
+        )),
+        ("update_card", update_card),
+        ("update_card_sm2", lambda: database_manager.update_card_sm2(next(sample_ids), 4, deck_id)),
+        ("update_cards_sm2 100", lambda: database_manager.update_cards_sm2([(next(sample_ids), 4) for _ in range(100)])),
+        ("delete_cards 100", lambda ids: database_manager.delete_cards(deck_id, ids), newest_card_ids),
+        ("save_card_states 100", lambda graded: database_manager.save_card_states(*graded), graded_new_cards),
+        ("convert_card_timestamps 1000", lambda _: database_manager.convert_card_timestamps(), legacy_timestamp_cards),
+        ("release_unreferenced_images", database_manager.release_unreferenced_images),
+    ]
+
+
+# ----| the windows are built for real and drawn offscreen, each timing includes the events the call posts |---- #
+def qt_cases(database_manager, context, db_path):
+    os.environ.setdefault("QT_QPA_PLATFORM", "offscreen")
+    from PySide6.QtWidgets import QApplication
+    app = QApplication.instance() or QApplication([])
+    import main
+    from windows.edit_deck_window import EditDeckWindow
+    from windows.study_window import StudyWindow
+
+    deck_id = context["deck_id"]
+    deck_name = context["deck_name"]
+    windows = {}
+
+    def settled(function):
+        def run():
+            function()
+            app.processEvents()
+        return run
+
+    def build_main_window():
+        if "main" in windows:
+            windows["main"].grade_writer.close()
+            windows["main"].close()
+        windows["main"] = main.MainWindow(db_path)
+        windows["main"].show()
+
+    def open_edit_deck_window():
+        windows["edit"] = EditDeckWindow(deck_name, deck_id, database_manager)
+        windows["edit"].show()
+
+    def open_study_window():
+        windows["study"] = StudyWindow(deck_name, deck_id, database_manager, "review",
+                                       database_manager.get_due_cards(deck_id))
+        windows["study"].show()
+
+    def answer_card():
+        windows["study"].flip_card()
+        windows["study"].next_card(4)
+
+    cases = [
+        ("MainWindow build", settled(build_main_window)),
+        ("MainWindow.refresh_deck_list", settled(lambda: windows["main"].refresh_deck_list())),
+        ("MainWindow.refresh_all_deck_stats", settled(lambda: windows["main"].refresh_all_deck_stats())),
+        ("EditDeckWindow open", settled(open_edit_deck_window)),
+        ("EditDeckWindow.refresh_card_list", settled(lambda: windows["edit"].refresh_card_list())),
+        ("EditDeckWindow next page", settled(lambda: windows["edit"].card_model.fetchMore())),
+        ("StudyWindow open", settled(open_study_window)),
+        ("StudyWindow.flip_card", settled(lambda: windows["study"].flip_card())),
+        ("StudyWindow flip + next_card", settled(answer_card)),
+    ]
+
+    def close_windows():
+        for name, window in windows.items():
+            if name == "main":
+                window.grade_writer.close()
+            window.close()
+        app.processEvents()
+
+    return cases, close_windows
+
+
+def run_size(cards, decks, repeat, with_qt, seed):
+    db_path, parameters = ensure_collection(
+        cards, decks, seed=seed, images=max(10, cards // 1000),
+        progress_callback=lambda made: made == cards and print(f"  generated a collection of {cards} cards")
+    )
+
+    # ----| the cases write, so they run on a copy and the generated collection stays as it was |---- #
+    with tempfile.TemporaryDirectory() as temp_dir:
+        work_path = os.path.join(temp_dir, "flashcard_app.db")
+        shutil.copyfile(db_path, work_path)
+        shutil.copytree(os.path.join(os.path.dirname(db_path), "images"), os.path.join(temp_dir, "images"))
+
+        database_manager = DBManager(work_path)
+        context = collection_context(database_manager, seed)
+        results = {}
+
+        def run_cases(cases):
+            for name, function, *setup in cases:
+                results[name] = time_case(function, repeat, *setup)
+                print(f"  {name:36} median={results[name]['median_ms']:9.2f}ms")
+
+        # ----| the windows go before the writes, which grade the deck's due cards |---- #
+        run_cases(read_cases(database_manager, context))
+        if with_qt:
+            cases, close_windows = qt_cases(database_manager, context, work_path)
+            run_cases(cases)
+            close_windows()
+        run_cases(write_cases(database_manager, context))
+
+        # ----| deleting a whole deck can't be repeated, it is timed once at the end |---- #
+        results["del_deck full deck"] = time_case(lambda: database_manager.del_deck(context["deck_id"]), 1)
+        database_manager.close()
+    return parameters, results
+
+
+def git_commit():
+    try:
+        return subprocess.run(["git", "rev-parse", "--short", "HEAD"], capture_output=True, text=True,
+                              check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+# ----| prints the cases whose median changed between two result files, returns the number of slower cases |---- #
+def compare(baseline, current, threshold=REGRESSION_THRESHOLD):
+    slower = 0
+    for size, cases in current["results"].items():
+        baseline_cases = baseline["results"].get(size, {})
+        print(f"\n{size} cards: {baseline['meta'].get('commit')} -> {current['meta'].get('commit')}")
+        for name, timing in cases.items():
+            if name not in baseline_cases:
+                continue
+            before = baseline_cases[name]["median_ms"]
+            after = timing["median_ms"]
+            change = (after - before) / before if before else 0
+            flag = ""
+            if abs(after - before) > MIN_DIFFERENCE_MS and abs(change) > threshold:
+                flag = "  SLOWER" if change > 0 else "  faster"
+                slower += change > 0
+            print(f"  {name:36} {before:9.2f}ms -> {after:9.2f}ms {change:+7.0%}{flag}")
+    return slower
+
+
+def load_results(path):
+    with open(path, encoding="utf-8") as handle:
+        return json.load(handle)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark DBManager and the main windows on generated collections.")
+    parser.add_argument("--sizes", nargs="+", default=["10k", "100k"], help="10k, 100k, 1m or card counts")
+    parser.add_argument("--decks", type=int, default=20)
+    parser.add_argument("--repeat", type=int, default=6)
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--no-qt", action="store_true", help="only time DBManager")
+    parser.add_argument("--output", help="json file the results are written to")
+    parser.add_argument("--compare", nargs="+", metavar="RESULTS",
+                        help="a baseline to compare this run with, or two saved result files to compare")
+    parser.add_argument("--threshold", type=float, default=REGRESSION_THRESHOLD)
+    args = parser.parse_args()
+
+    if args.compare and len(args.compare) == 2:
+        sys.exit(1 if compare(load_results(args.compare[0]), load_results(args.compare[1]), args.threshold) else 0)
+
+    report = {
+        "meta": {
+            "commit": git_commit(),
+            "date": datetime.now().isoformat(timespec="seconds"),
+            "python": platform.python_version(),
+            "sqlite": sqlite3.sqlite_version,
+            "platform": platform.platform(),
+            "repeat": args.repeat,
+        },
+        "collections": {},
+        "results": {},
+    }
+    for size in args.sizes:
+        cards = parse_size(size)
+        print(f"{cards} cards")
+        parameters, results = run_size(cards, args.decks, args.repeat, not args.no_qt, args.seed)
+        report["collections"][str(cards)] = parameters
+        report["results"][str(cards)] = results
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as handle:
+            json.dump(report, handle, indent=2)
+        print(f"results written to {args.output}")
+
+    if args.compare:
+        sys.exit(1 if compare(load_results(args.compare[0]), report, args.threshold) else 0)
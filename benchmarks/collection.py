@@ -0,0 +1,187 @@
+import io
+import itertools
+import json
+import os
+import random
+import struct
+import tempfile
+import zlib
+from datetime import datetime, timedelta
+
+from database_manager.db_manager import DBManager
+from database_manager.image_store import store_image_stream
+from database_manager.migrations import SCHEMA_VERSION
+
+
+# ----| Synthetic flashcard_app.db collections for the benchmarks, the same parameters and seed always give the |---- #
+# ----| same collection. ensure_collection keeps each one under the temp folder and builds it only once. |---- #
+
+# ----| share of cards in each review state: never studied, due now and scheduled for later |---- #
+DEFAULT_REVIEW_MIX = {"new": 0.4, "due": 0.1, "review": 0.5}
+STATE_BATCH_SIZE = 10_000
+# ----| collection size presets, --size takes one of these or a plain card count |---- #
+SIZES = {"10k": 10_000, "100k": 100_000, "1m": 1_000_000}
+
+
+# ----| a zipf like vocabulary, so the first words are on most cards like "the" in real text |---- #
+def make_vocabulary(size, seed):
+    generator = random.Random(seed)
+    words = [
+        "".join(generator.choice("abcdefghijklmnopqrstuvwxyz") for _ in range(generator.randint(3, 9)))
+        for _ in range(size)
+    ]
+    cumulative_weights = list(itertools.accumulate(1 / (rank + 1) for rank in range(size)))
+    return words, cumulative_weights
+
+
+def parse_size(size):
+    return SIZES.get(str(size).lower()) or int(size)
+
+
+# ----| a small solid colour png, different for every number, so each image is its own stored file |---- #
+def make_png(number, side=32):
+    def chunk(kind, data):
+        return struct.pack(">I", len(data)) + kind + data + struct.pack(">I", zlib.crc32(kind + data))
+
+    pixel = struct.pack(">BBB", number % 256, (number // 256) % 256, (number // 65536) % 256)
+    raw = b"".join(b"\x00" + pixel * side for _ in range(side))
+    header = struct.pack(">IIBBBBB", side, side, 8, 2, 0, 0, 0)
+    return b"\x89PNG\r\n\x1a\n" + chunk(b"IHDR", header) + chunk(b"IDAT", zlib.compress(raw)) + chunk(b"IEND", b"")
+
+
+def store_images(database_manager, count):
+    return [
+        store_image_stream(database_manager.image_folder_path, io.BytesIO(make_png(number)), f"{number}.png")
+        for number in range(count)
+    ]
+
+
+# ----| front and back html of about html_size characters, a word or two in bold like cards typed in the editor |---- #
+def card_html(generator, words, cumulative_weights, html_size, image_filename):
+    def side(size):
+        count = max(1, size // 7)
+        chosen = generator.choices(words, cum_weights=cumulative_weights, k=count)
+        chosen[0] = f"<b>{chosen[0]}</b>"
+        return "<p>" + " ".join(chosen) + "</p>"
+
+    front = side(html_size // 3)
+    if image_filename:
+        front += f'<p><img src="{image_filename}" /></p>'
+    return front, side(html_size)
+
+
+# ----| (status, repetition, interval, ease_factor, next_review) for one card, drawn from review_mix |---- #
+def review_state(generator, review_mix, now):
+    state = generator.choices(list(review_mix), weights=list(review_mix.values()))[0]
+    if state == "new":
+        return "new", 0, 0, 2.5, None
+    repetition = generator.randint(1, 12)
+    interval = 1 if repetition == 1 else generator.randint(2, 400)
+    ease_factor = round(generator.uniform(1.3, 3.0), 2)
+    if state == "due":
+        next_review = now - timedelta(minutes=generator.randint(1, 60 * 24 * 30))
+    else:
+        next_review = now + timedelta(minutes=generator.randint(1, 60 * 24 * 365))
+    return "review", repetition, interval, ease_factor, int(next_review.timestamp())
+
+
+# ----| the revlog rows of a card in review_state, one per repetition spread over the last history_days days, |---- #
+# ----| an answer graded 1 now and then like a lapse |---- #
+def review_history(generator, card_id, deck_id, state, now, history_days):
+    status, repetition, interval, ease_factor, next_review = state
+    if status == "new" or not history_days:
+        return []
+    start = int((now - timedelta(days=history_days)).timestamp())
+    times = sorted(generator.randint(start, int(now.timestamp())) for _ in range(repetition))
+    rows = []
+    previous_interval = 0
+    for number, reviewed_at in enumerate(times, start=1):
+        grade = 1 if previous_interval and generator.random() < 0.1 else generator.randint(3, 5)
+        card_interval = interval if number == repetition else max(1, interval * number // repetition)
+        rows.append((card_id, deck_id, reviewed_at, grade, previous_interval, card_interval, ease_factor,
+                     generator.randint(1500, 15000)))
+        previous_interval = card_interval
+    return rows
+
+
+def generate_collection(db_path, cards, decks=20, html_size=120, images=0, image_share=0.05,
+                        review_mix=None, seed=1, progress_callback=None, history_days=365):
+    review_mix = review_mix or DEFAULT_REVIEW_MIX
+    generator = random.Random(seed)
+    words, cumulative_weights = make_vocabulary(30_000, seed)
+    database_manager = DBManager(db_path)
+    image_filenames = store_images(database_manager, images)
+    now = datetime.now()
+
+    made = 0
+    for number in range(decks):
+        deck_name = f"Deck {number:04d}"
+        database_manager.add_deck(deck_name)
+        deck_id = database_manager.get_deck_id_by_name(deck_name)
+        deck_cards = cards // decks + (1 if number < cards % decks else 0)
+
+        def rows():
+            for _ in range(deck_cards):
+                image = None
+                if image_filenames and generator.random() < image_share:
+                    image = generator.choice(image_filenames)
+                front, back = card_html(generator, words, cumulative_weights, html_size, image)
+                yield front, back, image, None
+
+        database_manager.add_cards(deck_id, rows(), batch_size=5000)
+        made += deck_cards
+        if progress_callback:
+            progress_callback(made)
+
+    # ----| review states go in through UPDATE, so the deck counter triggers see them like real answers |---- #
+    # ----| the review history has a generator of its own, so the cards come out the same with or without it |---- #
+    history_generator = random.Random(seed + 1)
+    cursor = database_manager.connection.cursor()
+    cursor.execute("SELECT id, deck_id FROM cards ORDER BY id")
+    cards_and_decks = cursor.fetchall()
+    for start in range(0, len(cards_and_decks), STATE_BATCH_SIZE):
+        states = [(card_id, deck_id, review_state(generator, review_mix, now))
+                  for card_id, deck_id in cards_and_decks[start:start + STATE_BATCH_SIZE]]
+        cursor.executemany(
+            "UPDATE cards SET status = ?, repetition = ?, interval = ?, ease_factor = ?, next_review_at = ? WHERE id = ?",
+            [(*state, card_id) for card_id, deck_id, state in states]
+        )
+        # ----| the daily_stats trigger rolls the history up as it goes in |---- #
+        cursor.executemany(
+            """
+            INSERT INTO revlog (card_id, deck_id, reviewed_at, grade, previous_interval, interval, ease_factor, answer_ms)
+            VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+            """,
+            [row for card_id, deck_id, state in states
+             for row in review_history(history_generator, card_id, deck_id, state, now, history_days)]
+        )
+        database_manager.connection.commit()
+    database_manager.refresh_deck_stats()
+    database_manager.connection.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+    database_manager.close()
+
+
+# ----| path of a generated collection with these parameters, built the first time it is asked for, the |---- #
+# ----| parameters are written next to it once it is complete, so an interrupted build is started over, a new |---- #
+# ----| schema version builds a new collection |---- #
+def ensure_collection(cards, decks=20, html_size=120, images=0, image_share=0.05, review_mix=None, seed=1,
+                      history_days=365, cache_folder=None, progress_callback=None):
+    parameters = {"cards": cards, "decks": decks, "html_size": html_size, "images": images,
+                  "image_share": image_share, "review_mix": review_mix or DEFAULT_REVIEW_MIX, "seed": seed,
+                  "history_days": history_days, "schema_version": SCHEMA_VERSION}
+    key = zlib.crc32(json.dumps(parameters, sort_keys=True).encode())
+    folder = os.path.join(cache_folder or tempfile.gettempdir(), "flashcard_benchmarks", f"{cards}_{key:08x}")
+    db_path = os.path.join(folder, "flashcard_app.db")
+    parameters_path = os.path.join(folder, "collection.json")
+
+    if not os.path.exists(parameters_path):
+        if os.path.exists(folder):
+            for name in ("flashcard_app.db", "flashcard_app.db-wal", "flashcard_app.db-shm"):
+                if os.path.exists(os.path.join(folder, name)):
+                    os.remove(os.path.join(folder, name))
+        os.makedirs(folder, exist_ok=True)
+        generate_collection(db_path, cards, decks, html_size, images, image_share, review_mix, seed,
+                            progress_callback, history_days)
+        with open(parameters_path, "w", encoding="utf-8") as handle:
+            json.dump(parameters, handle, indent=2)
+    return db_path, parameters
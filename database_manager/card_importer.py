@@ -0,0 +1,66 @@
+import csv
+import html
+import os
+
+# ----| streaming spreadsheet importer, rows are read, converted and inserted one batch at a time |---- #
+# ----| so memory stays flat however large the file is |---- #
+
+IMPORT_BATCH_SIZE = 2000
+TAB_SEPARATED_EXTENSIONS = (".tsv", ".tab")
+HEADER_NAMES = ("front", "question")
+
+# ----| same default size the card editor types with |---- #
+CARD_PARAGRAPH = '<p style="font-size:20pt;">{}</p>'
+
+
+# ----| turns one spreadsheet cell into card html, newlines inside the cell become line breaks |---- #
+def text_to_card_html(text):
+    lines = text.strip().replace("\r\n", "\n").split("\n")
+    return CARD_PARAGRAPH.format("<br>".join(html.escape(line) for line in lines))
+
+
+def detect_delimiter(file_path, handle):
+    if file_path.lower().endswith(TAB_SEPARATED_EXTENSIONS):
+        return "\t"
+    sample = handle.read(64 * 1024)
+    handle.seek(0)
+    try:
+        return csv.Sniffer().sniff(sample, delimiters=",;\t").delimiter
+    except csv.Error:
+        return ","
+
+
+# ----| yields (front_html, back_html, None, None) per usable row, the shape DBManager.add_cards expects, |---- #
+# ----| rows missing a front or back are skipped the same way the card editor refuses them |---- #
+def read_card_rows(file_path, handle):
+    reader = csv.reader(handle, delimiter=detect_delimiter(file_path, handle))
+    for line_number, row in enumerate(reader):
+        if len(row) < 2:
+            continue
+        front, back = row[0].strip(), row[1].strip()
+        if line_number == 0 and front.lower() in HEADER_NAMES:
+            continue
+        if not front or not back:
+            continue
+        yield text_to_card_html(front), text_to_card_html(back), None, None
+
+
+# ----| imports a csv/tsv file into a deck, progress_callback gets (percent, imported_rows) after every batch, |---- #
+# ----| each batch is committed as it goes, a failed import keeps the rows before the bad batch |---- #
+def import_cards_file(database_manager, deck_id, file_path, progress_callback=None, batch_size=IMPORT_BATCH_SIZE):
+    total_bytes = max(os.path.getsize(file_path), 1)
+
+    with open(file_path, newline="", encoding="utf-8-sig") as handle:
+        def report_progress(imported_rows):
+            if progress_callback:
+                # ----| the text layer reads ahead, the raw byte position is close enough for a progress bar |---- #
+                percent = min(100, handle.buffer.tell() * 100 // total_bytes)
+                progress_callback(percent, imported_rows)
+
+        return database_manager.add_cards(
+            deck_id,
+            read_card_rows(file_path, handle),
+            batch_size=batch_size,
+            progress_callback=report_progress,
+            commit_every_batch=True
+        )
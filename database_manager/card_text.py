@@ -0,0 +1,84 @@
+import re
+import unicodedata
+from html.parser import HTMLParser
+
+# ----| plain text of a card side, stored next to the html when a card is written so the card list never has to |---- #
+# ----| parse html, pure python (no Qt) so it also runs on the import and backfill threads |---- #
+
+# ----| tags that end a line of text, their content is separated by a space in the preview |---- #
+BLOCK_TAGS = {"p", "div", "br", "li", "tr", "td", "th", "h1", "h2", "h3", "h4", "h5", "h6", "blockquote", "pre"}
+# ----| tags whose content is never shown as text |---- #
+SKIPPED_TAGS = {"head", "style", "script", "title"}
+WHITESPACE = re.compile(r"\s+")
+WORD = re.compile(r"\w+")
+# ----| search ranking: typical words per card side and the usual BM25 term frequency constants |---- #
+AVERAGE_SIDE_WORDS = 8
+TERM_SATURATION = 1.2
+LENGTH_WEIGHT = 0.75
+FRONT_WEIGHT = 2.0
+BACK_WEIGHT = 1.0
+
+
+class PlainTextParser(HTMLParser):
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.parts = []
+        self.skip_depth = 0
+
+    def handle_starttag(self, tag, attrs):
+        if tag in SKIPPED_TAGS:
+            self.skip_depth += 1
+        elif tag in BLOCK_TAGS:
+            self.parts.append(" ")
+
+    def handle_endtag(self, tag):
+        if tag in SKIPPED_TAGS:
+            self.skip_depth = max(0, self.skip_depth - 1)
+        elif tag in BLOCK_TAGS:
+            self.parts.append(" ")
+
+    def handle_data(self, data):
+        if not self.skip_depth:
+            self.parts.append(data)
+
+
+def html_to_plaintext(html_string):
+    if not html_string:
+        return ""
+    # ----| text without any markup or entities needs no parser |---- #
+    if "<" not in html_string and "&" not in html_string:
+        text = html_string
+    else:
+        parser = PlainTextParser()
+        parser.feed(html_string)
+        parser.close()
+        text = "".join(parser.parts)
+    # ----| \s also matches the non breaking spaces the editor writes for repeated spaces |---- #
+    return WHITESPACE.sub(" ", text).strip()
+
+
+# ----| lower case words without accents, the same way the FTS5 tokenizer (unicode61 remove_diacritics) sees them |---- #
+def search_words(text):
+    if not text:
+        return []
+    text = text.lower()
+    if not text.isascii():
+        decomposed = unicodedata.normalize("NFKD", text)
+        text = "".join(char for char in decomposed if not unicodedata.combining(char))
+    return WORD.findall(text)
+
+
+# ----| relevance of a card for the search words, BM25 style term frequency with length normalization, a hit on |---- #
+# ----| the front counts double, the last word is matched as a prefix like in the FTS query |---- #
+def match_score(front_text, back_text, words):
+    score = 0.0
+    for text, weight in ((front_text, FRONT_WEIGHT), (back_text, BACK_WEIGHT)):
+        text_words = search_words(text)
+        if not text_words:
+            continue
+        length_norm = 1 - LENGTH_WEIGHT + LENGTH_WEIGHT * len(text_words) / AVERAGE_SIDE_WORDS
+        for position, word in enumerate(words):
+            prefix = position == len(words) - 1 and len(word) > 1
+            hits = sum(1 for text_word in text_words if text_word == word or (prefix and text_word.startswith(word)))
+            score += weight * hits * (TERM_SATURATION + 1) / (hits + TERM_SATURATION * length_norm)
+    return score
@@ -0,0 +1,134 @@
+import os
+import sqlite3
+import threading
+from contextlib import contextmanager
+from urllib.request import pathname2url
+
+# ----| Connections for one database file, shared by every thread: one writer and up to read_connections |---- #
+# ----| read-only connections. WAL lets the readers run while the writer commits, each read sees the last |---- #
+# ----| commit made before it started. Every call gets its own cursor, so nothing is shared between calls. |---- #
+# ----| Writes go through transaction(), one thread at a time, reads through read(), which hands out an idle |---- #
+# ----| read connection or opens another one, so a read never waits for a write or for another read. |---- #
+
+READ_CONNECTIONS = 3
+# ----| seconds a connection waits for a lock held by another process (another copy of the app, a script) |---- #
+# ----| before it fails with "database is locked", the writes of this process already wait on write_lock |---- #
+BUSY_TIMEOUT = 15
+
+
+def configure(connection):
+    connection.execute("PRAGMA foreign_keys = ON")
+    # ----| NORMAL sync is safe against corruption in WAL mode and skips an fsync per commit |---- #
+    connection.execute("PRAGMA synchronous = NORMAL")
+
+
+class ConnectionPool:
+    def __init__(self, db_path, read_connections=READ_CONNECTIONS):
+        self.db_path = db_path
+        self.read_connections = read_connections
+        self.writer = sqlite3.connect(db_path, timeout=BUSY_TIMEOUT, check_same_thread=False)
+        self.writer.execute("PRAGMA journal_mode = WAL")
+        configure(self.writer)
+        # ----| re-entrant, a transaction opened inside another one on the same thread joins it |---- #
+        self.write_lock = threading.RLock()
+        self.write_depth = 0
+        self.write_thread = None
+        self.lock = threading.Lock()
+        self.idle_readers = []
+        self.readers = set()
+        self.trace_callback = None
+        self.closed = False
+
+    # ----| read-only through the uri, a stray write on a read connection fails instead of taking the lock, and |---- #
+    # ----| in autocommit mode, so sqlite3 never opens a transaction that would keep an old snapshot around |---- #
+    def open_reader(self):
+        uri = "file:{}?mode=ro".format(pathname2url(os.path.abspath(self.db_path)))
+        connection = sqlite3.connect(uri, uri=True, timeout=BUSY_TIMEOUT, check_same_thread=False,
+                                     isolation_level=None)
+        configure(connection)
+        connection.set_trace_callback(self.trace_callback)
+        with self.lock:
+            self.readers.add(connection)
+        return connection
+
+    def checkout_reader(self):
+        with self.lock:
+            if self.closed:
+                raise sqlite3.ProgrammingError("Cannot read from a closed database.")
+            if self.idle_readers:
+                return self.idle_readers.pop()
+        return self.open_reader()
+
+    # ----| at most read_connections are kept open once the reads that needed more have finished |---- #
+    def return_reader(self, connection):
+        if connection.in_transaction:
+            connection.rollback()
+        with self.lock:
+            if not self.closed and len(self.idle_readers) < self.read_connections:
+                self.idle_readers.append(connection)
+                return
+            self.readers.discard(connection)
+        connection.close()
+
+    @contextmanager
+    def read(self):
+        # ----| inside a transaction the reads go to the writer, so they see what the transaction wrote so far |---- #
+        if self.write_thread == threading.get_ident():
+            cursor = self.writer.cursor()
+            try:
+                yield cursor
+            finally:
+                cursor.close()
+            return
+
+        connection = self.checkout_reader()
+        cursor = connection.cursor()
+        try:
+            yield cursor
+        finally:
+            cursor.close()
+            self.return_reader(connection)
+
+    # ----| commits when the block ends and rolls back if it raised, only the outermost block of a thread does |---- #
+    @contextmanager
+    def transaction(self):
+        with self.write_lock:
+            if self.closed:
+                raise sqlite3.ProgrammingError("Cannot write to a closed database.")
+            self.write_depth += 1
+            self.write_thread = threading.get_ident()
+            cursor = self.writer.cursor()
+            try:
+                yield cursor
+                if self.write_depth == 1:
+                    self.writer.commit()
+            except BaseException:
+                if self.write_depth == 1:
+                    self.writer.rollback()
+                raise
+            finally:
+                cursor.close()
+                self.write_depth -= 1
+                if not self.write_depth:
+                    self.write_thread = None
+
+    # ----| for the query timing (instrumentation.py), covers the writer and every read connection |---- #
+    def set_trace_callback(self, callback):
+        with self.lock:
+            self.trace_callback = callback
+            readers = list(self.readers)
+        self.writer.set_trace_callback(callback)
+        for connection in readers:
+            connection.set_trace_callback(callback)
+
+    # ----| read connections still handed out are closed when they come back |---- #
+    def close(self):
+        with self.write_lock:
+            with self.lock:
+                self.closed = True
+                idle_readers, self.idle_readers = self.idle_readers, []
+                for connection in idle_readers:
+                    self.readers.discard(connection)
+            for connection in idle_readers:
+                connection.close()
+            self.writer.close()
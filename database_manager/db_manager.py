@@ -1,254 +1,648 @@
 import os
-import sqlite3
-from datetime import datetime, timedelta
+import time
+from contextlib import nullcontext
+from datetime import datetime
+from itertools import islice
+from database_manager.migrations import migrate
+from database_manager.connection_pool import ConnectionPool, READ_CONNECTIONS
+from database_manager import sm2
+from database_manager.card_text import html_to_plaintext, search_words, match_score
+from database_manager.image_store import remove_image_file, GC_GRACE_SECONDS
+from database_manager.instrumentation import instrumentation
 
 
+# ----| a search ranks this many matching cards at a time, the newest first, so the first pages cost the same |---- #
+# ----| for a word that is on most cards as for a rare one, a deeper page skips the matches before it with |---- #
+# ----| OFFSET and gets slower the further down it is |---- #
+SEARCH_CANDIDATES = 500
+
+
+# ----| epoch seconds of a text timestamp written by an older version, which stored datetime.now().isoformat(), |---- #
+# ----| so the text is local time |---- #
+def epoch_sql(column):
+    return f"CAST(strftime('%s', {column}, 'utc') AS INTEGER)"
+
+
+# ----| creation time of a card in epoch seconds, also for the cards convert_card_timestamps hasn't reached yet |---- #
+CREATED_AT = f"COALESCE(cards.created_at, {epoch_sql('cards.created')})"
+
+
+# ----| the revlog row of one answer for save_card_states, card is the card as it was before the answer and |---- #
+# ----| state what sm2.next_state made of it, answer_ms is how long the answer took, None when it wasn't timed |---- #
+def review_row(card_id, deck_id, card, state, grade, answer_ms=None, reviewed_at=None):
+    return (card_id, deck_id, reviewed_at or int(time.time()), grade, card["interval"], state["interval"],
+            state["ease_factor"], answer_ms)
+
+
+# ----| safe to share between threads, every call takes its own cursor from the connection pool, see |---- #
+# ----| connection_pool.py, and windows/db_reader.py runs the reads on the thread pool |---- #
 class DBManager:
-    def __init__(self):
-        base_dir = os.path.dirname(os.path.dirname(__file__))
-        data_dir = os.path.join(base_dir, "data")
+    def __init__(self, db_path=None, read_connections=READ_CONNECTIONS):
+        if db_path is None:
+            base_dir = os.path.dirname(os.path.dirname(__file__))
+            db_path = os.path.join(base_dir, "data", "flashcard_app.db")
+        data_dir = os.path.dirname(os.path.abspath(db_path))
         os.makedirs(data_dir, exist_ok=True)
         image_folder_dir = os.path.join(data_dir, "images")
         os.makedirs(image_folder_dir, exist_ok=True)
 
-        self.db_path = os.path.join(data_dir, "flashcard_app.db")
+        self.db_path = db_path
         self.image_folder_path = image_folder_dir
-        self.connection = sqlite3.connect(self.db_path)
-        self.connection.execute("PRAGMA foreign_keys = ON")
-        self.cursor = self.connection.cursor()
+        # ----| display size copies of the images, one folder per width, see windows/image_cache.py |---- #
+        self.thumbnail_folder_path = os.path.join(image_folder_dir, ".thumbs")
+        self.pool = ConnectionPool(self.db_path, read_connections)
+        # ----| the writer, used directly only by the migrations and the maintenance scripts |---- #
+        self.connection = self.pool.writer
         self.database_init()
+        # ----| while True the reads also look at the text timestamps, see migrations.add_epoch_timestamp_columns |---- #
+        self.legacy_timestamps = True
+        self.check_legacy_timestamps()
+        # ----| query timing, nothing is wrapped unless it is switched on (instrumentation.py) |---- #
+        instrumentation.register(self)
 
+    # ----| creates or upgrades the schema in place, see migrations.py |---- #
     def database_init(self):
-        self.cursor.execute("""
-            CREATE TABLE IF NOT EXISTS decks (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                name TEXT NOT NULL,
-                created TEXT DEFAULT CURRENT_TIMESTAMP,
-                total_cards INTEGER NOT NULL DEFAULT 0,
-                new_cards INTEGER NOT NULL DEFAULT 0,
-                due_cards INTEGER NOT NULL DEFAULT 0
-            )
-        """)
-
-        self.cursor.execute("""
-            CREATE TABLE IF NOT EXISTS cards (
-                id INTEGER PRIMARY KEY AUTOINCREMENT,
-                deck_id INTEGER NOT NULL,
-                front TEXT NOT NULL,
-                back TEXT NOT NULL,
-                front_image_filename TEXT,
-                back_image_filename  TEXT,
-                status TEXT NOT NULL DEFAULT 'new',
-                next_review TEXT,
-                repetition INTEGER DEFAULT 0,      
-                interval INTEGER DEFAULT 0,         
-                ease_factor REAL DEFAULT 2.5, 
-                created TEXT DEFAULT CURRENT_TIMESTAMP,
-                FOREIGN KEY(deck_id) REFERENCES decks(id) ON DELETE CASCADE
-            )
-        """)
+        with self.pool.write_lock:
+            migrate(self.connection)
+
+    # ----| closes the writer and the read connections, the DBManager can't be used afterwards |---- #
+    def close(self):
+        self.pool.close()
 
     def add_deck(self, name):
-        self.cursor.execute("INSERT INTO decks (name) VALUES (?)", (name,))
-        self.connection.commit()
+        with self.pool.transaction() as cursor:
+            cursor.execute("INSERT INTO decks (name) VALUES (?)", (name,))
 
     def del_deck(self, deck_id):
-        self.cursor.execute("DELETE FROM decks WHERE id = ?", (deck_id,))
-        self.connection.commit()
+        with self.pool.transaction() as cursor:
+            cursor.execute("DELETE FROM decks WHERE id = ?", (deck_id,))
+        self.release_unreferenced_images()
 
     def check_existing(self, name):
-        self.cursor.execute("SELECT 1 FROM decks WHERE name = ? LIMIT 1", (name,))
-        return bool(self.cursor.fetchone())
+        with self.pool.read() as cursor:
+            cursor.execute("SELECT 1 FROM decks WHERE name = ? LIMIT 1", (name,))
+            return bool(cursor.fetchone())
 
     def get_all_decks(self):
-        self.cursor.execute("SELECT * FROM decks ORDER BY name ASC")
-        return self.cursor.fetchall()
+        with self.pool.read() as cursor:
+            cursor.execute("SELECT * FROM decks ORDER BY name ASC")
+            return cursor.fetchall()
 
     def get_deck_id_by_name(self, name):
-        self.cursor.execute("SELECT id FROM decks WHERE name = ?", (name,))
-        result = self.cursor.fetchone()
+        with self.pool.read() as cursor:
+            cursor.execute("SELECT id FROM decks WHERE name = ?", (name,))
+            result = cursor.fetchone()
         if result:
             return result[0]
 
     def update_deck_stats(self, deck_id):
-        self.cursor.execute("SELECT status, next_review FROM cards WHERE deck_id = ?", (deck_id,))
-        results = self.cursor.fetchall()
-        total_cards = len(results)
-        new_cards = 0
-        due_cards = 0
-        now = datetime.now()
-
-        for status, next_review in results:
-            if status == "new":
-                new_cards += 1
-            if next_review:
-                try:
-                    review_time = datetime.fromisoformat(next_review)
-                    if review_time <= now:
-                        due_cards += 1
-                except ValueError:
-                    pass
+        self.refresh_deck_stats([deck_id])
 
-        self.cursor.execute(
+    # ----| total/new are kept exact by triggers (migration 4), this recounts due cards with one indexed range |---- #
+    # ----| count per deck (all decks if None) and returns the rows as (deck_id, total, new, due), by default |---- #
+    # ----| only the ones whose due count changed |---- #
+    def refresh_deck_stats(self, deck_ids=None, changed_only=True):
+        due_count = "(SELECT COUNT(*) FROM cards WHERE cards.deck_id = decks.id AND cards.next_review_at <= ?)"
+        params = [int(time.time())]
+        if self.legacy_timestamps:
+            due_count += """
+                + (SELECT COUNT(*) FROM cards
+                   WHERE cards.deck_id = decks.id AND cards.created_at IS NULL AND cards.next_review <= ?)
             """
-            UPDATE decks
-            SET total_cards = ?, new_cards = ?, due_cards = ?
-            WHERE id = ?
-            """,
-            (total_cards, new_cards, due_cards, deck_id)
-        )
-        self.connection.commit()
+            params.append(datetime.now().isoformat())
+        query = f"SELECT id, total_cards, new_cards, due_cards, {due_count} FROM decks"
+        if deck_ids is not None:
+            deck_ids = list(deck_ids)
+            if not deck_ids:
+                return []
+            query += " WHERE id IN ({})".format(",".join("?" * len(deck_ids)))
+            params.extend(deck_ids)
+
+        with self.pool.transaction() as cursor:
+            cursor.execute(query, params)
+            rows = cursor.fetchall()
+            changed = [(deck_id, total, new, due) for deck_id, total, new, old_due, due in rows if old_due != due]
+            if changed:
+                cursor.executemany(
+                    "UPDATE decks SET due_cards = ? WHERE id = ?",
+                    [(due, deck_id) for deck_id, total, new, due in changed]
+                )
+
+        if changed_only:
+            return changed
+        return [(deck_id, total, new, due) for deck_id, total, new, _, due in rows]
+
+    # ----| consistency check, recounts every deck from the cards table and reports any counter drift |---- #
+    # ----| as (deck_id, column, stored, actual), the counters are rebuilt unless repair is False |---- #
+    def check_deck_counters(self, repair=True):
+        drift = []
+        repairs = []
+        with self.pool.transaction() as cursor:
+            cursor.execute("""
+                SELECT decks.id, decks.total_cards, decks.new_cards,
+                       COUNT(cards.id), COALESCE(SUM(cards.status = 'new'), 0)
+                FROM decks
+                LEFT JOIN cards ON cards.deck_id = decks.id
+                GROUP BY decks.id
+            """)
+            for deck_id, stored_total, stored_new, total, new in cursor.fetchall():
+                if stored_total != total:
+                    drift.append((deck_id, "total_cards", stored_total, total))
+                if stored_new != new:
+                    drift.append((deck_id, "new_cards", stored_new, new))
+                if (stored_total, stored_new) != (total, new):
+                    repairs.append((total, new, deck_id))
+
+            if repair and repairs:
+                cursor.executemany("UPDATE decks SET total_cards = ?, new_cards = ? WHERE id = ?", repairs)
+        if repair:
+            self.refresh_deck_stats()
+        return drift
+
+    # ----| the earliest review still in the future across all decks, None if nothing is scheduled |---- #
+    def get_next_due_time(self):
+        with self.pool.read() as cursor:
+            cursor.execute("SELECT MIN(next_review_at) FROM cards WHERE next_review_at > ?", (int(time.time()),))
+            next_review_at = cursor.fetchone()[0]
+            if self.legacy_timestamps:
+                cursor.execute(
+                    f"SELECT MIN({epoch_sql('next_review')}) FROM cards WHERE created_at IS NULL AND next_review > ?",
+                    (datetime.now().isoformat(),)
+                )
+                legacy_next_review_at = cursor.fetchone()[0]
+                if legacy_next_review_at and (not next_review_at or legacy_next_review_at < next_review_at):
+                    next_review_at = legacy_next_review_at
+        if next_review_at:
+            return datetime.fromtimestamp(next_review_at)
 
     def add_card(self, deck_id, front, back, front_image_filename=None, back_image_filename=None):
-        now = datetime.now().isoformat()
-        self.cursor.execute(
-            """
-            INSERT INTO cards (
-                deck_id, front, back, front_image_filename, back_image_filename,
-                status, next_review, repetition, interval, ease_factor, created
-            )
-            VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
-            """,
-            (deck_id, front, back, front_image_filename, back_image_filename,
-             'new', None, 0, 0, 2.5, now)
+        self.add_cards(deck_id, [(front, back, front_image_filename, back_image_filename)])
+
+    # ----| bulk insert, cards is any iterable (a generator is fine) of |---- #
+    # ----| (front, back, front_image_filename, back_image_filename) tuples, written batch_size rows at a time |---- #
+    # ----| with executemany and committed once at the end, the deck counters follow through the triggers |---- #
+    # ----| with commit_every_batch each batch is its own short transaction instead, so a long import lets the |---- #
+    # ----| other writers in between batches and the rows come in outside the write lock, a failure keeps the |---- #
+    # ----| batches committed before it |---- #
+    # ----| progress_callback, if given, is called with the running count after every batch |---- #
+    # ----| the plain text of both sides is computed here once, so reading the card list never parses html |---- #
+    def add_cards(self, deck_id, cards, batch_size=1000, progress_callback=None, commit_every_batch=False):
+        rows = (
+            (deck_id, front, back, html_to_plaintext(front), html_to_plaintext(back),
+             front_image_filename, back_image_filename, 'new', None, 0, 0, 2.5, int(time.time()))
+            for front, back, front_image_filename, back_image_filename in cards
         )
-        self.connection.commit()
-        self.update_deck_stats(deck_id)
+
+        inserted = 0
+        # ----| the batch transactions join the outer one unless every batch is committed on its own |---- #
+        with nullcontext() if commit_every_batch else self.pool.transaction():
+            for batch in iter(lambda: list(islice(rows, batch_size)), []):
+                with self.pool.transaction() as cursor:
+                    cursor.executemany(
+                        """
+                        INSERT INTO cards (
+                            deck_id, front, back, front_text, back_text, front_image_filename, back_image_filename,
+                            status, next_review_at, repetition, interval, ease_factor, created_at
+                        )
+                        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                        """,
+                        batch
+                    )
+                inserted += len(batch)
+                if progress_callback:
+                    progress_callback(inserted)
+        return inserted
 
     def rename_deck(self, new_name, deck_id):
-        self.cursor.execute("UPDATE decks SET name = ? WHERE id = ?", (new_name, deck_id))
-        self.connection.commit()
+        with self.pool.transaction() as cursor:
+            cursor.execute("UPDATE decks SET name = ? WHERE id = ?", (new_name, deck_id))
 
     def get_deck_cards(self, deck_id):
-        self.cursor.execute("SELECT id, front, back, front_image_filename, back_image_filename, created FROM cards WHERE deck_id = ?", (deck_id,))
-        return self.cursor.fetchall()
+        with self.pool.read() as cursor:
+            cursor.execute(f"SELECT id, front, back, front_image_filename, back_image_filename, {CREATED_AT} FROM cards WHERE deck_id = ?", (deck_id,))
+            return cursor.fetchall()
+
+    # ----| one page of a deck's cards in id order, starting after after_id (keyset paging, no OFFSET), |---- #
+    # ----| as (id, front_text, back_text, front_image_filename, back_image_filename, created_at) |---- #
+    # ----| the html is only read for cards the backfill has not reached yet |---- #
+    def get_deck_cards_page(self, deck_id, after_id=0, limit=200):
+        with self.pool.read() as cursor:
+            cursor.execute(
+                f"""
+                SELECT id, front_text, back_text, front_image_filename, back_image_filename, {CREATED_AT},
+                       CASE WHEN front_text IS NULL THEN front END,
+                       CASE WHEN front_text IS NULL THEN back END
+                FROM cards
+                WHERE deck_id = ? AND id > ?
+                ORDER BY id
+                LIMIT ?
+                """,
+                (deck_id, after_id, limit)
+            )
+            rows = cursor.fetchall()
+        return [
+            (card_id, front_text, back_text, front_image, back_image, created)
+            if front_text is not None else
+            (card_id, html_to_plaintext(front), html_to_plaintext(back), front_image, back_image, created)
+            for card_id, front_text, back_text, front_image, back_image, created, front, back in rows
+        ]
+
+    def get_card(self, card_id):
+        with self.pool.read() as cursor:
+            cursor.execute(
+                "SELECT id, front, back, front_image_filename, back_image_filename FROM cards WHERE id = ?",
+                (card_id,)
+            )
+            return cursor.fetchone()
+
+    # ----| (front_text, back_text, front_image_filename, back_image_filename) of one card, for the card list |---- #
+    def get_card_texts(self, card_id):
+        with self.pool.read() as cursor:
+            cursor.execute(
+                "SELECT front_text, back_text, front, back, front_image_filename, back_image_filename FROM cards WHERE id = ?",
+                (card_id,)
+            )
+            result = cursor.fetchone()
+        if not result:
+            return None
+        front_text, back_text, front, back, front_image, back_image = result
+        if front_text is None:
+            front_text, back_text = html_to_plaintext(front), html_to_plaintext(back)
+        return front_text, back_text, front_image, back_image
+
+    # ----| number of cards written before the text columns existed, answered from the partial index |---- #
+    def count_missing_card_texts(self):
+        with self.pool.read() as cursor:
+            cursor.execute("SELECT COUNT(*) FROM cards WHERE front_text IS NULL")
+            return cursor.fetchone()[0]
+
+    # ----| fills in the text columns of older cards, batch_size cards per transaction so it can be stopped and |---- #
+    # ----| picked up again at any point, progress_callback gets the running count after every batch |---- #
+    def backfill_card_texts(self, batch_size=500, progress_callback=None):
+        filled = 0
+        while True:
+            with self.pool.read() as cursor:
+                cursor.execute(
+                    "SELECT id, front, back FROM cards WHERE front_text IS NULL ORDER BY id LIMIT ?",
+                    (batch_size,)
+                )
+                rows = cursor.fetchall()
+            if not rows:
+                break
+            # ----| the html is parsed before taking the write lock, a card edited meanwhile already has its text |---- #
+            texts = [(html_to_plaintext(front), html_to_plaintext(back), card_id) for card_id, front, back in rows]
+            with self.pool.transaction() as cursor:
+                cursor.executemany(
+                    "UPDATE cards SET front_text = ?, back_text = ? WHERE id = ? AND front_text IS NULL",
+                    texts
+                )
+            filled += len(rows)
+            if progress_callback:
+                progress_callback(filled)
+        return filled
+
+    # ----| whether any card still only has the text timestamps of an older version, answered from the partial |---- #
+    # ----| index (named, the planner would otherwise walk the wider created_at index), the reads stop looking at |---- #
+    # ----| the text columns once it is empty |---- #
+    def check_legacy_timestamps(self):
+        with self.pool.read() as cursor:
+            cursor.execute(
+                "SELECT EXISTS (SELECT 1 FROM cards INDEXED BY idx_cards_unconverted_timestamps WHERE created_at IS NULL)"
+            )
+            self.legacy_timestamps = bool(cursor.fetchone()[0])
+        return self.legacy_timestamps
+
+    def count_unconverted_timestamps(self):
+        with self.pool.read() as cursor:
+            cursor.execute("SELECT COUNT(*) FROM cards INDEXED BY idx_cards_unconverted_timestamps WHERE created_at IS NULL")
+            return cursor.fetchone()[0]
+
+    # ----| fills in next_review_at and created_at of older cards from their text columns, batch_size cards per |---- #
+    # ----| short transaction so the app keeps writing in between and it can be stopped and picked up again at |---- #
+    # ----| any point, progress_callback gets the running count after every batch |---- #
+    # ----| a card graded before it was reached already has its next_review_at, that one is kept |---- #
+    def convert_card_timestamps(self, batch_size=2000, progress_callback=None):
+        converted = 0
+        while True:
+            with self.pool.transaction() as cursor:
+                cursor.execute(
+                    f"""
+                    UPDATE cards
+                    SET created_at = COALESCE({epoch_sql('created')}, 0),
+                        next_review_at = COALESCE(next_review_at, {epoch_sql('next_review')}),
+                        next_review = NULL
+                    WHERE id IN (SELECT id FROM cards WHERE created_at IS NULL ORDER BY id LIMIT ?)
+                    """,
+                    (batch_size,)
+                )
+                count = cursor.rowcount
+            if not count:
+                break
+            converted += count
+            if progress_callback:
+                progress_callback(converted)
+        self.legacy_timestamps = False
+        return converted
+
+    # ----| full text search over the plain text of both sides, every word must match and the last one also |---- #
+    # ----| matches as a prefix once it is two characters long, optionally within one deck, returns a page of the |---- #
+    # ----| matches as |---- #
+    # ----| (id, deck_id, deck_name, front_text, back_text, front_image_filename, back_image_filename, created_at) |---- #
+    # ----| the index hands the matches out newest first in blocks of SEARCH_CANDIDATES, only the cards within a |---- #
+    # ----| block are sorted by match_score, so a strong match on an older card comes after the weaker ones of |---- #
+    # ----| the newer blocks, every match is reached by paging on |---- #
+    def search_cards(self, query, deck_id=None, limit=50, offset=0):
+        words = search_words(query)
+        if not words:
+            return []
+        # ----| words are quoted so nothing typed is read as FTS5 syntax |---- #
+        match = " ".join(f'"{word}"' for word in words)
+        if len(words[-1]) > 1:
+            match += "*"
+
+        first_block = offset // SEARCH_CANDIDATES
+        last_block = (offset + limit - 1) // SEARCH_CANDIDATES
+        hits = []
+        for block in range(first_block, last_block + 1):
+            candidate_ids = self.search_candidates(match, deck_id, block * SEARCH_CANDIDATES)
+            hits.extend(self.ranked_hits(candidate_ids, words))
+            if len(candidate_ids) < SEARCH_CANDIDATES:
+                break
+        start = offset - first_block * SEARCH_CANDIDATES
+        return hits[start:start + limit]
+
+    def ranked_hits(self, card_ids, words):
+        if not card_ids:
+            return []
+        with self.pool.read() as cursor:
+            cursor.execute(
+                f"""
+                SELECT cards.id, cards.deck_id, decks.name, cards.front_text, cards.back_text,
+                       cards.front_image_filename, cards.back_image_filename, {CREATED_AT}
+                FROM cards
+                JOIN decks ON decks.id = cards.deck_id
+                WHERE cards.id IN ({",".join("?" * len(card_ids))})
+                """,
+                card_ids
+            )
+            hits = cursor.fetchall()
+        hits.sort(key=lambda hit: (-match_score(hit[3], hit[4], words), -hit[0]))
+        return hits
+
+    # ----| ids of the cards matching an FTS5 query, newest first, SEARCH_CANDIDATES of them from offset on |---- #
+    def search_candidates(self, match, deck_id=None, offset=0):
+        with self.pool.read() as cursor:
+            if deck_id is None:
+                cursor.execute(
+                    "SELECT rowid FROM cards_fts WHERE cards_fts MATCH ? ORDER BY rowid DESC LIMIT ? OFFSET ?",
+                    (match, SEARCH_CANDIDATES, offset)
+                )
+            else:
+                # ----| the id range of the deck lets FTS5 skip the matches outside it without looking them up |---- #
+                cursor.execute(
+                    """
+                    SELECT cards_fts.rowid
+                    FROM cards_fts
+                    JOIN cards ON cards.id = cards_fts.rowid
+                    WHERE cards_fts MATCH ?1 AND cards.deck_id = ?2
+                      AND cards_fts.rowid BETWEEN (SELECT MIN(id) FROM cards WHERE deck_id = ?2)
+                                              AND (SELECT MAX(id) FROM cards WHERE deck_id = ?2)
+                    ORDER BY cards_fts.rowid DESC
+                    LIMIT ?3 OFFSET ?4
+                    """,
+                    (match, deck_id, SEARCH_CANDIDATES, offset)
+                )
+            return [row[0] for row in cursor.fetchall()]
+
+    # ----| streams a deck's cards without loading the whole deck, on its own read connection so other calls, |---- #
+    # ----| writes included, can run between rows |---- #
+    def iter_deck_cards(self, deck_id, batch_size=500):
+        with self.pool.read() as cursor:
+            cursor.execute(
+                f"SELECT id, front, back, front_image_filename, back_image_filename, {CREATED_AT} FROM cards WHERE deck_id = ?",
+                (deck_id,)
+            )
+            while True:
+                rows = cursor.fetchmany(batch_size)
+                if not rows:
+                    break
+                yield from rows
+
+    def get_deck_card_count(self, deck_id):
+        with self.pool.read() as cursor:
+            cursor.execute("SELECT total_cards FROM decks WHERE id = ?", (deck_id,))
+            result = cursor.fetchone()
+        return result[0] if result else 0
 
     def delete_cards(self, deck_id, card_ids):
         if not card_ids:
             return
 
-        self.cursor.execute(
-            "SELECT front_image_filename, back_image_filename FROM cards WHERE id IN ({})".format(
-                ",".join("?" * len(card_ids))
-            ),
-            card_ids
-        )
-        image_files = self.cursor.fetchall()
-
-        self.cursor.executemany("DELETE FROM cards where id=?", [(card_id,) for card_id in card_ids])
-        self.connection.commit()
-        self.update_deck_stats(deck_id)
-
-        for front_img, back_img in image_files:
-            for img in (front_img, back_img):
-                if img:
-                    img_path = os.path.join(self.image_folder_path, img)
-                    try:
-                        if os.path.exists(img_path):
-                            os.remove(img_path)
-                    except Exception as e:
-                        print(f"Could not delete image {img_path}: {e}")
+        with self.pool.transaction() as cursor:
+            cursor.executemany("DELETE FROM cards where id=?", [(card_id,) for card_id in card_ids])
+        self.release_unreferenced_images()
 
     def update_card(self, card_id, front, back, front_image_filename=None, back_image_filename=None):
-        self.cursor.execute(
-            """
-            UPDATE cards
-            SET front = ?, back = ?, front_image_filename = ?, back_image_filename = ?
-            WHERE id = ?
-            """,
-            (front, back, front_image_filename, back_image_filename, card_id)
-        )
-        self.connection.commit()
+        row = (front, back, html_to_plaintext(front), html_to_plaintext(back),
+               front_image_filename, back_image_filename, card_id)
+        with self.pool.transaction() as cursor:
+            cursor.execute(
+                """
+                UPDATE cards
+                SET front = ?, back = ?, front_text = ?, back_text = ?, front_image_filename = ?, back_image_filename = ?
+                WHERE id = ?
+                """,
+                row
+            )
+        self.release_unreferenced_images()
+
+    # ----| deletes the image files no card uses any more, the images table counts the uses through triggers |---- #
+    # ----| a file younger than min_age_seconds is kept with its row, the card editor may have just stored it |---- #
+    # ----| (or reused it, store_image_stream touches a file it finds already stored) for a card not saved yet, |---- #
+    # ----| a later release or image_store.collect_garbage deletes it once it is old enough |---- #
+    def release_unreferenced_images(self, min_age_seconds=GC_GRACE_SECONDS):
+        cutoff = time.time() - min_age_seconds
+        with self.pool.transaction() as cursor:
+            cursor.execute("SELECT filename FROM images WHERE refcount <= 0")
+            released = []
+            for (filename,) in cursor.fetchall():
+                try:
+                    if os.path.getmtime(os.path.join(self.image_folder_path, filename)) > cutoff:
+                        continue
+                except OSError:
+                    pass
+                remove_image_file(self.image_folder_path, self.thumbnail_folder_path, filename)
+                released.append((filename,))
+            cursor.executemany("DELETE FROM images WHERE filename = ? AND refcount <= 0", released)
+
+    # ----| the ones among filenames that at least one card uses |---- #
+    def get_referenced_images(self, filenames):
+        if not filenames:
+            return set()
+        with self.pool.read() as cursor:
+            cursor.execute(
+                "SELECT filename FROM images WHERE refcount > 0 AND filename IN ({})".format(",".join("?" * len(filenames))),
+                filenames
+            )
+            return {row[0] for row in cursor.fetchall()}
 
     def get_new_cards(self, deck_id):
-        self.cursor.execute("""
-              SELECT id, front, back, front_image_filename, back_image_filename
-              FROM cards
-              WHERE deck_id = ? AND status = 'new'
-              ORDER BY created ASC
-          """, (deck_id,))
-        data = self.cursor.fetchall()
-        return [{"id": r[0], "front": r[1], "back": r[2], "front_image": r[3], "back_image": r[4]} for r in data]
+        with self.pool.read() as cursor:
+            cursor.execute("""
+                  SELECT id, front, back, front_image_filename, back_image_filename,
+                         status, repetition, interval, ease_factor
+                  FROM cards
+                  WHERE deck_id = ? AND status = 'new'
+                  ORDER BY created_at ASC, id ASC
+              """, (deck_id,))
+            data = cursor.fetchall()
+        return [{"id": r[0], "front": r[1], "back": r[2], "front_image": r[3], "back_image": r[4],
+                 "status": r[5], "repetition": r[6], "interval": r[7], "ease_factor": r[8]} for r in data]
 
     def get_due_cards(self, deck_id):
-        now = datetime.now().isoformat()
-        self.cursor.execute("""
-              SELECT id, front, back, front_image_filename, back_image_filename, next_review
-              FROM cards
-              WHERE deck_id = ? AND next_review IS NOT NULL AND next_review <= ?
-              ORDER BY next_review ASC
-          """, (deck_id, now))
-        data = self.cursor.fetchall()
-        return [{"id": r[0], "front": r[1], "back": r[2], "front_image": r[3], "back_image": r[4], "next_review": r[5]} for r in data]
+        with self.pool.read() as cursor:
+            cursor.execute("""
+                  SELECT id, front, back, front_image_filename, back_image_filename, next_review_at,
+                         status, repetition, interval, ease_factor
+                  FROM cards
+                  WHERE deck_id = ? AND next_review_at <= ?
+                  ORDER BY next_review_at ASC
+              """, (deck_id, int(time.time())))
+            data = cursor.fetchall()
+            if self.legacy_timestamps:
+                cursor.execute(f"""
+                      SELECT id, front, back, front_image_filename, back_image_filename, {epoch_sql('next_review')},
+                             status, repetition, interval, ease_factor
+                      FROM cards
+                      WHERE deck_id = ? AND created_at IS NULL AND next_review <= ?
+                  """, (deck_id, datetime.now().isoformat()))
+                data = sorted(data + cursor.fetchall(), key=lambda row: row[5])
+        return [{"id": r[0], "front": r[1], "back": r[2], "front_image": r[3], "back_image": r[4], "next_review": r[5],
+                 "status": r[6], "repetition": r[7], "interval": r[8], "ease_factor": r[9]} for r in data]
 
     # ----| method that returns the intervals for each option for display on buttons |---- #
     def get_sm2_intervals(self, card_id):
-        self.cursor.execute(
-            """
-              SELECT repetition, interval, ease_factor, next_review
-              FROM cards
-              WHERE id = ? 
-                      
-            """,
-            (card_id,)
+        with self.pool.read() as cursor:
+            cursor.execute(
+                "SELECT status, repetition, interval, ease_factor FROM cards WHERE id = ?",
+                (card_id,)
+            )
+            status, repetition, interval, ease_factor = cursor.fetchone()
+        return sm2.preview_intervals(
+            {"status": status, "repetition": repetition, "interval": interval, "ease_factor": ease_factor}
         )
-        data = self.cursor.fetchone()
-        card_stats = {"repetition": data[0], "interval": data[1], "ease_factor": data[2]}
 
-        if card_stats["repetition"] <= 2:
-            return False
+    # ----| method that updates the cards sm2 stats based on the grade |---- #
+    def update_card_sm2(self, card_id, grade, deck_id):
+        self.update_cards_sm2([(card_id, grade)])
 
-        card_grades = [3, 4, 5]
-        new_intervals = []
-        for grade in card_grades:
-            new_ease_factor = card_stats["ease_factor"] + (0.1 - (5 - grade) * (0.08 + (5 - grade) * 0.02))
-            new_ease_factor = max(1.3, new_ease_factor)
+    # ----| reads, grades and writes a batch of (card_id, grade) answers in order, in one transaction, every |---- #
+    # ----| answer is logged in revlog without an answer time |---- #
+    def update_cards_sm2(self, grades):
+        # ----| a card answered twice in the same batch builds on its first answer instead of re-reading it |---- #
+        latest_states = {}
+        states = []
+        reviews = []
+        with self.pool.transaction() as cursor:
+            for card_id, grade in grades:
+                card = latest_states.get(card_id)
+                if card is None:
+                    cursor.execute(
+                        "SELECT status, repetition, interval, ease_factor, deck_id FROM cards WHERE id = ?",
+                        (card_id,)
+                    )
+                    status, repetition, interval, ease_factor, deck_id = cursor.fetchone()
+                    card = {"status": status, "repetition": repetition, "interval": interval, "ease_factor": ease_factor,
+                            "deck_id": deck_id}
+                state = dict(sm2.next_state(card, grade), deck_id=card["deck_id"])
+                latest_states[card_id] = state
+                states.append((card_id, state))
+                reviews.append(review_row(card_id, card["deck_id"], card, state, grade))
+            self.save_card_states(states, reviews)
 
-            interval = round(card_stats["interval"] * new_ease_factor)
-            new_intervals.append(interval)
+    # ----| writes (card_id, state) pairs computed with sm2.next_state, one UPDATE per card and no reads, the old |---- #
+    # ----| text next_review is cleared so a card convert_card_timestamps hasn't reached is only due once |---- #
+    # ----| reviews are the revlog rows of the same answers (review_row), appended in the same transaction |---- #
+    def save_card_states(self, states, reviews=()):
+        with self.pool.transaction() as cursor:
+            cursor.executemany(
+                """
+                UPDATE cards
+                SET status = ?, repetition = ?, interval = ?, ease_factor = ?, next_review_at = ?, next_review = NULL
+                WHERE id = ?
+                """,
+                [
+                    (state["status"], state["repetition"], state["interval"], state["ease_factor"],
+                     state["next_review"], card_id)
+                    for card_id, state in states
+                ]
+            )
+            if reviews:
+                cursor.executemany(
+                    """
+                    INSERT INTO revlog (
+                        card_id, deck_id, reviewed_at, grade, previous_interval, interval, ease_factor, answer_ms
+                    )
+                    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+                    """,
+                    reviews
+                )
 
-        return {"hard_interval": new_intervals[0], "good_interval": new_intervals[1], "easy_interval": new_intervals[2]}
+    # ----| the answers given to one card, oldest first, as |---- #
+    # ----| (reviewed_at, grade, previous_interval, interval, ease_factor, answer_ms) |---- #
+    def get_card_reviews(self, card_id):
+        with self.pool.read() as cursor:
+            cursor.execute(
+                """
+                SELECT reviewed_at, grade, previous_interval, interval, ease_factor, answer_ms
+                FROM revlog
+                WHERE card_id = ?
+                ORDER BY reviewed_at
+                """,
+                (card_id,)
+            )
+            return cursor.fetchall()
 
-    # ----| method that updates the cards sm2 stats based on the grade |---- #
-    def update_card_sm2(self, card_id, grade, deck_id):
-        self.cursor.execute(
-            "SELECT status, repetition, interval, ease_factor FROM cards WHERE id = ?",
-            (card_id,)
-        )
-        status, repetition, interval, ease_factor = self.cursor.fetchone()
-
-        if status == "new":
-            repetition = 0
-            interval = 1
-            ease_factor = 2.5
-            # next_review = (datetime.now() + timedelta(seconds=interval)).isoformat()  # testing
-            next_review = (datetime.now() + timedelta(days=interval)).isoformat()
-            status = "review"
-        else:
-            if grade < 3:
-                repetition = 0
-                interval = 1
-                ease_factor = max(1.3, ease_factor)
+    # ----| the answers given from start up to end (epoch seconds), oldest first, as |---- #
+    # ----| (card_id, deck_id, reviewed_at, grade, previous_interval, interval, ease_factor, answer_ms) |---- #
+    def get_reviews_between(self, start, end):
+        with self.pool.read() as cursor:
+            cursor.execute(
+                """
+                SELECT card_id, deck_id, reviewed_at, grade, previous_interval, interval, ease_factor, answer_ms
+                FROM revlog
+                WHERE reviewed_at >= ? AND reviewed_at < ?
+                ORDER BY reviewed_at
+                """,
+                (start, end)
+            )
+            return cursor.fetchall()
+
+    # ----| the daily_stats rollup from first_day on (days since 1970-01-01 in local time), optionally of one deck, |---- #
+    # ----| as (day, deck_id, new_answers, review_answers, passed, answer_ms, timed_answers) |---- #
+    def get_daily_stats(self, first_day, deck_id=None):
+        query = """
+            SELECT day, deck_id, new_answers, review_answers, passed, answer_ms, timed_answers
+            FROM daily_stats
+            WHERE day >= ?
+        """
+        params = [first_day]
+        if deck_id is not None:
+            query += " AND deck_id = ?"
+            params.append(deck_id)
+        with self.pool.read() as cursor:
+            cursor.execute(query, params)
+            return cursor.fetchall()
+
+    # ----| next_review_at of every card due before until (epoch seconds), overdue ones included, optionally of |---- #
+    # ----| one deck, straight from the next_review_at indexes |---- #
+    def get_due_times(self, until, deck_id=None):
+        with self.pool.read() as cursor:
+            if deck_id is None:
+                cursor.execute("SELECT next_review_at FROM cards WHERE next_review_at < ?", (until,))
             else:
-                if repetition == 0:
-                    interval = 1
-                elif repetition == 1:
-                    interval = 6
-                else:
-                    ease_factor = ease_factor + (0.1 - (5 - grade) * (0.08 + (5 - grade) * 0.02))
-                    ease_factor = max(1.3, ease_factor)
-                    interval = round(interval * ease_factor)
-                repetition += 1
-            # next_review = (datetime.now() + timedelta(seconds=interval)).isoformat()  # testing
-            next_review = (datetime.now() + timedelta(days=interval)).isoformat()
-
-        self.cursor.execute(
-            """
-            UPDATE cards
-            SET status = ?, repetition = ?, interval = ?, ease_factor = ?, next_review = ?
-            WHERE id = ?
-            """,
-            (status, repetition, interval, ease_factor, next_review, card_id)
-        )
-        self.connection.commit()
-        self.update_deck_stats(deck_id)
+                cursor.execute(
+                    "SELECT next_review_at FROM cards WHERE deck_id = ? AND next_review_at < ?",
+                    (deck_id, until)
+                )
+            return [row[0] for row in cursor.fetchall()]
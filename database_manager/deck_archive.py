@@ -0,0 +1,120 @@
+import io
+import json
+import os
+import zipfile
+from database_manager.image_store import store_image_stream
+
+# ----| portable deck archive: a zip with deck.json, one json line per card in cards.jsonl and the card images |---- #
+# ----| under images/, both export and import stream card by card and file by file |---- #
+
+ARCHIVE_FORMAT = "flashcard-deck"
+ARCHIVE_VERSION = 1
+MANIFEST_NAME = "deck.json"
+CARDS_NAME = "cards.jsonl"
+IMAGES_DIR = "images/"
+MAX_DECK_NAME_LENGTH = 49
+
+
+def export_deck(database_manager, deck_id, deck_name, archive_path, progress_callback=None):
+    card_count = database_manager.get_deck_card_count(deck_id)
+    image_filenames = set()
+    exported = 0
+
+    with zipfile.ZipFile(archive_path, "w", compression=zipfile.ZIP_DEFLATED) as archive:
+        archive.writestr(MANIFEST_NAME, json.dumps({
+            "format": ARCHIVE_FORMAT,
+            "version": ARCHIVE_VERSION,
+            "name": deck_name,
+            "card_count": card_count,
+        }))
+
+        with archive.open(CARDS_NAME, "w", force_zip64=True) as cards_file:
+            for card_id, front, back, front_image, back_image, created in database_manager.iter_deck_cards(deck_id):
+                card = {
+                    "front": front,
+                    "back": back,
+                    "front_image": front_image,
+                    "back_image": back_image,
+                }
+                cards_file.write((json.dumps(card) + "\n").encode("utf-8"))
+                image_filenames.update(filename for filename in (front_image, back_image) if filename)
+
+                exported += 1
+                if progress_callback and exported % 500 == 0:
+                    progress_callback(exported * 90 // max(card_count, 1), exported)
+
+        # ----| images are already compressed, they are stored as is and copied in chunks by zipfile |---- #
+        for number, filename in enumerate(sorted(image_filenames), start=1):
+            image_path = os.path.join(database_manager.image_folder_path, filename)
+            if os.path.exists(image_path):
+                archive.write(image_path, IMAGES_DIR + filename, compress_type=zipfile.ZIP_STORED)
+            if progress_callback and number % 50 == 0:
+                progress_callback(90 + number * 10 // len(image_filenames), exported)
+
+    if progress_callback:
+        progress_callback(100, exported)
+    return exported
+
+
+def unique_deck_name(database_manager, name):
+    name = name.strip()[:MAX_DECK_NAME_LENGTH] or "Imported deck"
+    candidate = name
+    number = 2
+    while database_manager.check_existing(candidate):
+        suffix = f" ({number})"
+        candidate = name[:MAX_DECK_NAME_LENGTH - len(suffix)] + suffix
+        number += 1
+    return candidate
+
+
+# ----| (front, back, front_image, back_image) of an archived card, with its images renamed to their stored names |---- #
+def stored_card_row(card, stored_names):
+    row = []
+    for side in ("front", "back"):
+        html, image_filename = card[side], card.get(f"{side}_image")
+        stored_name = stored_names.get(image_filename, image_filename)
+        if image_filename and stored_name != image_filename:
+            html = html.replace(image_filename, stored_name)
+        row.append((html, stored_name))
+    (front, front_image), (back, back_image) = row
+    return front, back, front_image, back_image
+
+
+# ----| imports an archive as a new deck and returns (deck_name, imported_cards) |---- #
+def import_deck(database_manager, archive_path, progress_callback=None):
+    with zipfile.ZipFile(archive_path) as archive:
+        manifest = json.loads(archive.read(MANIFEST_NAME))
+        if manifest.get("format") != ARCHIVE_FORMAT or manifest.get("version", 0) > ARCHIVE_VERSION:
+            raise ValueError("Not a deck archive, or made by a newer version of the app.")
+
+        # ----| images first, so no card is ever stored pointing at a file that isn't there yet, each one is stored |---- #
+        # ----| under its content name (image_store.py) and the cards are pointed at that name, an image that is |---- #
+        # ----| already in data/images, from an earlier import or another deck, is not stored twice |---- #
+        stored_names = {}
+        for info in archive.infolist():
+            if not info.filename.startswith(IMAGES_DIR) or info.is_dir():
+                continue
+            # ----| only the bare file name is trusted, nothing in the archive may write outside data/images |---- #
+            filename = os.path.basename(info.filename)
+            if filename:
+                with archive.open(info) as source:
+                    stored_names[filename] = store_image_stream(database_manager.image_folder_path, source, filename)
+
+        deck_name = unique_deck_name(database_manager, manifest.get("name", ""))
+        database_manager.add_deck(deck_name)
+        deck_id = database_manager.get_deck_id_by_name(deck_name)
+        card_count = max(manifest.get("card_count", 0), 1)
+
+        with archive.open(CARDS_NAME) as raw_cards:
+            lines = io.TextIOWrapper(raw_cards, encoding="utf-8")
+            cards = (json.loads(line) for line in lines if line.strip())
+            rows = (stored_card_row(card, stored_names) for card in cards)
+            imported = database_manager.add_cards(
+                deck_id, rows,
+                progress_callback=progress_callback and (
+                    lambda count: progress_callback(min(100, count * 100 // card_count), count)
+                ),
+                commit_every_batch=True
+            )
+
+    return deck_name, imported
@@ -0,0 +1,112 @@
+import queue
+import threading
+import time
+
+# ----| write-behind queue for study answers, the study window grades the card in memory (sm2.py), hands the |---- #
+# ----| new state over and moves on, while a background thread writes whatever has piled up in one transaction |---- #
+# ----| through the app's shared DBManager, so its writes queue up for the same writer as every other write |---- #
+
+STOP = object()
+# ----| a batch that could not be written stays queued and is tried again after RETRY_DELAY seconds, doubling |---- #
+# ----| up to MAX_RETRY_DELAY, the app hears about it through on_failed once REPORT_AFTER_FAILURES tries failed |---- #
+RETRY_DELAY = 0.25
+MAX_RETRY_DELAY = 8
+REPORT_AFTER_FAILURES = 4
+# ----| on close the answers still failing after this many more tries are given up on, so the app can quit |---- #
+CLOSING_ATTEMPTS = 3
+
+
+class GradeWriter:
+    def __init__(self, database_manager, on_written=None, on_failed=None, max_batch_size=200):
+        self.database_manager = database_manager
+        self.on_written = on_written
+        self.on_failed = on_failed
+        self.max_batch_size = max_batch_size
+        self.queue = queue.Queue()
+        self.closed = False
+        self.thread = threading.Thread(target=self.run, name="grade-writer", daemon=True)
+        self.thread.start()
+
+    # ----| review is the answer's revlog row (db_manager.review_row), written in the same transaction as the state |---- #
+    # ----| after close the thread is gone, an answer still coming in is written right away on the caller's thread |---- #
+    def submit(self, card_id, state, deck_id, review=None):
+        if self.closed:
+            self.database_manager.save_card_states([(card_id, state)], [review] if review else [])
+            if self.on_written:
+                self.on_written([deck_id])
+            return
+        self.queue.put((card_id, state, deck_id, review))
+
+    # ----| blocks until every grade submitted so far is on disk, or given up on while closing |---- #
+    def flush(self):
+        self.queue.join()
+
+    # ----| flush-on-exit hook, writes what is pending and stops the thread, safe to call more than once |---- #
+    def close(self):
+        if self.closed:
+            return
+        self.closed = True
+        self.queue.put(STOP)
+        self.thread.join()
+
+    # ----| on_failed gets (answers, error message, given_up), given_up only when closing dropped them |---- #
+    def report_failure(self, count, error, given_up):
+        if self.on_failed:
+            self.on_failed(count, str(error), given_up)
+
+    def run(self):
+        batch = []
+        failures = 0
+        closing_failures = 0
+        stopping = False
+
+        while True:
+            # ----| a failed batch waits out its delay and then goes again, with whatever arrived meanwhile |---- #
+            if batch:
+                time.sleep(min(RETRY_DELAY * 2 ** (failures - 1), MAX_RETRY_DELAY))
+            elif not stopping:
+                event = self.queue.get()
+                if event is STOP:
+                    stopping = True
+                else:
+                    batch.append(event)
+
+            # ----| coalesce everything that arrived while the previous batch was being written |---- #
+            while not stopping and len(batch) < self.max_batch_size:
+                try:
+                    event = self.queue.get_nowait()
+                except queue.Empty:
+                    break
+                if event is STOP:
+                    stopping = True
+                else:
+                    batch.append(event)
+
+            if not batch:
+                break
+
+            try:
+                self.database_manager.save_card_states(
+                    [(card_id, state) for card_id, state, deck_id, review in batch],
+                    [review for card_id, state, deck_id, review in batch if review]
+                )
+            except Exception as e:
+                failures += 1
+                if stopping:
+                    closing_failures += 1
+                given_up = closing_failures >= CLOSING_ATTEMPTS
+                if failures == REPORT_AFTER_FAILURES or given_up:
+                    self.report_failure(len(batch), e, given_up)
+                if not given_up:
+                    continue
+            else:
+                failures = 0
+                if self.on_written:
+                    self.on_written(sorted({deck_id for card_id, state, deck_id, review in batch}))
+
+            for _ in batch:
+                self.queue.task_done()
+            batch = []
+
+        if stopping:
+            self.queue.task_done()
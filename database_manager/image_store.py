@@ -0,0 +1,133 @@
+import hashlib
+import os
+import time
+import uuid
+
+# ----| card images are stored once per content, named by the sha256 of their bytes, so the same picture on many |---- #
+# ----| cards is one file, the images table (migrations.add_image_refcounts) counts the card sides using each file |---- #
+
+HASH_CHUNK_SIZE = 1024 * 1024
+TEMP_SUFFIX = ".tmp"
+# ----| files younger than this are left alone by the garbage collector, the card editor writes an image |---- #
+# ----| before the card that uses it is saved |---- #
+GC_GRACE_SECONDS = 60 * 60
+
+
+def normalized_extension(file_name):
+    ext = os.path.splitext(file_name)[1].lower()
+    return ".jpg" if ext == ".jpeg" else (ext or ".png")
+
+
+def content_filename(digest, file_name):
+    return digest + normalized_extension(file_name)
+
+
+# ----| copies a stream into the image folder under its content name, returns the file name, a file that is |---- #
+# ----| already stored is not written again |---- #
+def store_image_stream(image_folder_path, source, file_name):
+    temp_path = os.path.join(image_folder_path, f"{uuid.uuid4().hex}{TEMP_SUFFIX}")
+    digest = hashlib.sha256()
+    try:
+        with open(temp_path, "wb") as target:
+            while True:
+                chunk = source.read(HASH_CHUNK_SIZE)
+                if not chunk:
+                    break
+                digest.update(chunk)
+                target.write(chunk)
+
+        filename = content_filename(digest.hexdigest(), file_name)
+        image_path = os.path.join(image_folder_path, filename)
+        if os.path.exists(image_path):
+            # ----| touched, so a garbage collection running right now treats the reused file as new |---- #
+            os.utime(image_path)
+            return filename
+        # ----| renamed into place so a half written file never has a content name |---- #
+        os.replace(temp_path, image_path)
+        return filename
+    finally:
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+
+
+def store_image_file(image_folder_path, source_path):
+    with open(source_path, "rb") as source:
+        return store_image_stream(image_folder_path, source, source_path)
+
+
+# ----| removes an image and its display size copies (windows/image_cache.py) |---- #
+def remove_image_file(image_folder_path, thumbnail_folder_path, filename):
+    paths = [os.path.join(image_folder_path, filename)]
+    if os.path.isdir(thumbnail_folder_path):
+        paths += [os.path.join(entry.path, filename) for entry in os.scandir(thumbnail_folder_path) if entry.is_dir()]
+
+    for path in paths:
+        try:
+            if os.path.exists(path):
+                os.remove(path)
+        except OSError as e:
+            print(f"Could not delete image {path}: {e}")
+
+
+def iter_batches(iterator, batch_size):
+    batch = []
+    for item in iterator:
+        batch.append(item)
+        if len(batch) == batch_size:
+            yield batch
+            batch = []
+    if batch:
+        yield batch
+
+
+# ----| the files in data/images, and the display size copies whose original is gone, as (filename, entry) |---- #
+# ----| pairs, read lazily with scandir so a large folder is never listed in one go |---- #
+def iter_image_entries(image_folder_path, thumbnail_folder_path):
+    with os.scandir(image_folder_path) as entries:
+        for entry in entries:
+            if entry.is_file():
+                yield entry.name, entry
+
+    if not os.path.isdir(thumbnail_folder_path):
+        return
+    with os.scandir(thumbnail_folder_path) as size_folders:
+        for size_folder in size_folders:
+            if not size_folder.is_dir():
+                continue
+            with os.scandir(size_folder.path) as entries:
+                for entry in entries:
+                    if entry.is_file() and not os.path.exists(os.path.join(image_folder_path, entry.name)):
+                        yield None, entry
+
+
+# ----| walks data/images batch_size files at a time and removes the files no card uses, with dry_run it only |---- #
+# ----| reports what would go, returns {"files": n, "bytes": n, "deleted": bool} |---- #
+# ----| progress_callback, if given, is called with the running (files checked, reclaimable files, bytes) |---- #
+def collect_garbage(database_manager, dry_run=True, min_age_seconds=GC_GRACE_SECONDS, batch_size=500,
+                    progress_callback=None):
+    cutoff = time.time() - min_age_seconds
+    checked = reclaimable = reclaimable_bytes = 0
+
+    entries = iter_image_entries(database_manager.image_folder_path, database_manager.thumbnail_folder_path)
+    for batch in iter_batches(entries, batch_size):
+        referenced = database_manager.get_referenced_images([name for name, entry in batch if name])
+        for name, entry in batch:
+            checked += 1
+            if name in referenced:
+                continue
+            stat = entry.stat()
+            if stat.st_mtime > cutoff:
+                continue
+            reclaimable += 1
+            reclaimable_bytes += stat.st_size
+            if not dry_run:
+                try:
+                    os.remove(entry.path)
+                except OSError as e:
+                    print(f"Could not delete image {entry.path}: {e}")
+        if progress_callback:
+            progress_callback(checked, reclaimable, reclaimable_bytes)
+
+    if not dry_run:
+        database_manager.release_unreferenced_images(min_age_seconds)
+    return {"files": reclaimable, "bytes": reclaimable_bytes, "deleted": not dry_run}
@@ -0,0 +1,257 @@
+import json
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+import weakref
+from datetime import datetime
+from logging.handlers import RotatingFileHandler
+
+# ----| query timing for DBManager, off unless switched on from the diagnostics window (Ctrl+Shift+D in the main |---- #
+# ----| window) or with the FLASHCARD_DIAGNOSTICS environment variable. While off nothing is wrapped or traced, |---- #
+# ----| DBManager only registers itself, so switched off it costs nothing per call. |---- #
+# ----| While on, every public DBManager method is timed and the connection's trace callback attributes each sql |---- #
+# ----| statement to the method that ran it. A statement's time is measured from its start to the next statement |---- #
+# ----| or the end of the call, so it includes fetching its rows. |---- #
+
+ENVIRONMENT_VARIABLE = "FLASHCARD_DIAGNOSTICS"
+# ----| upper bounds of the latency histogram buckets, in ms, the last bucket holds everything slower |---- #
+LATENCY_BUCKETS_MS = (1, 5, 20, 100, 500, 2000)
+# ----| a call slower than this goes to the slow query log with the statements it ran |---- #
+SLOW_CALL_MS = 100
+SLOW_LOG_NAME = "slow_queries.log"
+SLOW_LOG_BYTES = 1024 * 1024
+SLOW_LOG_BACKUPS = 3
+NORMALIZED_CACHE_SIZE = 4096
+
+LITERAL_PATTERN = re.compile(r"'(?:[^']|'')*'|\b\d+(?:\.\d+)?\b")
+PLACEHOLDER_LIST_PATTERN = re.compile(r"\(\s*\?(?:\s*,\s*\?)+\s*\)")
+WHITESPACE_PATTERN = re.compile(r"\s+")
+
+
+normalized_cache = {}
+
+
+# ----| the trace callback sees the sql with its values filled in, they are put back to ? so the runs of one |---- #
+# ----| statement are counted together |---- #
+def normalized_sql(sql):
+    normalized = normalized_cache.get(sql)
+    if normalized is None:
+        normalized = LITERAL_PATTERN.sub("?", sql)
+        normalized = PLACEHOLDER_LIST_PATTERN.sub("(?, ...)", normalized)
+        normalized = WHITESPACE_PATTERN.sub(" ", normalized).strip()
+        if len(normalized_cache) >= NORMALIZED_CACHE_SIZE:
+            normalized_cache.clear()
+        normalized_cache[sql] = normalized
+    return normalized
+
+
+def returned_rows(result):
+    if isinstance(result, (list, tuple, set, dict)):
+        return len(result)
+    return 0 if result is None or isinstance(result, bool) else 1
+
+
+class TimingStats:
+    def __init__(self):
+        self.count = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+        self.rows = 0
+        self.buckets = [0] * (len(LATENCY_BUCKETS_MS) + 1)
+
+    def add(self, elapsed_ms, rows=0):
+        self.count += 1
+        self.total_ms += elapsed_ms
+        self.max_ms = max(self.max_ms, elapsed_ms)
+        self.rows += rows
+        for number, bound in enumerate(LATENCY_BUCKETS_MS):
+            if elapsed_ms < bound:
+                self.buckets[number] += 1
+                return
+        self.buckets[-1] += 1
+
+    def as_dict(self):
+        labels = [f"<{bound}ms" for bound in LATENCY_BUCKETS_MS] + [f">={LATENCY_BUCKETS_MS[-1]}ms"]
+        return {
+            "count": self.count,
+            "total_ms": round(self.total_ms, 3),
+            "mean_ms": round(self.total_ms / self.count, 3) if self.count else 0,
+            "max_ms": round(self.max_ms, 3),
+            "rows": self.rows,
+            "histogram": dict(zip(labels, self.buckets)),
+        }
+
+
+class Instrumentation:
+    def __init__(self):
+        self.enabled = False
+        self.lock = threading.Lock()
+        self.managers = weakref.WeakSet()
+        self.local = threading.local()
+        self.slow_logger = None
+        self.log_path = None
+        self.reset()
+
+    def reset(self):
+        with self.lock:
+            self.started = datetime.now()
+            self.methods = {}
+            self.statements = {}
+            self.commits = 0
+
+    # ----| called by every DBManager, only a weak reference is kept while switched off |---- #
+    def register(self, database_manager):
+        self.managers.add(database_manager)
+        if not self.enabled and os.environ.get(ENVIRONMENT_VARIABLE):
+            self.enable(os.path.join(os.path.dirname(os.path.abspath(database_manager.db_path)), "logs"))
+        elif self.enabled:
+            self.attach(database_manager)
+
+    def enable(self, log_folder):
+        if not self.enabled:
+            self.open_slow_log(log_folder)
+            self.enabled = True
+            self.reset()
+        for database_manager in list(self.managers):
+            self.attach(database_manager)
+
+    def disable(self):
+        self.enabled = False
+        for database_manager in list(self.managers):
+            self.detach(database_manager)
+
+    def open_slow_log(self, log_folder):
+        log_path = os.path.join(log_folder, SLOW_LOG_NAME)
+        if self.slow_logger and self.log_path == log_path:
+            return
+        os.makedirs(log_folder, exist_ok=True)
+        self.slow_logger = logging.getLogger("flashcard.slow_queries")
+        self.slow_logger.setLevel(logging.INFO)
+        self.slow_logger.propagate = False
+        for handler in list(self.slow_logger.handlers):
+            self.slow_logger.removeHandler(handler)
+            handler.close()
+        handler = RotatingFileHandler(log_path, maxBytes=SLOW_LOG_BYTES, backupCount=SLOW_LOG_BACKUPS,
+                                      encoding="utf-8")
+        handler.setFormatter(logging.Formatter("%(asctime)s %(threadName)s %(message)s"))
+        self.slow_logger.addHandler(handler)
+        self.log_path = log_path
+
+    @staticmethod
+    def public_methods(database_manager):
+        return [
+            name for name, value in vars(type(database_manager)).items()
+            if callable(value) and not name.startswith("_")
+        ]
+
+    # ----| the timed methods are set on the instance, so detaching only has to delete them again |---- #
+    def attach(self, database_manager):
+        if getattr(database_manager, "instrumented", False):
+            return
+        for name in self.public_methods(database_manager):
+            setattr(database_manager, name, self.timed(name, getattr(database_manager, name)))
+        database_manager.instrumented = True
+        # ----| covers the writer and every read connection of the pool, a closed DBManager has none left |---- #
+        try:
+            database_manager.pool.set_trace_callback(self.trace)
+        except sqlite3.ProgrammingError:
+            pass
+
+    def detach(self, database_manager):
+        if not getattr(database_manager, "instrumented", False):
+            return
+        for name in self.public_methods(database_manager):
+            database_manager.__dict__.pop(name, None)
+        database_manager.instrumented = False
+        try:
+            database_manager.pool.set_trace_callback(None)
+        except sqlite3.ProgrammingError:
+            pass
+
+    # ----| the methods being timed on this thread, innermost last, each with the statements it has run |---- #
+    def call_stack(self):
+        stack = getattr(self.local, "stack", None)
+        if stack is None:
+            stack = self.local.stack = []
+        return stack
+
+    def timed(self, name, method):
+        def timed_method(*args, **kwargs):
+            stack = self.call_stack()
+            statements = []
+            stack.append(statements)
+            result = None
+            start = time.perf_counter()
+            try:
+                result = method(*args, **kwargs)
+                return result
+            finally:
+                end = time.perf_counter()
+                stack.pop()
+                self.record_call(name, start, end, returned_rows(result), statements, args, outermost=not stack)
+        timed_method.__name__ = name
+        return timed_method
+
+    def trace(self, sql):
+        # ----| statements sqlite runs inside another one (full text index lookups, triggers) start with -- |---- #
+        if sql.startswith("--"):
+            return
+        now = time.perf_counter()
+        stack = self.call_stack()
+        if stack:
+            stack[-1].append((now, sql))
+            return
+        with self.lock:
+            self.statements.setdefault(normalized_sql(sql), TimingStats()).add(0.0)
+            self.commits += sql.startswith("COMMIT")
+
+    def record_call(self, name, start, end, rows, statements, args, outermost):
+        elapsed_ms = (end - start) * 1000
+        timed_statements = []
+        for number, (statement_start, sql) in enumerate(statements):
+            statement_end = statements[number + 1][0] if number + 1 < len(statements) else end
+            timed_statements.append((sql, (statement_end - statement_start) * 1000))
+
+        with self.lock:
+            self.methods.setdefault(name, TimingStats()).add(elapsed_ms, rows)
+            for sql, statement_ms in timed_statements:
+                self.statements.setdefault(normalized_sql(sql), TimingStats()).add(statement_ms)
+                self.commits += sql.startswith("COMMIT")
+
+        if outermost and elapsed_ms >= SLOW_CALL_MS and self.slow_logger:
+            arguments = ", ".join(repr(argument)[:60] for argument in args)
+            lines = [f"{elapsed_ms:.1f} ms {name}({arguments}) rows={rows}"]
+            lines += [
+                f"    {statement_ms:8.1f} ms {WHITESPACE_PATTERN.sub(' ', sql).strip()[:300]}"
+                for sql, statement_ms in timed_statements
+            ]
+            self.slow_logger.info("\n".join(lines))
+
+    def snapshot(self):
+        with self.lock:
+            return {
+                "enabled": self.enabled,
+                "since": self.started.isoformat(timespec="seconds"),
+                "slow_call_ms": SLOW_CALL_MS,
+                "slow_log": self.log_path,
+                "commits": self.commits,
+                "methods": {
+                    name: stats.as_dict()
+                    for name, stats in sorted(self.methods.items(), key=lambda item: -item[1].total_ms)
+                },
+                "statements": {
+                    sql: stats.as_dict()
+                    for sql, stats in sorted(self.statements.items(), key=lambda item: -item[1].total_ms)
+                },
+            }
+
+    def dump_json(self, file_path):
+        with open(file_path, "w", encoding="utf-8") as handle:
+            json.dump(self.snapshot(), handle, indent=2)
+
+
+# ----| the one instance every DBManager registers with |---- #
+instrumentation = Instrumentation()
@@ -0,0 +1,328 @@
+# ----| schema migrations, PRAGMA user_version holds the number of migrations already applied |---- #
+# ----| migrations are only ever appended, an existing one must never be edited once released |---- #
+
+
+# ----| version 1: the original tables, IF NOT EXISTS so databases created before versioning pass through |---- #
+def create_base_tables(cursor):
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS decks (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT NOT NULL,
+            created TEXT DEFAULT CURRENT_TIMESTAMP,
+            total_cards INTEGER NOT NULL DEFAULT 0,
+            new_cards INTEGER NOT NULL DEFAULT 0,
+            due_cards INTEGER NOT NULL DEFAULT 0
+        )
+    """)
+
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS cards (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            deck_id INTEGER NOT NULL,
+            front TEXT NOT NULL,
+            back TEXT NOT NULL,
+            front_image_filename TEXT,
+            back_image_filename  TEXT,
+            status TEXT NOT NULL DEFAULT 'new',
+            next_review TEXT,
+            repetition INTEGER DEFAULT 0,
+            interval INTEGER DEFAULT 0,
+            ease_factor REAL DEFAULT 2.5,
+            created TEXT DEFAULT CURRENT_TIMESTAMP,
+            FOREIGN KEY(deck_id) REFERENCES decks(id) ON DELETE CASCADE
+        )
+    """)
+
+
+# ----| version 2: indexes for the per deck lookups, so none of them scan the whole cards table |---- #
+def add_lookup_indexes(cursor):
+    # ----| learn queue: deck_id AND status = 'new' ORDER BY created |---- #
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_cards_deck_status_created ON cards (deck_id, status, created)")
+    # ----| review queue and deck stats: deck_id AND next_review <= ?, status included so counting is index only |---- #
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_cards_deck_next_review ON cards (deck_id, next_review, status)")
+    # ----| deck lookups by name and the name ordered deck list |---- #
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_decks_name ON decks (name)")
+
+
+# ----| version 3: global next_review order, used to find the next moment any card becomes due |---- #
+def add_next_review_index(cursor):
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_cards_next_review ON cards (next_review, deck_id)")
+
+
+# ----| version 4: total_cards/new_cards kept exact by triggers, one row update per card write |---- #
+def add_deck_counter_triggers(cursor):
+    cursor.execute("""
+        CREATE TRIGGER IF NOT EXISTS trg_cards_insert_counters AFTER INSERT ON cards
+        BEGIN
+            UPDATE decks
+            SET total_cards = total_cards + 1, new_cards = new_cards + (NEW.status = 'new')
+            WHERE id = NEW.deck_id;
+        END
+    """)
+
+    cursor.execute("""
+        CREATE TRIGGER IF NOT EXISTS trg_cards_delete_counters AFTER DELETE ON cards
+        BEGIN
+            UPDATE decks
+            SET total_cards = total_cards - 1, new_cards = new_cards - (OLD.status = 'new')
+            WHERE id = OLD.deck_id;
+        END
+    """)
+
+    cursor.execute("""
+        CREATE TRIGGER IF NOT EXISTS trg_cards_update_counters AFTER UPDATE OF status, deck_id ON cards
+        WHEN OLD.status IS NOT NEW.status OR OLD.deck_id IS NOT NEW.deck_id
+        BEGIN
+            UPDATE decks
+            SET total_cards = total_cards - 1, new_cards = new_cards - (OLD.status = 'new')
+            WHERE id = OLD.deck_id;
+            UPDATE decks
+            SET total_cards = total_cards + 1, new_cards = new_cards + (NEW.status = 'new')
+            WHERE id = NEW.deck_id;
+        END
+    """)
+
+    # ----| counters written before the triggers existed may be stale, start from exact values |---- #
+    cursor.execute("""
+        UPDATE decks
+        SET total_cards = (SELECT COUNT(*) FROM cards WHERE cards.deck_id = decks.id),
+            new_cards = (SELECT COUNT(*) FROM cards WHERE cards.deck_id = decks.id AND cards.status = 'new')
+    """)
+
+
+# ----| version 5: cards of a deck in id order, for the paged card list in the deck editor |---- #
+def add_deck_card_order_index(cursor):
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_cards_deck ON cards (deck_id)")
+
+
+# ----| version 6: plain text of both sides for the card list and search, NULL until it has been filled in, |---- #
+# ----| existing cards are filled in by DBManager.backfill_card_texts in the background, the partial index only |---- #
+# ----| holds the cards that still need it so finding them stays cheap and it is empty once the backfill is done |---- #
+def add_card_text_columns(cursor):
+    cursor.execute("ALTER TABLE cards ADD COLUMN front_text TEXT")
+    cursor.execute("ALTER TABLE cards ADD COLUMN back_text TEXT")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_cards_missing_text ON cards (id) WHERE front_text IS NULL")
+
+
+# ----| version 7: full text index over the plain text of both sides, an external content FTS5 table so the text |---- #
+# ----| is not stored twice, kept in step with cards by triggers (study answers don't touch the text columns, so |---- #
+# ----| they never fire the update trigger), the prefix indexes keep search-as-you-type prefixes from merging |---- #
+# ----| the doclists of every word that starts with them |---- #
+def add_card_search_index(cursor):
+    cursor.execute("""
+        CREATE VIRTUAL TABLE IF NOT EXISTS cards_fts USING fts5(
+            front_text, back_text,
+            content = 'cards', content_rowid = 'id',
+            tokenize = 'unicode61 remove_diacritics 2',
+            prefix = '2 3 4'
+        )
+    """)
+
+    cursor.execute("""
+        CREATE TRIGGER IF NOT EXISTS trg_cards_fts_insert AFTER INSERT ON cards
+        BEGIN
+            INSERT INTO cards_fts (rowid, front_text, back_text) VALUES (NEW.id, NEW.front_text, NEW.back_text);
+        END
+    """)
+
+    cursor.execute("""
+        CREATE TRIGGER IF NOT EXISTS trg_cards_fts_delete AFTER DELETE ON cards
+        BEGIN
+            INSERT INTO cards_fts (cards_fts, rowid, front_text, back_text)
+            VALUES ('delete', OLD.id, OLD.front_text, OLD.back_text);
+        END
+    """)
+
+    cursor.execute("""
+        CREATE TRIGGER IF NOT EXISTS trg_cards_fts_update AFTER UPDATE OF front_text, back_text ON cards
+        BEGIN
+            INSERT INTO cards_fts (cards_fts, rowid, front_text, back_text)
+            VALUES ('delete', OLD.id, OLD.front_text, OLD.back_text);
+            INSERT INTO cards_fts (rowid, front_text, back_text) VALUES (NEW.id, NEW.front_text, NEW.back_text);
+        END
+    """)
+
+    # ----| index the cards that are already there |---- #
+    cursor.execute("INSERT INTO cards_fts (cards_fts) VALUES ('rebuild')")
+
+
+# ----| version 8: how many card sides use each image file, kept by triggers, a file whose count drops to 0 is |---- #
+# ----| deleted by DBManager.release_unreferenced_images, the partial index only holds those |---- #
+def add_image_refcounts(cursor):
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS images (
+            filename TEXT PRIMARY KEY,
+            refcount INTEGER NOT NULL DEFAULT 0
+        ) WITHOUT ROWID
+    """)
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_images_unreferenced ON images (filename) WHERE refcount <= 0")
+
+    reference = """
+        INSERT INTO images (filename, refcount) SELECT {side}, 1 WHERE {side} IS NOT NULL {condition}
+        ON CONFLICT (filename) DO UPDATE SET refcount = refcount + 1;
+    """
+    release = """
+        UPDATE images SET refcount = refcount - 1 WHERE filename = {side} {condition};
+    """
+    sides = ("front_image_filename", "back_image_filename")
+
+    cursor.execute(
+        "CREATE TRIGGER IF NOT EXISTS trg_cards_images_insert AFTER INSERT ON cards BEGIN "
+        + "".join(reference.format(side=f"NEW.{side}", condition="") for side in sides)
+        + " END"
+    )
+    cursor.execute(
+        "CREATE TRIGGER IF NOT EXISTS trg_cards_images_delete AFTER DELETE ON cards BEGIN "
+        + "".join(release.format(side=f"OLD.{side}", condition="") for side in sides)
+        + " END"
+    )
+    cursor.execute(
+        "CREATE TRIGGER IF NOT EXISTS trg_cards_images_update AFTER UPDATE OF "
+        + ", ".join(sides) + " ON cards BEGIN "
+        + "".join(
+            release.format(side=f"OLD.{side}", condition=f"AND OLD.{side} IS NOT NEW.{side}")
+            + reference.format(side=f"NEW.{side}", condition=f"AND OLD.{side} IS NOT NEW.{side}")
+            for side in sides
+        )
+        + " END"
+    )
+
+    # ----| count the images of the cards that are already there |---- #
+    cursor.execute("""
+        INSERT OR REPLACE INTO images (filename, refcount)
+        SELECT filename, COUNT(*) FROM (
+            SELECT front_image_filename AS filename FROM cards WHERE front_image_filename IS NOT NULL
+            UNION ALL
+            SELECT back_image_filename FROM cards WHERE back_image_filename IS NOT NULL
+        )
+        GROUP BY filename
+    """)
+
+
+# ----| version 9: next_review and created as integer epoch seconds, compared and sorted as numbers through |---- #
+# ----| the new indexes, the text columns stay for cards written by older versions, DBManager.convert_card_timestamps |---- #
+# ----| fills the new columns in the background a batch at a time, the partial index holds the cards it hasn't |---- #
+# ----| reached yet, the reads only look at the text columns while it isn't empty |---- #
+def add_epoch_timestamp_columns(cursor):
+    cursor.execute("ALTER TABLE cards ADD COLUMN next_review_at INTEGER")
+    cursor.execute("ALTER TABLE cards ADD COLUMN created_at INTEGER")
+
+    cursor.execute("DROP INDEX IF EXISTS idx_cards_deck_status_created")
+    cursor.execute("DROP INDEX IF EXISTS idx_cards_deck_next_review")
+    cursor.execute("DROP INDEX IF EXISTS idx_cards_next_review")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_cards_deck_status_created_at ON cards (deck_id, status, created_at)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_cards_deck_next_review_at ON cards (deck_id, next_review_at, status)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_cards_next_review_at ON cards (next_review_at, deck_id)")
+    cursor.execute(
+        "CREATE INDEX IF NOT EXISTS idx_cards_unconverted_timestamps ON cards (id) WHERE created_at IS NULL"
+    )
+
+
+# ----| version 10: append-only log with one row per study answer, written in the same transaction as the card's |---- #
+# ----| new state (DBManager.save_card_states), reviewed_at in epoch seconds, no foreign key so the history of a |---- #
+# ----| deleted card is kept, deck_id is copied in so per deck numbers never have to look at cards |---- #
+def add_review_log(cursor):
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS revlog (
+            id INTEGER PRIMARY KEY,
+            card_id INTEGER NOT NULL,
+            deck_id INTEGER NOT NULL,
+            reviewed_at INTEGER NOT NULL,
+            grade INTEGER NOT NULL,
+            previous_interval INTEGER NOT NULL,
+            interval INTEGER NOT NULL,
+            ease_factor REAL NOT NULL,
+            answer_ms INTEGER
+        )
+    """)
+    # ----| reviews of a period (per day numbers), and the history of one card |---- #
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_revlog_reviewed_at ON revlog (reviewed_at)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_revlog_card ON revlog (card_id, reviewed_at)")
+
+
+# ----| version 11: per local day and deck rollup of revlog, kept by a trigger on every answer logged, so the |---- #
+# ----| statistics window reads a few rows a day instead of the whole history, day counts days since |---- #
+# ----| 1970-01-01 in local time, a new card's first answer has previous_interval 0, retention is the share of |---- #
+# ----| the other answers graded 3 or better |---- #
+def add_daily_stats(cursor):
+    cursor.execute("""
+        CREATE TABLE IF NOT EXISTS daily_stats (
+            day INTEGER NOT NULL,
+            deck_id INTEGER NOT NULL,
+            new_answers INTEGER NOT NULL DEFAULT 0,
+            review_answers INTEGER NOT NULL DEFAULT 0,
+            passed INTEGER NOT NULL DEFAULT 0,
+            answer_ms INTEGER NOT NULL DEFAULT 0,
+            timed_answers INTEGER NOT NULL DEFAULT 0,
+            PRIMARY KEY (day, deck_id)
+        ) WITHOUT ROWID
+    """)
+
+    day = "CAST(strftime('%s', {reviewed_at}, 'unixepoch', 'localtime') AS INTEGER) / 86400"
+    # ----| new_answers, review_answers, passed, answer_ms and timed_answers of one revlog row |---- #
+    counts = """
+        {row}previous_interval = 0, {row}previous_interval > 0, {row}previous_interval > 0 AND {row}grade >= 3,
+        COALESCE({row}answer_ms, 0), {row}answer_ms IS NOT NULL
+    """
+    cursor.execute(f"""
+        CREATE TRIGGER IF NOT EXISTS trg_revlog_daily_stats AFTER INSERT ON revlog
+        BEGIN
+            INSERT INTO daily_stats (day, deck_id, new_answers, review_answers, passed, answer_ms, timed_answers)
+            VALUES ({day.format(reviewed_at="NEW.reviewed_at")}, NEW.deck_id, {counts.format(row="NEW.")})
+            ON CONFLICT (day, deck_id) DO UPDATE SET
+                new_answers = new_answers + excluded.new_answers,
+                review_answers = review_answers + excluded.review_answers,
+                passed = passed + excluded.passed,
+                answer_ms = answer_ms + excluded.answer_ms,
+                timed_answers = timed_answers + excluded.timed_answers;
+        END
+    """)
+
+    # ----| roll up the answers that are already logged |---- #
+    cursor.execute(f"""
+        INSERT OR REPLACE INTO daily_stats (day, deck_id, new_answers, review_answers, passed, answer_ms, timed_answers)
+        SELECT day, deck_id, SUM(new_answer), SUM(review_answer), SUM(passed), SUM(answer_ms), SUM(timed)
+        FROM (
+            SELECT {day.format(reviewed_at="reviewed_at")} AS day, deck_id,
+                   previous_interval = 0 AS new_answer, previous_interval > 0 AS review_answer,
+                   previous_interval > 0 AND grade >= 3 AS passed, COALESCE(answer_ms, 0) AS answer_ms,
+                   answer_ms IS NOT NULL AS timed
+            FROM revlog
+        )
+        GROUP BY day, deck_id
+    """)
+
+
+MIGRATIONS = [
+    create_base_tables,
+    add_lookup_indexes,
+    add_next_review_index,
+    add_deck_counter_triggers,
+    add_deck_card_order_index,
+    add_card_text_columns,
+    add_card_search_index,
+    add_image_refcounts,
+    add_epoch_timestamp_columns,
+    add_review_log,
+    add_daily_stats,
+]
+
+SCHEMA_VERSION = len(MIGRATIONS)
+
+
+# ----| applies every pending migration, each one in its own transaction together with its version bump |---- #
+def migrate(connection):
+    version = connection.execute("PRAGMA user_version").fetchone()[0]
+
+    for number, migration in enumerate(MIGRATIONS[version:], start=version + 1):
+        cursor = connection.cursor()
+        try:
+            cursor.execute("BEGIN")
+            migration(cursor)
+            cursor.execute(f"PRAGMA user_version = {number}")
+            connection.commit()
+        except Exception:
+            connection.rollback()
+            raise
+
+    return version
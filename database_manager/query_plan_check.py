@@ -0,0 +1,153 @@
+import os
+import re
+import sys
+import tempfile
+
+from database_manager.db_manager import DBManager
+from database_manager import sm2
+
+
+# ----| Checks the EXPLAIN QUERY PLAN of every statement DBManager runs, so index regressions get caught. |---- #
+# ----| Run from the project folder with: python -m database_manager.query_plan_check, the test suite runs it |---- #
+# ----| as well (tests/test_query_plans.py, python -m pytest) |---- #
+
+# ----| cards is the table that grows, it must always be searched through an index and never sorted on the fly |---- #
+FORBIDDEN_PLAN_STEPS = [
+    re.compile(r"^SCAN cards\b"),
+    re.compile(r"^USE TEMP B-TREE"),
+]
+# ----| a filtered statement must not scan any table, only listing every deck may walk the decks table |---- #
+FORBIDDEN_FILTERED_PLAN_STEPS = [
+    re.compile(r"^SCAN "),
+]
+
+
+def is_bad_step(statement, step, partial_indexes=()):
+    # ----| a partial index only holds the rows matching its own WHERE, walking it is not a full scan |---- #
+    scanned_index = re.search(r"^SCAN \w+ USING (?:COVERING )?INDEX (\w+)", step)
+    if scanned_index and scanned_index.group(1) in partial_indexes:
+        return False
+    # ----| a virtual table "scan" with an index number is the FTS5 lookup itself |---- #
+    if re.search(r"^SCAN \w+ VIRTUAL TABLE INDEX \d+:\S", step):
+        return False
+
+    # ----| only a WHERE on the outer statement counts, subqueries in parentheses are dropped first |---- #
+    outer_statement = statement
+    while re.search(r"\([^()]*\)", outer_statement):
+        outer_statement = re.sub(r"\([^()]*\)", "", outer_statement)
+
+    rules = FORBIDDEN_PLAN_STEPS
+    if " WHERE " in outer_statement.upper():
+        rules = rules + FORBIDDEN_FILTERED_PLAN_STEPS
+    return any(rule.search(step) for rule in rules)
+
+
+def exercise_db_manager(db):
+    db.add_deck("Deck A")
+    db.add_deck("Deck B")
+    db.check_existing("Deck A")
+    deck_id = db.get_deck_id_by_name("Deck A")
+    db.rename_deck("Deck C", deck_id)
+    db.get_all_decks()
+
+    for number in range(20):
+        db.add_card(deck_id, f"<p>front {number}</p>", f"<p>back {number}</p>")
+    card_ids = [row[0] for row in db.get_deck_cards(deck_id)]
+    list(db.iter_deck_cards(deck_id))
+    db.get_deck_cards_page(deck_id, card_ids[5], 5)
+    db.get_card(card_ids[0])
+    db.get_card_texts(card_ids[0])
+    db.search_cards("front")
+    db.search_cards("new fro", deck_id, 10, 10)
+    db.connection.execute("UPDATE cards SET front_text = NULL WHERE id = ?", (card_ids[1],))
+    db.connection.commit()
+    db.count_missing_card_texts()
+    db.backfill_card_texts(batch_size=5)
+    # ----| a card as an older version left it, so the reads of the text timestamps are checked as well |---- #
+    db.connection.execute(
+        "UPDATE cards SET created_at = NULL, next_review_at = NULL, created = ?, next_review = ? WHERE id = ?",
+        ("2024-01-01T10:00:00.123456", "2024-01-02T10:00:00", card_ids[2])
+    )
+    db.connection.commit()
+    db.check_legacy_timestamps()
+    db.get_due_cards(deck_id)
+    db.get_next_due_time()
+    db.refresh_deck_stats()
+    db.get_deck_cards_page(deck_id, 0, 5)
+    db.count_unconverted_timestamps()
+    db.convert_card_timestamps(batch_size=5)
+    db.get_deck_card_count(deck_id)
+
+    db.update_card(card_ids[0], "<p>new front</p>", "<p>new back</p>")
+    db.update_card(card_ids[1], "<p>front</p>", "<p>back</p>", "a.png", "b.png")
+    db.update_card(card_ids[2], "<p>front</p>", "<p>back</p>", "a.png")
+    db.update_card(card_ids[1], "<p>front</p>", "<p>back</p>", "c.png", "b.png")
+    db.get_referenced_images(["a.png", "b.png", "z.png"])
+    for card_id in card_ids[:10]:
+        db.update_card_sm2(card_id, 3, deck_id)
+        db.get_sm2_intervals(card_id)
+    db.update_cards_sm2([(card_ids[0], 4), (card_ids[0], 5)])
+    db.save_card_states([(card["id"], sm2.next_state(card, 4)) for card in db.get_new_cards(deck_id)[:3]])
+    db.get_new_cards(deck_id)
+    db.get_due_cards(deck_id)
+    db.get_card_reviews(card_ids[0])
+    db.get_reviews_between(0, 2 ** 40)
+    db.get_daily_stats(0)
+    db.get_daily_stats(0, deck_id)
+    db.get_due_times(2 ** 40)
+    db.get_due_times(2 ** 40, deck_id)
+    db.update_deck_stats(deck_id)
+    db.refresh_deck_stats()
+    db.refresh_deck_stats([deck_id], changed_only=False)
+    db.get_next_due_time()
+    db.check_deck_counters()
+    db.delete_cards(deck_id, card_ids[-3:])
+    db.del_deck(db.get_deck_id_by_name("Deck B"))
+
+
+def collect_statements(db):
+    statements = []
+    db.pool.set_trace_callback(statements.append)
+    try:
+        exercise_db_manager(db)
+    finally:
+        db.pool.set_trace_callback(None)
+
+    # ----| the trace has the bound values expanded, so one statement shape is only kept once |---- #
+    unique = {}
+    for statement in statements:
+        statement = " ".join(statement.split())
+        if statement.split(" ", 1)[0].upper() not in ("SELECT", "UPDATE", "DELETE"):
+            continue
+        shape = re.sub(r"'[^']*'|\b\d+(\.\d+)?\b", "?", statement)
+        unique.setdefault(shape, statement)
+    return list(unique.values())
+
+
+def check_query_plans():
+    problems = []
+    with tempfile.TemporaryDirectory() as temp_dir:
+        db = DBManager(os.path.join(temp_dir, "flashcard_app.db"))
+        try:
+            partial_indexes = {
+                name for name, sql in db.connection.execute("SELECT name, sql FROM sqlite_master WHERE type = 'index'")
+                if sql and " WHERE " in sql.upper()
+            }
+            for statement in collect_statements(db):
+                plan = [row[3] for row in db.connection.execute(f"EXPLAIN QUERY PLAN {statement}")]
+                bad_steps = [step for step in plan if is_bad_step(statement, step, partial_indexes)]
+                if bad_steps:
+                    problems.append((statement, plan))
+        finally:
+            db.close()
+    return problems
+
+
+if __name__ == "__main__":
+    found = check_query_plans()
+    for query, query_plan in found:
+        print(query)
+        for plan_step in query_plan:
+            print(f"    {plan_step}")
+    print(f"{len(found)} statement(s) with a full scan or temp sort")
+    sys.exit(1 if found else 0)
@@ -0,0 +1,62 @@
+from datetime import datetime, timedelta
+
+# ----| SM-2 scheduling in plain python, works on a card dict with status, repetition, interval and ease_factor |---- #
+# ----| so the study window can preview and grade cards without asking the database |---- #
+
+MIN_EASE_FACTOR = 1.3
+START_EASE_FACTOR = 2.5
+
+
+def adjusted_ease_factor(ease_factor, grade):
+    ease_factor = ease_factor + (0.1 - (5 - grade) * (0.08 + (5 - grade) * 0.02))
+    return max(MIN_EASE_FACTOR, ease_factor)
+
+
+# ----| returns the card's new state after an answer with the given grade, the card itself is not changed, |---- #
+# ----| next_review is in epoch seconds |---- #
+def next_state(card, grade, now=None):
+    now = now or datetime.now()
+    status = card["status"]
+    repetition = card["repetition"]
+    interval = card["interval"]
+    ease_factor = card["ease_factor"]
+
+    if status == "new":
+        repetition = 0
+        interval = 1
+        ease_factor = START_EASE_FACTOR
+        status = "review"
+    else:
+        if grade < 3:
+            repetition = 0
+            interval = 1
+            ease_factor = max(MIN_EASE_FACTOR, ease_factor)
+        else:
+            if repetition == 0:
+                interval = 1
+            elif repetition == 1:
+                interval = 6
+            else:
+                ease_factor = adjusted_ease_factor(ease_factor, grade)
+                interval = round(interval * ease_factor)
+            repetition += 1
+
+    # next_review = int((now + timedelta(seconds=interval)).timestamp())  # testing
+    next_review = int((now + timedelta(days=interval)).timestamp())
+
+    return {
+        "status": status,
+        "repetition": repetition,
+        "interval": interval,
+        "ease_factor": ease_factor,
+        "next_review": next_review,
+    }
+
+
+# ----| the intervals shown on the hard/good/easy buttons, False while the card is still in its first steps |---- #
+def preview_intervals(card):
+    if card["repetition"] <= 2:
+        return False
+
+    new_intervals = [round(card["interval"] * adjusted_ease_factor(card["ease_factor"], grade)) for grade in (3, 4, 5)]
+    return {"hard_interval": new_intervals[0], "good_interval": new_intervals[1], "easy_interval": new_intervals[2]}
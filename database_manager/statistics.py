@@ -0,0 +1,113 @@
+import time
+from datetime import date, datetime, timedelta
+import numpy as np
+
+# ----| Numbers for the statistics window, worked out with numpy over whole columns: the answers come from the |---- #
+# ----| daily_stats rollup (a row per day and deck, see migrations.add_daily_stats) and the forecast from the |---- #
+# ----| next_review_at of the cards due in the coming days, each loaded with one query. No Qt here, so |---- #
+# ----| load_statistics can run on the thread pool. |---- #
+
+EPOCH_DAY = date(1970, 1, 1)
+FORECAST_DAYS = 30
+DAILY_STATS_COLUMNS = ("day", "deck_id", "new_answers", "review_answers", "passed", "answer_ms", "timed_answers")
+
+
+# ----| days since 1970-01-01 in local time, the day column of daily_stats |---- #
+def day_number(timestamp=None):
+    return (datetime.fromtimestamp(timestamp or time.time()).date() - EPOCH_DAY).days
+
+
+def day_date(day):
+    return EPOCH_DAY + timedelta(days=int(day))
+
+
+# ----| epoch seconds of local midnight at the start of a day |---- #
+def day_start(day):
+    return int(datetime.combine(day_date(day), datetime.min.time()).timestamp())
+
+
+# ----| a longer period is charted per week or per month of 30 days, so there are never more than ~50 bars |---- #
+def bucket_size(days):
+    if days <= 31:
+        return 1
+    if days <= 366:
+        return 7
+    return 30
+
+
+def daily_stats_columns(rows):
+    table = np.array(rows, dtype=np.int64).reshape(-1, len(DAILY_STATS_COLUMNS))
+    return dict(zip(DAILY_STATS_COLUMNS, table.T))
+
+
+# ----| a numpy array of the ratio, nan where there is nothing to divide by |---- #
+def safe_ratio(numerator, denominator):
+    numerator = np.asarray(numerator, dtype=float)
+    denominator = np.asarray(denominator, dtype=float)
+    return np.divide(numerator, denominator, out=np.full(numerator.shape, np.nan), where=denominator > 0)
+
+
+# ----| the rollup columns of the days days from first_day, summed per bucket of bucket_size days |---- #
+def answer_statistics(columns, first_day, days, deck_names):
+    size = bucket_size(days)
+    buckets = -(-days // size)
+    index = (columns["day"] - first_day) // size
+
+    def per_bucket(name):
+        return np.bincount(index, weights=columns[name], minlength=buckets)[:buckets]
+
+    new_answers = per_bucket("new_answers")
+    review_answers = per_bucket("review_answers")
+    passed = per_bucket("passed")
+
+    # ----| answer time per deck, largest first, decks that no longer exist are summed up as one |---- #
+    deck_ids, deck_index = np.unique(columns["deck_id"], return_inverse=True)
+    deck_minutes = np.bincount(deck_index, weights=columns["answer_ms"], minlength=len(deck_ids)) / 60000
+    deck_time = {}
+    for deck_id, minutes in zip(deck_ids.tolist(), deck_minutes.tolist()):
+        name = deck_names.get(deck_id, "(deleted decks)")
+        deck_time[name] = deck_time.get(name, 0) + minutes
+    deck_time = sorted(deck_time.items(), key=lambda item: -item[1])
+
+    answers = int(columns["new_answers"].sum() + columns["review_answers"].sum())
+    timed_answers = int(columns["timed_answers"].sum())
+    answer_ms = int(columns["answer_ms"].sum())
+    return {
+        "bucket_size": size,
+        "labels": [day_date(first_day + bucket * size).strftime("%b %d") for bucket in range(buckets)],
+        "new_answers": new_answers,
+        "review_answers": review_answers,
+        "retention": safe_ratio(passed, review_answers) * 100,
+        "answers": answers,
+        "answers_per_day": answers / days,
+        "overall_retention": float(safe_ratio(columns["passed"].sum(), columns["review_answers"].sum()) * 100),
+        "minutes": answer_ms / 60000,
+        "seconds_per_answer": answer_ms / 1000 / timed_answers if timed_answers else 0,
+        "deck_time": deck_time,
+    }
+
+
+# ----| cards falling due on each of the coming days, the ones already overdue count for today |---- #
+def forecast(due_times, today, forecast_days=FORECAST_DAYS):
+    # ----| local midnights, so a daylight saving change inside the period still splits the days right |---- #
+    boundaries = np.array([day_start(today + offset) for offset in range(forecast_days + 1)], dtype=np.int64)
+    due_times = np.asarray(due_times, dtype=np.int64)
+    day_index = np.clip(np.searchsorted(boundaries, due_times, side="right") - 1, 0, forecast_days - 1)
+    return {
+        "labels": [day_date(today + offset).strftime("%b %d") for offset in range(forecast_days)],
+        "due": np.bincount(day_index, minlength=forecast_days)[:forecast_days],
+        "overdue": int(np.count_nonzero(due_times < boundaries[0])),
+    }
+
+
+# ----| everything the statistics window shows for the last days days, of one deck or of all of them |---- #
+def load_statistics(database_manager, deck_id=None, days=30, forecast_days=FORECAST_DAYS):
+    today = day_number()
+    first_day = today - days + 1
+    deck_names = {deck[0]: deck[1] for deck in database_manager.get_all_decks()}
+    columns = daily_stats_columns(database_manager.get_daily_stats(first_day, deck_id))
+    due_times = database_manager.get_due_times(day_start(today + forecast_days), deck_id)
+
+    statistics = answer_statistics(columns, first_day, days, deck_names)
+    statistics["forecast"] = forecast(due_times, today, forecast_days)
+    return statistics
@@ -1,36 +1,79 @@
 import os
 import sys
+from datetime import datetime
 
-from PySide6.QtWidgets import QApplication, QMainWindow, QWidget, QInputDialog, QMessageBox, QHeaderView
-from PySide6.QtGui import QStandardItemModel, QStandardItem, QIcon
-from PySide6.QtCore import Qt, QTimer
+from PySide6.QtWidgets import (QApplication, QMainWindow, QWidget, QInputDialog, QMessageBox, QHeaderView,
+                               QFileDialog, QProgressBar)
+from PySide6.QtGui import QIcon, QKeySequence, QShortcut
+from PySide6.QtCore import QTimer, Signal
 from windows.mainwindow import build_ui
 from database_manager.db_manager import DBManager
-from windows.card_editor_window import CardEditorWindow
-from windows.edit_deck_window import EditDeckWindow
-from windows.study_window import StudyWindow
+from database_manager.grade_writer import GradeWriter
+from windows.db_task_thread import DBTaskThread
+from windows.deck_list_model import DeckListModel
+# ----| the other windows, and the import/export code, are imported the first time they are opened, so |---- #
+# ----| startup only loads what the main window needs |---- #
+
+# ----| QTimer intervals are a signed 32 bit millisecond count, a longer wait is done in several hops |---- #
+MAX_TIMER_INTERVAL_MS = 2**31 - 1
 
 
 class MainWindow(QMainWindow):
-    def __init__(self):
+    # ---------------| emitted from the grade writer thread, delivered on the GUI thread |--------------- #
+    grades_written = Signal(list)
+    grades_failed = Signal(int, str, bool)
+
+    def __init__(self, db_path=None):
         super().__init__()
         self.setWindowTitle("Flashcard App")
         self.setMinimumSize(800, 600)
-        self.database_manager = DBManager()
+        self.database_manager = DBManager(db_path)
         self.new_card_window = None
         self.deck_edit_window = None
         self.learn_window = None
         self.review_window = None
+        self.search_window = None
+        self.diagnostics_window = None
+        self.statistics_window = None
+        self.task_thread = None
+
+        # -------------------------|background writer for study answers|------------------------- #
+        self.grade_writer = GradeWriter(self.database_manager, on_written=self.grades_written.emit,
+                                        on_failed=self.grades_failed.emit)
+        self.grades_written.connect(self.decks_written)
+        self.grades_failed.connect(self.grades_not_saved)
 
         status = self.statusBar()
         status.setStyleSheet("color: #3B3B3B;")
         status.showMessage("by ADDag-src")
 
-        # -------------------------|timer to refresh list periodically|------------------------- #
-
-        self.stats_timer = QTimer(self)
-        self.stats_timer.timeout.connect(self.refresh_all_deck_stats)
-        self.stats_timer.start(2000)
+        # -------------------------|progress bar for background jobs, hidden while idle|------------------------- #
+        self.task_progress = QProgressBar()
+        self.task_progress.setMaximumWidth(350)
+        self.task_progress.setRange(0, 100)
+        self.task_progress.hide()
+        status.addPermanentWidget(self.task_progress)
+
+        # -------------------------|menu bar|------------------------- #
+        file_menu = self.menuBar().addMenu("File")
+        import_cards_action = file_menu.addAction("Import cards from CSV/TSV...")
+        import_cards_action.triggered.connect(self.import_cards)
+        file_menu.addSeparator()
+        export_deck_action = file_menu.addAction("Export selected deck...")
+        export_deck_action.triggered.connect(self.export_deck_archive)
+        import_deck_action = file_menu.addAction("Import deck archive...")
+        import_deck_action.triggered.connect(self.import_deck_archive)
+        file_menu.addSeparator()
+        clean_images_action = file_menu.addAction("Clean up unused images...")
+        clean_images_action.triggered.connect(self.clean_up_images)
+        statistics_action = self.menuBar().addAction("Statistics")
+        statistics_action.triggered.connect(self.open_statistics_window)
+
+        # -------------------------|single shot timer, armed for the moment the next card becomes due|------------------------- #
+
+        self.due_timer = QTimer(self)
+        self.due_timer.setSingleShot(True)
+        self.due_timer.timeout.connect(self.refresh_all_deck_stats)
 
         # -------------------------|building main window|------------------------- #
         layout, widgets = build_ui()
@@ -47,12 +90,38 @@ class MainWindow(QMainWindow):
         widgets["edit_deck"].clicked.connect(self.edit_deck_window)
         widgets["learn_deck"].clicked.connect(self.learn_deck_window)
         widgets["review"].clicked.connect(self.review_deck_window)
+        widgets["search"].returnPressed.connect(self.search_cards_window)
+
+        # ----| hidden diagnostics window with the database call timings, see database_manager/instrumentation.py |---- #
+        diagnostics_shortcut = QShortcut(QKeySequence("Ctrl+Shift+D"), self)
+        diagnostics_shortcut.activated.connect(self.open_diagnostics_window)
 
         # -------------------------|main container definition|------------------------- #
         container = QWidget()
         container.setLayout(self.layout)
         self.setCentralWidget(container)
 
+        # ----| the list is first shown with the counts stored in the decks table, the due counts are brought |---- #
+        # ----| up to date after the first frame is painted (or straight away if the window starts hidden) |---- #
+        self.startup_pending = True
+        QTimer.singleShot(0, self.schedule_startup)
+
+    def paintEvent(self, event):
+        super().paintEvent(event)
+        if self.startup_pending:
+            QTimer.singleShot(0, self.finish_startup)
+
+    def schedule_startup(self):
+        if not self.isVisible() or self.isMinimized():
+            self.finish_startup()
+
+    def finish_startup(self):
+        if not self.startup_pending:
+            return
+        self.startup_pending = False
+        self.refresh_all_deck_stats()
+        self.convert_card_timestamps()
+
     # -------------------------|add deck method|------------------------- #
     def add_new_deck(self):
         name, ok = QInputDialog.getText(self, "New Deck", "Enter deck name:")
@@ -93,49 +162,88 @@ class MainWindow(QMainWindow):
         if reply == QMessageBox.Yes:
             self.database_manager.del_deck(deck_id)
             self.refresh_deck_list()
+            self.schedule_due_refresh()
 
     # -------------------------|refresh or populate deck method|------------------------- #
+    # ----| the model only signals the rows that changed (windows/deck_list_model.py), a renamed deck moves to |---- #
+    # ----| its new place in the list and is selected again there |---- #
     def refresh_deck_list(self):
         decks = self.database_manager.get_all_decks()
-        header = self.deck_list.horizontalHeader()
-        header.setSectionsClickable(False)
-        header.setHighlightSections(False)
-        header.setSectionResizeMode(QHeaderView.Stretch)
-
         model = self.deck_list.model()
 
-        if not model or model.rowCount() != len(decks):
-            model = QStandardItemModel(len(decks), 4)
-            model.setHorizontalHeaderLabels(["Deck Name", "Total Cards", "Cards to Learn", "Reviews Due"])
+        if not model:
+            model = DeckListModel(self)
             self.deck_list.setModel(model)
+            header = self.deck_list.horizontalHeader()
+            header.setSectionsClickable(False)
+            header.setHighlightSections(False)
+            header.setSectionResizeMode(QHeaderView.Stretch)
 
-        for row, (deck_id, name, created, total, learn, due) in enumerate(decks):
-            values = [name, str(total), str(learn), str(due)]
-            for col, val in enumerate(values):
-                item = model.item(row, col)
-                if item is None:
-                    item = QStandardItem(val)
-                    item.setTextAlignment(Qt.AlignCenter)
-                    item.setFlags(item.flags() & ~Qt.ItemIsEditable)
-                    model.setItem(row, col, item)
-                else:
-                    item.setText(val)
+        selected_deck_id = self.selected_deck_id()
+        model.set_decks(decks)
 
+        row = model.row_of(selected_deck_id)
+        if row is not None and self.selected_deck_id() != selected_deck_id:
+            self.deck_list.selectRow(row)
+
+    # -------------------------|recount all decks and only touch the cells that changed|------------------------- #
     def refresh_all_deck_stats(self):
-        decks = self.database_manager.get_all_decks()
-        for deck in decks:
-            deck_id = deck[0]
-            self.database_manager.update_deck_stats(deck_id)
+        self.update_deck_rows(self.database_manager.refresh_deck_stats())
+        self.schedule_due_refresh()
+
+    # -------------------------|incremental update for a deck that one of the windows wrote to|------------------------- #
+    def deck_changed(self, deck_id):
+        self.update_deck_rows(self.database_manager.refresh_deck_stats([deck_id], changed_only=False))
+        self.schedule_due_refresh()
+
+    def decks_written(self, deck_ids):
+        for deck_id in deck_ids:
+            self.deck_changed(deck_id)
+
+    # ----| the writer keeps the answers and keeps trying, unless the app was already closing |---- #
+    def grades_not_saved(self, count, error, given_up):
+        if given_up:
+            message = f"{count} answer(s) could not be saved and were lost: {error}"
+        else:
+            message = f"{count} answer(s) could not be saved yet, they will be saved as soon as possible: {error}"
+        QMessageBox.warning(self, "Answers Not Saved", message)
+
+    def deck_edited(self, deck_id):
+        # ----| the deck may have been renamed, which changes its text and position in the list |---- #
         self.refresh_deck_list()
+        self.deck_changed(deck_id)
+
+    def update_deck_rows(self, deck_stats):
+        if not deck_stats:
+            return
+
+        model = self.deck_list.model()
+        if not model or not model.update_stats(deck_stats):
+            self.refresh_deck_list()
+
+    # -------------------------|arm the due timer for the earliest upcoming review, idle otherwise|------------------------- #
+    def schedule_due_refresh(self):
+        next_due = self.database_manager.get_next_due_time()
+        if next_due is None:
+            self.due_timer.stop()
+            return
+
+        delay_ms = int((next_due - datetime.now()).total_seconds() * 1000) + 1
+        self.due_timer.start(min(max(delay_ms, 0), MAX_TIMER_INTERVAL_MS))
+
+    def selected_deck_id(self):
+        selection_model = self.deck_list.selectionModel()
+        selected_indexes = selection_model.selectedRows() if selection_model else []
+        if not selected_indexes:
+            return None
+        return self.deck_list.model().deck_at(selected_indexes[0].row())[0]
 
     def get_selected_deck(self):
         selected_indexes = self.deck_list.selectionModel().selectedRows()
         if not selected_indexes:
             QMessageBox.information(self, "No Selection", "Please select a deck to perform the action on.")
             return
-        selected_row = selected_indexes[0].row()
-        deck_name = self.deck_list.model().item(selected_row, 0).text()
-        deck_id = self.database_manager.get_deck_id_by_name(deck_name)
+        deck_id, deck_name = self.deck_list.model().deck_at(selected_indexes[0].row())
         return deck_name, deck_id
 
     def add_cards_window(self):
@@ -144,24 +252,270 @@ class MainWindow(QMainWindow):
             return
 
         deck_name, deck_id = deck_details
+        from windows.card_editor_window import CardEditorWindow
         self.new_card_window = CardEditorWindow(deck_name, deck_id, self.database_manager)
 
         # -------------------------|signal that a card was added in the add card window|------------------------- #
-        self.new_card_window.card_added.connect(self.refresh_deck_list)
+        self.new_card_window.card_added.connect(self.deck_changed)
         self.new_card_window.show()
 
+    # -------------------------|runs a DBTaskThread job, one at a time, with progress in the status bar|------------------------- #
+    def start_background_task(self, task, description, on_finished, failure_title):
+        if self.task_is_running():
+            return
+
+        self.task_thread = DBTaskThread(self.database_manager, task, self)
+        self.task_thread.progress.connect(self.show_task_progress)
+        self.task_thread.task_finished.connect(lambda result: self.background_task_finished(on_finished, result))
+        self.task_thread.task_failed.connect(lambda error: self.background_task_failed(failure_title, error))
+        self.show_task_progress(0, f"{description} %p%")
+        self.task_thread.start()
+
+    def show_task_progress(self, percent, text):
+        self.task_progress.setFormat(text)
+        self.task_progress.setValue(percent)
+        self.task_progress.show()
+
+    def background_task_finished(self, on_finished, result):
+        self.task_progress.hide()
+        on_finished(result)
+
+    def background_task_failed(self, failure_title, error):
+        self.task_progress.hide()
+        # ----| an import commits batch by batch, what it wrote before failing is shown |---- #
+        self.refresh_deck_list()
+        self.refresh_all_deck_stats()
+        QMessageBox.warning(self, failure_title, error)
+
+    # ----| exit hook, a running background job is stopped between two batches and waited for, then the answers |---- #
+    # ----| still queued in the grade writer are saved before the app quits |---- #
+    def shutdown(self):
+        if self.task_thread and self.task_thread.isRunning():
+            self.task_thread.stop()
+        self.grade_writer.close()
+
+    def task_is_running(self):
+        if self.task_thread and self.task_thread.isRunning():
+            QMessageBox.information(self, "Task Running", "Please wait for the current import or export to finish.")
+            return True
+        return False
+
+    # -------------------------|move the timestamps of cards saved by an older version to epoch seconds, in the background|------------------------- #
+    def convert_card_timestamps(self):
+        missing = self.database_manager.count_unconverted_timestamps() if self.database_manager.legacy_timestamps else 0
+        if not missing:
+            self.backfill_card_texts()
+            return
+
+        def task(database_manager, report_progress):
+            return database_manager.convert_card_timestamps(
+                progress_callback=lambda count: report_progress(
+                    count * 100 // missing, f"Upgrading card schedules: {count} cards %p%"
+                )
+            )
+
+        # ----| the conversion ran on the shared DBManager, which stopped reading the old columns once it was done |---- #
+        def finished(count):
+            self.refresh_all_deck_stats()
+            self.backfill_card_texts()
+
+        self.start_background_task(task, "Upgrading card schedules", finished, "Card Schedule Upgrade Failed")
+
+    # -------------------------|fill in the card list text of cards saved by an older version, in the background|------------------------- #
+    def backfill_card_texts(self):
+        missing = self.database_manager.count_missing_card_texts()
+        if not missing:
+            return
+
+        def task(database_manager, report_progress):
+            return database_manager.backfill_card_texts(
+                progress_callback=lambda count: report_progress(
+                    count * 100 // missing, f"Preparing card previews: {count} cards %p%"
+                )
+            )
+
+        def finished(count):
+            self.statusBar().showMessage(f"Prepared previews for {count} card(s)", 5000)
+
+        self.start_background_task(task, "Preparing card previews", finished, "Card Previews Failed")
+
+    # -------------------------|import a spreadsheet into the selected deck on a background thread|------------------------- #
+    def import_cards(self):
+        if self.task_is_running():
+            return
+
+        deck_details = self.get_selected_deck()
+        if not deck_details:
+            return
+
+        deck_name, deck_id = deck_details
+        file_path, _ = QFileDialog.getOpenFileName(
+            self,
+            "Import Cards",
+            "",
+            "Spreadsheets (*.csv *.tsv *.tab *.txt);;All files (*)"
+        )
+        if not file_path:
+            return
+
+        from database_manager.card_importer import import_cards_file
+
+        # ----| column 1 is the front, column 2 the back, the batches are committed one by one as they go |---- #
+        def task(database_manager, report_progress):
+            return import_cards_file(
+                database_manager, deck_id, file_path,
+                lambda percent, rows: report_progress(percent, f"Importing into '{deck_name}': {rows} cards %p%")
+            )
+
+        def finished(count):
+            self.deck_changed(deck_id)
+            QMessageBox.information(self, "Import Finished", f"Imported {count} card(s) into '{deck_name}'.")
+
+        self.start_background_task(task, f"Importing into '{deck_name}'", finished, "Import Failed")
+
+    # -------------------------|export the selected deck, cards and images, to a zip archive|------------------------- #
+    def export_deck_archive(self):
+        if self.task_is_running():
+            return
+
+        deck_details = self.get_selected_deck()
+        if not deck_details:
+            return
+
+        deck_name, deck_id = deck_details
+        file_path, _ = QFileDialog.getSaveFileName(self, "Export Deck", f"{deck_name}.zip", "Deck archives (*.zip)")
+        if not file_path:
+            return
+        from database_manager.deck_archive import export_deck
+
+        def task(database_manager, report_progress):
+            return export_deck(
+                database_manager, deck_id, deck_name, file_path,
+                lambda percent, cards: report_progress(percent, f"Exporting '{deck_name}': {cards} cards %p%")
+            )
+
+        def finished(count):
+            QMessageBox.information(self, "Export Finished", f"Exported {count} card(s) from '{deck_name}'.")
+
+        self.start_background_task(task, f"Exporting '{deck_name}'", finished, "Export Failed")
+
+    # -------------------------|import a deck archive as a new deck|------------------------- #
+    def import_deck_archive(self):
+        if self.task_is_running():
+            return
+
+        file_path, _ = QFileDialog.getOpenFileName(self, "Import Deck", "", "Deck archives (*.zip)")
+        if not file_path:
+            return
+        from database_manager.deck_archive import import_deck
+
+        def task(database_manager, report_progress):
+            return import_deck(
+                database_manager, file_path,
+                lambda percent, cards: report_progress(percent, f"Importing deck: {cards} cards %p%")
+            )
+
+        def finished(result):
+            deck_name, count = result
+            self.refresh_deck_list()
+            QMessageBox.information(self, "Import Finished", f"Imported {count} card(s) into '{deck_name}'.")
+
+        self.start_background_task(task, "Importing deck", finished, "Import Failed")
+
+    # -------------------------|find the image files no card uses, and delete them once confirmed|------------------------- #
+    def clean_up_images(self):
+        if self.task_is_running():
+            return
+        from database_manager.image_store import collect_garbage
+
+        def scan(database_manager, report_progress):
+            return collect_garbage(
+                database_manager, dry_run=True,
+                progress_callback=lambda checked, files, size: report_progress(
+                    0, f"Checking images: {checked} checked, {files} unused"
+                )
+            )
+
+        def delete(database_manager, report_progress):
+            return collect_garbage(
+                database_manager, dry_run=False,
+                progress_callback=lambda checked, files, size: report_progress(
+                    0, f"Deleting unused images: {files} deleted"
+                )
+            )
+
+        def deleted(report):
+            QMessageBox.information(
+                self, "Images Cleaned Up",
+                f"Deleted {report['files']} unused image file(s), {report['bytes'] / (1024 * 1024):.1f} MB freed."
+            )
+
+        def scanned(report):
+            if not report["files"]:
+                QMessageBox.information(self, "Clean Up Images", "There are no unused images to delete.")
+                return
+            reply = QMessageBox.question(
+                self,
+                "Clean Up Images",
+                f"{report['files']} image file(s) are not used by any card, "
+                f"{report['bytes'] / (1024 * 1024):.1f} MB can be freed.\nDelete them?",
+                QMessageBox.Yes | QMessageBox.No,
+                QMessageBox.No,
+            )
+            if reply == QMessageBox.Yes:
+                self.start_background_task(delete, "Deleting unused images", deleted, "Clean Up Failed")
+
+        self.start_background_task(scan, "Checking images", scanned, "Clean Up Failed")
+
     def edit_deck_window(self):
         deck_details = self.get_selected_deck()
         if not deck_details:
             return
 
         deck_name, deck_id = deck_details
+        from windows.edit_deck_window import EditDeckWindow
         self.deck_edit_window = EditDeckWindow(deck_name, deck_id, self.database_manager)
 
         # -------------------------|signal that an edit happened in deck edit window|------------------------- #
-        self.deck_edit_window.deck_edited.connect(self.refresh_deck_list)
+        self.deck_edit_window.deck_edited.connect(self.deck_edited)
         self.deck_edit_window.show()
 
+    # -------------------------|search every deck, the window keeps searching as the query is edited|------------------------- #
+    def search_cards_window(self):
+        query = self.main_buttons["search"].text().strip()
+        if not query:
+            return
+
+        if self.search_window and self.search_window.isVisible():
+            self.search_window.search_input.setText(query)
+            self.search_window.raise_()
+            self.search_window.activateWindow()
+            return
+
+        from windows.search_window import SearchWindow
+        self.search_window = SearchWindow(self.database_manager, query)
+        self.search_window.show()
+
+    def open_diagnostics_window(self):
+        if not self.diagnostics_window:
+            from windows.diagnostics_window import DiagnosticsWindow
+            log_folder = os.path.join(os.path.dirname(os.path.abspath(self.database_manager.db_path)), "logs")
+            self.diagnostics_window = DiagnosticsWindow(log_folder)
+        self.diagnostics_window.show()
+        self.diagnostics_window.raise_()
+        self.diagnostics_window.activateWindow()
+
+    # ----| the window reads its numbers again every time it is shown, or brought up while already open |---- #
+    def open_statistics_window(self):
+        if not self.statistics_window:
+            from windows.statistics_window import StatisticsWindow
+            self.statistics_window = StatisticsWindow(self.database_manager)
+        elif self.statistics_window.isVisible():
+            self.statistics_window.refresh_decks()
+        self.statistics_window.show()
+        self.statistics_window.raise_()
+        self.statistics_window.activateWindow()
+
     def learn_deck_window(self):
         deck_details = self.get_selected_deck()
         if not deck_details:
@@ -174,10 +528,12 @@ class MainWindow(QMainWindow):
             QMessageBox.information(self, "No Cards", f"No new cards to learn in '{deck_name}'.")
             return
 
-        self.learn_window = StudyWindow(deck_name, deck_id, self.database_manager, "learn", cards)
+        from windows.study_window import StudyWindow
+        self.learn_window = StudyWindow(deck_name, deck_id, self.database_manager, "learn", cards,
+                                        self.grade_writer)
 
         # -------------------------|signal that an card status changed in learn window|------------------------- #
-        self.learn_window.card_stats_changed.connect(self.refresh_deck_list)
+        self.learn_window.card_stats_changed.connect(self.deck_changed)
 
         self.learn_window.show()
 
@@ -193,7 +549,13 @@ class MainWindow(QMainWindow):
             QMessageBox.information(self, "No Cards", f"No cards are due for review in '{deck_name}'.")
             return
 
-        self.review_window = StudyWindow(deck_name, deck_id, self.database_manager, "review", cards)
+        from windows.study_window import StudyWindow
+        self.review_window = StudyWindow(deck_name, deck_id, self.database_manager, "review", cards,
+                                         self.grade_writer)
+
+        # -------------------------|signal that an card status changed in review window|------------------------- #
+        self.review_window.card_stats_changed.connect(self.deck_changed)
+
         self.review_window.show()
 
 
@@ -207,9 +569,15 @@ icon_file = "app-icon.ico" if sys.platform.startswith("win") else "app-icon.png"
 icon_path = os.path.join(base_path, "icons", icon_file)
 
 
-app = QApplication([])
-app.setStyle("Fusion")
-app.setWindowIcon(QIcon(icon_path))
-window = MainWindow()
-window.show()
-app.exec()
+def main():
+    app = QApplication([])
+    app.setStyle("Fusion")
+    app.setWindowIcon(QIcon(icon_path))
+    window = MainWindow()
+    app.aboutToQuit.connect(window.shutdown)
+    window.show()
+    return app.exec()
+
+
+if __name__ == "__main__":
+    sys.exit(main())
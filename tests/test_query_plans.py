@@ -0,0 +1,8 @@
+from database_manager.query_plan_check import check_query_plans
+
+
+# ----| every statement DBManager runs must use an index, no full scan of cards and no temp sort, see |---- #
+# ----| database_manager/query_plan_check.py for the rules and for a readable report of what went wrong |---- #
+def test_no_full_scans_or_temp_sorts():
+    problems = check_query_plans()
+    assert not problems, "\n".join(f"{statement}\n    " + "\n    ".join(plan) for statement, plan in problems)
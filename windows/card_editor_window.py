@@ -1,24 +1,38 @@
 import os
 from PySide6.QtWidgets import (QWidget, QVBoxLayout, QLabel, QTextEdit, QComboBox, QSizePolicy,
                                QPushButton, QMessageBox, QHBoxLayout, QFontComboBox)
-from PySide6.QtGui import QFont, QTextCharFormat, QTextCursor, QImage
+from PySide6.QtGui import QFont, QTextCharFormat, QTextCursor, QTextDocument
 from PySide6.QtCore import Qt, QTimer, Signal, QUrl
-from datetime import datetime
-from urllib.parse import quote
-from pathlib import Path
 import re
+import uuid
+from windows.image_cache import ImageCache
+from windows.image_ingest import ImageIngestSignals, placeholder_image, start_preview, start_ingest
+
+# ----| width a stored image is shown at while editing, the editor is 805 wide at the least |---- #
+EDITOR_IMAGE_WIDTH = 760
+IMAGE_FORMATS = ["png", "jpg", "jpeg", "bmp"]
 
 
 # ----| QTextEdit subclass to ensure that selected text is cleared if clicking in another QTextEdit |---- #
 # ----| and custom behaviour to accept drag and drop images |---- #
 class FlashcardTextEdit(QTextEdit):
-    def __init__(self, name, on_focus_callback, *args, **kwargs):
+    # ---------------| emitted once no dropped image is left to store, False if the last one failed |--------------- #
+    images_ready = Signal(bool)
+
+    def __init__(self, name, on_focus_callback, image_folder_path=None, *args, **kwargs):
         super().__init__(*args, **kwargs)
         self.name = name
         self.on_focus_callback = on_focus_callback
+        self.image_folder_path = image_folder_path
         self.setAcceptDrops(True)
-        self.pending_images = {}
         self.image_filename = None
+        # ----| dropped images not stored yet, token -> {"path", "name" of the image in the document, "store" once |---- #
+        # ----| the card is being saved, "started" once its ingest is running} |---- #
+        self.pending_images = {}
+        self.ingest_signals = ImageIngestSignals()
+        self.ingest_signals.preview_ready.connect(self.preview_ready)
+        self.ingest_signals.finished.connect(self.ingest_finished)
+        self.ingest_signals.failed.connect(self.ingest_failed)
 
     # ----| method that is called when an editor is focused, and trigger callback |---- #
     def focusInEvent(self, event):
@@ -28,15 +42,20 @@ class FlashcardTextEdit(QTextEdit):
 
     # ----| check if the file that is drag and dropped is a supported image |---- #
     def dragEnterEvent(self, event):
-        if event.mimeData().hasUrls():
-            image_formats = ["png", "jpg", "jpeg", "bmp"]
-            for url in event.mimeData().urls():
-                image_url_ending = url.toLocalFile().split(".")[-1].lower()
-                if image_url_ending in image_formats:
-                    event.acceptProposedAction()
-                    return
+        if self.image_paths(event.mimeData()):
+            event.acceptProposedAction()
+            return
         event.ignore()
 
+    @staticmethod
+    def image_paths(mime_data):
+        if not mime_data.hasUrls():
+            return []
+        return [
+            url.toLocalFile() for url in mime_data.urls()
+            if url.toLocalFile().split(".")[-1].lower() in IMAGE_FORMATS
+        ]
+
     # ----| a method that fixes a bug when style isn't applied when
     # user presses enter and the text styling resets when in new block |---- #
     def keyPressEvent(self, event):
@@ -46,110 +65,156 @@ class FlashcardTextEdit(QTextEdit):
                 parent.reset_typing_format(self)
         super().keyPressEvent(event)
 
-    # ----| handle the image, save a temp QImage for later saving and display the image |---- #
+    # ----| show a placeholder where the image goes while a preview size copy is decoded on the thread pool, the |---- #
+    # ----| file itself is only read again when the card is saved (store_pending_images) |---- #
     def dropEvent(self, event):
-        if event.mimeData().hasUrls():
-            for url in event.mimeData().urls():
-                local_path = url.toLocalFile()
-                image = QImage(local_path)
-                image_url = self.path_to_file_url(local_path)
-                if not image.isNull():
-                    if self.pending_images and self.has_image():
-                        reply = QMessageBox.question(
-                            self,
-                            "Replace Image?",
-                            "This card already has an image. Do you want to replace it?",
-                            QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No
-                        )
-                        if reply == QMessageBox.StandardButton.Yes:
-                            self.replace_image(image_url, image)
-                    else:
-                        cursor = self.textCursor()
-                        current_format = cursor.charFormat()
-
-                        placeholder = f"__img_{datetime.now().strftime('%Y%m%d_%H%M%S_%f')}__"
-                        self.pending_images[placeholder] = image
-                        self.insertHtml(f'<img src="{image_url}" /><br>&nbsp;')
-
-                        cursor = self.textCursor()
-                        cursor.setCharFormat(current_format)
-                        self.setTextCursor(cursor)
-                        self.setFocus()
-            event.acceptProposedAction()
-        else:
+        image_paths = self.image_paths(event.mimeData())
+        if not image_paths:
             event.ignore()
+            return
+        # ----| a side holds one image, several dropped at once are refused rather than all but one lost |---- #
+        if len(image_paths) > 1:
+            QMessageBox.information(
+                self,
+                "One Image Per Side",
+                f"{len(image_paths)} images were dropped, a card side can only hold one. Please drop a single image."
+            )
+            event.ignore()
+            return
+        local_path = image_paths[0]
+
+        if self.has_image():
+            reply = QMessageBox.question(
+                self,
+                "Replace Image?",
+                "This card already has an image. Do you want to replace it?",
+                QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No
+            )
+            if reply != QMessageBox.StandardButton.Yes:
+                event.ignore()
+                return
+            self.remove_images()
+
+        token = uuid.uuid4().hex
+        placeholder = f"ingest:{token}"
+        self.document().addResource(QTextDocument.ImageResource, QUrl(placeholder), placeholder_image())
+        self.pending_images[token] = {"path": local_path, "name": placeholder, "store": False, "started": False}
 
-    # ----| fix an image's path to display correctly in the QTextEdit|---- #
-    @staticmethod
-    def path_to_file_url(path):
-        resolved = str(Path(path).resolve())
-        normalized = resolved.replace("\\", "/")
-        return f"file:///{quote(normalized)}"
-
-    # ----| method to handle replacing images if a new one is added to same card|---- #
-    def replace_image(self, new_image_url, new_image_obj):
         cursor = self.textCursor()
         current_format = cursor.charFormat()
-
-        cursor.select(QTextCursor.SelectionType.Document)
-        all_html = cursor.selection().toHtml()
-
-        new_img_tag = f'<img src="{new_image_url}" /><br>&nbsp;'
-        altered_html = re.sub(r"<img[^>]*>", new_img_tag, all_html, flags=re.IGNORECASE)
-        self.setHtml(altered_html)
-
+        self.insertHtml(f'<img src="{placeholder}" /><br>&nbsp;')
         cursor = self.textCursor()
         cursor.setCharFormat(current_format)
         self.setTextCursor(cursor)
         self.setFocus()
 
-        self.pending_images.clear()
-        placeholder = f"__img_{datetime.now().strftime('%Y%m%d_%H%M%S_%f')}__"
-        self.pending_images[placeholder] = new_image_obj
+        start_preview(token, local_path, EDITOR_IMAGE_WIDTH, self.ingest_signals)
+        event.acceptProposedAction()
 
-    # ----| method to check if there's an image in the current html|---- #
-    def has_image(self):
-        return bool(re.search(r"<img[^>]*>", self.toHtml(), flags=re.IGNORECASE))
-
-    # ----| method to finalise card html and save images to save folder and reference those images in the html|---- #
-    def finalize_images(self, image_folder_path):
-        image_folder_path = Path(image_folder_path)
-        self.image_filename = None
-        if not self.pending_images:
-            return self.toHtml()
-
-        html = self.toHtml()
-        matches = re.findall(r'src="file:///([^"]+)"', html)
-
-        for placeholder, q_image in self.pending_images.items():
-            if not matches:
+    # ----| results for an image removed from the text meanwhile are dropped |---- #
+    def preview_ready(self, token, preview):
+        pending = self.pending_images.get(token)
+        if pending is None:
+            return
+        preview_name = f"preview:{token}"
+        self.document().addResource(QTextDocument.ImageResource, QUrl(preview_name), preview)
+        self.rename_image(pending["name"], preview_name)
+        pending["name"] = preview_name
+        self.start_storing(token)
+
+    # ----| hands the dropped files to the thread pool to be downscaled and stored (windows/image_ingest.py), an |---- #
+    # ----| image still loading its preview follows once that is done, returns False when nothing is pending |---- #
+    def store_pending_images(self):
+        for token, pending in list(self.pending_images.items()):
+            if not self.image_fragments(pending["name"]):
+                del self.pending_images[token]
                 continue
+            pending["store"] = True
+            self.start_storing(token)
+        return bool(self.pending_images)
+
+    def start_storing(self, token):
+        pending = self.pending_images[token]
+        if pending["store"] and not pending["started"] and pending["name"].startswith("preview:"):
+            pending["started"] = True
+            start_ingest(token, self.image_folder_path, pending["path"], self.ingest_signals)
+
+    # ----| the stored file takes the preview's place, shown from the preview bitmap already in the document |---- #
+    def ingest_finished(self, token, filename):
+        pending = self.pending_images.pop(token, None)
+        if pending is None:
+            return
+        preview = self.document().resource(QTextDocument.ImageResource, QUrl(pending["name"]))
+        self.document().addResource(QTextDocument.ImageResource, QUrl(filename), preview)
+        if self.rename_image(pending["name"], filename):
+            self.image_filename = filename
+        self.emit_if_ready(True)
+
+    def ingest_failed(self, token, message):
+        pending = self.pending_images.pop(token, None)
+        if pending is None:
+            return
+        self.remove_images(pending["name"])
+        if pending["store"]:
+            self.emit_if_ready(False)
+        QMessageBox.warning(self, "Image Not Added", message)
 
-            matched_url = matches[0]
-
-            ext_match = re.search(r'\.([a-zA-Z0-9]+)$', matched_url)
-            ext = ext_match.group(1).lower() if ext_match else "png"
-
-            filename = f"{placeholder}.{ext}"
-            save_path = image_folder_path.joinpath(filename)
-            if not save_path.exists():
-                try:
-                    q_image.save(str(save_path), ext.upper())
-                    self.image_filename = filename
-                except Exception as e:
-                    print(f"Failed to save image {filename}: {e}")
+    def emit_if_ready(self, stored):
+        if not self.pending_images:
+            self.images_ready.emit(stored)
+
+    # ----| (position, length, format) of the images in the document, or only those named name |---- #
+    def image_fragments(self, name=None):
+        fragments = []
+        block = self.document().begin()
+        while block.isValid():
+            iterator = block.begin()
+            while not iterator.atEnd():
+                fragment = iterator.fragment()
+                char_format = fragment.charFormat()
+                if char_format.isImageFormat() and (name is None or char_format.toImageFormat().name() == name):
+                    fragments.append((fragment.position(), fragment.length(), char_format.toImageFormat()))
+                iterator += 1
+            block = block.next()
+        return fragments
+
+    def rename_image(self, old_name, new_name):
+        fragments = self.image_fragments(old_name)
+        for position, length, image_format in fragments:
+            cursor = QTextCursor(self.document())
+            cursor.setPosition(position)
+            cursor.setPosition(position + length, QTextCursor.KeepAnchor)
+            image_format.setName(new_name)
+            cursor.setCharFormat(image_format)
+        return bool(fragments)
+
+    # ----| removes the images from the text, back to front so the positions stay valid, images still being |---- #
+    # ----| processed are forgotten |---- #
+    def remove_images(self, name=None):
+        for position, length, image_format in reversed(self.image_fragments(name)):
+            cursor = QTextCursor(self.document())
+            cursor.setPosition(position)
+            cursor.setPosition(position + length, QTextCursor.KeepAnchor)
+            cursor.removeSelectedText()
+        if name is None:
+            self.pending_images.clear()
+            self.image_filename = None
 
-            full_src = f'src="file:///{matched_url}"'
-            new_src = f'src="{filename}"'
-            html = html.replace(full_src, new_src)
+    # ----| method to check if there's an image in the current html|---- #
+    def has_image(self):
+        return bool(re.search(r"<img[^>]*>", self.toHtml(), flags=re.IGNORECASE))
 
-        self.pending_images.clear()
-        return html
+    # ----| method to finalise card html, dropped images are already stored and referenced by their file name, |---- #
+    # ----| so only an image removed from the text is forgotten here |---- #
+    def finalize_images(self):
+        if not self.has_image():
+            self.image_filename = None
+        return self.toHtml()
 
 
 class CardEditorWindow(QWidget):
     # ---------------| Custom signal to update list in main window |--------------- #
-    card_added = Signal()
+    card_added = Signal(int)
     card_edited = Signal()
 
     def __init__(self, deck_name, deck_id, database_manager,
@@ -161,6 +226,8 @@ class CardEditorWindow(QWidget):
         self.deck_name = deck_name
         self.database_manager = database_manager
         self.card_id = card_id
+        self.save_when_ready = False
+        self.image_cache = ImageCache(database_manager.image_folder_path, database_manager.thumbnail_folder_path)
         self.setMinimumSize(805, 550)
 
         if self.card_id:
@@ -258,7 +325,8 @@ class CardEditorWindow(QWidget):
 
         self.layout.addWidget(self.toolbar_container)
 
-        self.front_input = FlashcardTextEdit("front", self.handle_focus_change)
+        self.front_input = FlashcardTextEdit("front", self.handle_focus_change,
+                                             database_manager.image_folder_path)
         self.front_input.setCurrentCharFormat(self.default_format)
         self.front_input.setPlaceholderText("Front of the card."
                                             " Supports drag and dropping images."
@@ -270,7 +338,8 @@ class CardEditorWindow(QWidget):
         self.layout.addWidget(self.front_label)
         self.layout.addWidget(self.front_input)
 
-        self.back_input = FlashcardTextEdit("back", self.handle_focus_change)
+        self.back_input = FlashcardTextEdit("back", self.handle_focus_change,
+                                            database_manager.image_folder_path)
         self.back_input.setCurrentCharFormat(self.default_format)
         self.back_input.setPlaceholderText("Back of the card."
                                            " Supports drag and dropping images."
@@ -279,9 +348,9 @@ class CardEditorWindow(QWidget):
 
         # -------------------------|populate fields if editing|------------------------- #
         if front_html:
-            self.front_input.setHtml(self.patch_image_paths(front_html, front_image))
+            self.front_input.setHtml(self.patch_image_paths(self.front_input, front_html, front_image))
         if back_html:
-            self.back_input.setHtml(self.patch_image_paths(back_html, back_image))
+            self.back_input.setHtml(self.patch_image_paths(self.back_input, back_html, back_image))
         if front_image:
             self.front_input.image_filename = front_image
         if back_image:
@@ -320,6 +389,8 @@ class CardEditorWindow(QWidget):
         self.button_underline.clicked.connect(self.underline_clicked)
         self.front_input.textChanged.connect(self.handle_text_changed)
         self.back_input.textChanged.connect(self.handle_text_changed)
+        self.front_input.images_ready.connect(self.images_ready)
+        self.back_input.images_ready.connect(self.images_ready)
         self.button_align_right.clicked.connect(self.alignment_clicked)
         self.button_align_center.clicked.connect(self.alignment_clicked)
         self.button_align_left.clicked.connect(self.alignment_clicked)
@@ -336,9 +407,19 @@ class CardEditorWindow(QWidget):
             QMessageBox.warning(self, "Missing Fields", "Both front and back must be filled.")
             return
 
-        image_path = self.database_manager.image_folder_path
-        front_html = self.front_input.finalize_images(image_path)
-        back_html = self.back_input.finalize_images(image_path)
+        # ----| dropped images are stored first, the save goes through once they are |---- #
+        front_pending = self.front_input.store_pending_images()
+        back_pending = self.back_input.store_pending_images()
+        if front_pending or back_pending:
+            self.save_when_ready = True
+            self.save_button.setEnabled(False)
+            self.status_label.setText("Storing images, the card is saved when they are ready...")
+            return
+        self.save_when_ready = False
+        self.save_button.setEnabled(True)
+
+        front_html = self.front_input.finalize_images()
+        back_html = self.back_input.finalize_images()
 
         front_image_path = self.front_input.image_filename or None
         back_image_path = self.back_input.image_filename or None
@@ -350,7 +431,7 @@ class CardEditorWindow(QWidget):
         else:
             self.database_manager.add_card(self.deck_id, front_html, back_html, front_image_path, back_image_path)
             self.status_label.setText("Card Added!")
-            self.card_added.emit()
+            self.card_added.emit(self.deck_id)
             self.front_input.clear()
             self.back_input.clear()
             self.front_input.setCurrentCharFormat(self.default_format)
@@ -360,8 +441,19 @@ class CardEditorWindow(QWidget):
             f"{'Editing' if self.card_id else 'Adding'} card in deck: {self.deck_name}"
         ))
 
+    # ----| a card waiting on an image that could not be added is not saved, so the user can drop another |---- #
+    def images_ready(self, stored):
+        if not self.save_when_ready or self.front_input.pending_images or self.back_input.pending_images:
+            return
+        if stored:
+            self.save_card()
+        else:
+            self.save_when_ready = False
+            self.save_button.setEnabled(True)
+            self.status_label.setText(self.status_text)
+
     def close_clicked(self):
-        self.card_added.emit()
+        self.card_added.emit(self.deck_id)
         self.close()
 
     # ---------------|method to change font to selected text, otherwise set new cursor font|---------------- #
@@ -554,14 +646,17 @@ class CardEditorWindow(QWidget):
             editor.setCurrentCharFormat(clean_format)
 
     # --------| method that fixes the html images for the editor window|------------- #
-    def patch_image_paths(self, html, image_filename):
+    # ----| the image is shown from a display size copy added as a document resource under its own file name, |---- #
+    # ----| so the src saved back is still the bare file name (cards saved with a file url get it fixed here) |---- #
+    def patch_image_paths(self, editor, html, image_filename):
         if not html:
             return ""
         if image_filename:
+            html = re.sub(r'src="[^"]*' + re.escape(image_filename) + '"', f'src="{image_filename}"', html)
             image_path = os.path.join(self.database_manager.image_folder_path, image_filename)
             if os.path.exists(image_path):
-                image_url = QUrl.fromLocalFile(image_path).toString()
-                html = html.replace(image_filename, image_url)
+                image = self.image_cache.load(image_filename, EDITOR_IMAGE_WIDTH)
+                editor.document().addResource(QTextDocument.ImageResource, QUrl(image_filename), image)
             else:
                 html += f"<p><i>Image file '{image_filename}' not found</i></p>"
         return html
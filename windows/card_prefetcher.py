@@ -0,0 +1,112 @@
+import os
+import re
+from collections import OrderedDict
+from itertools import islice
+from PySide6.QtCore import QObject, QRunnable, QThreadPool, QUrl, Signal
+
+# ----| images are handed to the text browser as document resources under this scheme, already decoded |---- #
+IMAGE_URL_SCHEME = "card-image"
+
+
+# ----| builds the html for one card side and decodes its image from the image cache, scaled down to fit |---- #
+# ----| max_width, plain Qt image classes only, so it can run on a worker thread |---- #
+def prepare_side(image_cache, html, image_filename, max_width):
+    if not html:
+        return "", None, None
+    if not image_filename:
+        return html, None, None
+
+    if not os.path.exists(os.path.join(image_cache.image_folder_path, image_filename)):
+        return html + f"<p><i>Image file '{image_filename}' not found</i></p>", None, None
+
+    image = image_cache.load(image_filename, max_width)
+    if image.isNull():
+        return html + f"<p><i>Image file '{image_filename}' could not be read</i></p>", None, None
+
+    # ----| the whole src is replaced, cards saved with an absolute file url point at the resource as well |---- #
+    image_url = f"{IMAGE_URL_SCHEME}:{image_filename}"
+    html = re.sub(r'src="[^"]*' + re.escape(image_filename) + '"', f'src="{image_url}"', html)
+    return html, QUrl(image_url), image
+
+
+class PrepareSideSignals(QObject):
+    finished = Signal(object, object)
+
+
+class PrepareSideTask(QRunnable):
+    def __init__(self, key, image_cache, html, image_filename, max_width, signals):
+        super().__init__()
+        self.key = key
+        self.args = (image_cache, html, image_filename, max_width)
+        self.signals = signals
+
+    def run(self):
+        self.signals.finished.emit(self.key, prepare_side(*self.args) + (self.args[3],))
+
+
+# ----| lookahead cache for the study window, prepares the next cards' sides on the thread pool while the |---- #
+# ----| current one is on screen, and keeps them in an LRU capped by the bytes of the decoded images |---- #
+class CardPrefetcher(QObject):
+    def __init__(self, image_cache, lookahead=3, max_bytes=64 * 1024 * 1024, parent=None):
+        super().__init__(parent)
+        self.image_cache = image_cache
+        self.lookahead = lookahead
+        self.max_bytes = max_bytes
+        self.cache = OrderedDict()
+        self.cache_bytes = 0
+        self.pending = set()
+        self.signals = PrepareSideSignals()
+        self.signals.finished.connect(self.side_prepared)
+
+    @staticmethod
+    def entry_size(entry):
+        html, image_url, image, max_width = entry
+        return len(html) * 2 + (image.sizeInBytes() if image is not None else 0)
+
+    # ----| queues the sides that are neither cached nor already being prepared, cards is the study queue with |---- #
+    # ----| the card on screen first, so its other side is prepared as well as both sides of the next lookahead |---- #
+    def prefetch(self, cards, max_width):
+        for card in islice(cards, self.lookahead + 1):
+            for side in ("front", "back"):
+                key = (card["id"], side)
+                if key in self.pending or self.is_usable(key, max_width):
+                    continue
+                self.pending.add(key)
+                QThreadPool.globalInstance().start(PrepareSideTask(
+                    key, self.image_cache, card[side], card.get(f"{side}_image"), max_width, self.signals
+                ))
+
+    def side_prepared(self, key, entry):
+        self.pending.discard(key)
+        self.store(key, entry)
+
+    def is_usable(self, key, max_width):
+        entry = self.cache.get(key)
+        if entry is None:
+            return False
+        html, image_url, image, prepared_width = entry
+        # ----| an image prepared for another width is only reusable if it never needed scaling |---- #
+        if prepared_width == max_width or image is None:
+            return True
+        return image.width() < prepared_width and image.width() <= max_width
+
+    def store(self, key, entry):
+        if key in self.cache:
+            self.cache_bytes -= self.entry_size(self.cache.pop(key))
+        self.cache[key] = entry
+        self.cache_bytes += self.entry_size(entry)
+        while self.cache_bytes > self.max_bytes and len(self.cache) > 1:
+            evicted_key, evicted = self.cache.popitem(last=False)
+            self.cache_bytes -= self.entry_size(evicted)
+
+    # ----| returns (html, image_url, image) for a card side, prepared right here if the prefetch missed it |---- #
+    def get(self, card, side, max_width):
+        key = (card["id"], side)
+        if self.is_usable(key, max_width):
+            self.cache.move_to_end(key)
+            html, image_url, image, prepared_width = self.cache[key]
+            return html, image_url, image
+
+        entry = prepare_side(self.image_cache, card[side], card.get(f"{side}_image"), max_width) + (max_width,)
+        self.store(key, entry)
+        return entry[:3]
@@ -0,0 +1,128 @@
+from datetime import datetime
+from PySide6.QtCore import Qt, QAbstractTableModel, QModelIndex
+
+CARD_PAGE_SIZE = 200
+HEADERS = ["Select", "Front", "Back", "Created"]
+IMAGE_PLACEHOLDER = "Image detected — click cell for preview"
+
+
+# ----| the stored plain text has no trace of the image, the placeholder is added for sides that have one |---- #
+def side_text(text, image_filename):
+    if image_filename:
+        return f"{text} {IMAGE_PLACEHOLDER}".strip()
+    return text
+
+
+# ----| created is in epoch seconds, 0 for a card whose old text timestamp couldn't be read |---- #
+def format_created(created):
+    if not created:
+        return ""
+    try:
+        return datetime.fromtimestamp(created).strftime("%b %d, %Y %H:%M")
+    except (TypeError, ValueError, OverflowError, OSError):
+        return ""
+
+
+# ----| card list for the deck editor, rows are paged in from DBManager as the view scrolls |---- #
+# ----| (canFetchMore/fetchMore) with the plain text stored by DBManager, the full html is fetched on demand |---- #
+# ----| with a search query only the matching cards are listed, newest first (see DBManager.search_cards) |---- #
+class CardTableModel(QAbstractTableModel):
+    def __init__(self, database_manager, deck_id, parent=None, query=""):
+        super().__init__(parent)
+        self.database_manager = database_manager
+        self.deck_id = deck_id
+        self.query = query.strip()
+        self.total_cards = database_manager.get_deck_card_count(deck_id)
+        # ----| each row is (card_id, front_text, back_text, created_text) |---- #
+        self.rows = []
+        self.row_by_card_id = {}
+        self.checked_ids = set()
+        self.exhausted = self.total_cards == 0
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.rows)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(HEADERS)
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role == Qt.DisplayRole and orientation == Qt.Horizontal:
+            return HEADERS[section]
+        return super().headerData(section, orientation, role)
+
+    def canFetchMore(self, parent=QModelIndex()):
+        return not parent.isValid() and not self.exhausted
+
+    def fetchMore(self, parent=QModelIndex()):
+        if parent.isValid() or self.exhausted:
+            return
+        if self.query:
+            hits = self.database_manager.search_cards(self.query, self.deck_id, CARD_PAGE_SIZE, len(self.rows))
+            page = [(card_id, *card) for card_id, deck_id, deck_name, *card in hits]
+        else:
+            after_id = self.rows[-1][0] if self.rows else 0
+            page = self.database_manager.get_deck_cards_page(self.deck_id, after_id, CARD_PAGE_SIZE)
+        if len(page) < CARD_PAGE_SIZE:
+            self.exhausted = True
+        if not page:
+            return
+
+        first = len(self.rows)
+        self.beginInsertRows(QModelIndex(), first, first + len(page) - 1)
+        for card_id, front_text, back_text, front_image, back_image, created in page:
+            self.row_by_card_id[card_id] = len(self.rows)
+            self.rows.append((
+                card_id, side_text(front_text, front_image), side_text(back_text, back_image), format_created(created)
+            ))
+        self.endInsertRows()
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        card_id, front_text, back_text, created_text = self.rows[index.row()]
+        column = index.column()
+
+        if role == Qt.DisplayRole:
+            return [" ", front_text, back_text, created_text][column]
+        if role == Qt.CheckStateRole and column == 0:
+            return Qt.Checked if card_id in self.checked_ids else Qt.Unchecked
+        if role == Qt.TextAlignmentRole:
+            return Qt.AlignCenter
+        if role == Qt.ToolTipRole and column in (1, 2):
+            return f"Click to preview {'front' if column == 1 else 'back'} side"
+        if role == Qt.UserRole:
+            return card_id
+        return None
+
+    def setData(self, index, value, role=Qt.EditRole):
+        if role != Qt.CheckStateRole or index.column() != 0:
+            return False
+        card_id = self.rows[index.row()][0]
+        if Qt.CheckState(value) == Qt.Checked:
+            self.checked_ids.add(card_id)
+        else:
+            self.checked_ids.discard(card_id)
+        self.dataChanged.emit(index, index, [Qt.CheckStateRole])
+        return True
+
+    def flags(self, index):
+        if index.column() == 0:
+            return Qt.ItemIsUserCheckable | Qt.ItemIsEnabled
+        return Qt.ItemIsEnabled | Qt.ItemIsSelectable
+
+    def card_id_at(self, row):
+        return self.rows[row][0]
+
+    # ----| re-reads one card after it was edited, without resetting the rest of the list |---- #
+    def reload_card(self, card_id):
+        row = self.row_by_card_id.get(card_id)
+        if row is None:
+            return
+        card = self.database_manager.get_card_texts(card_id)
+        if card is None:
+            return
+        front_text, back_text, front_image, back_image = card
+        self.rows[row] = (
+            card_id, side_text(front_text, front_image), side_text(back_text, back_image), self.rows[row][3]
+        )
+        self.dataChanged.emit(self.index(row, 1), self.index(row, 2))
@@ -0,0 +1,54 @@
+from concurrent.futures import Future
+from PySide6.QtCore import QObject, QRunnable, QThreadPool, Signal
+
+
+class DBReadSignals(QObject):
+    finished = Signal(object, object)
+    failed = Signal(object, str)
+
+
+class DBReadTask(QRunnable):
+    def __init__(self, key, function, args, future, signals):
+        super().__init__()
+        self.key = key
+        self.function = function
+        self.args = args
+        self.future = future
+        self.signals = signals
+
+    def run(self):
+        # ----| a future cancelled while it was still queued is skipped |---- #
+        if not self.future.set_running_or_notify_cancel():
+            return
+        try:
+            result = self.function(*self.args)
+        except Exception as e:
+            self.future.set_exception(e)
+            self.signals.failed.emit(self.key, str(e))
+            return
+        self.future.set_result(result)
+        self.signals.finished.emit(self.key, result)
+
+
+# ----| runs DBManager reads off the GUI thread, submit(key, database_manager.method, *args) returns a |---- #
+# ----| concurrent.futures.Future and the result also comes back on the GUI thread as finished(key, result) or |---- #
+# ----| failed(key, message), the key tells the caller which request it is and lets it drop stale ones |---- #
+# ----| the thread pool has as many threads as the DBManager keeps read connections, see connection_pool.py |---- #
+class DBReader(QObject):
+    finished = Signal(object, object)
+    failed = Signal(object, str)
+
+    def __init__(self, database_manager, parent=None):
+        super().__init__(parent)
+        self.thread_pool = QThreadPool(self)
+        self.thread_pool.setMaxThreadCount(database_manager.pool.read_connections)
+        # ----| the tasks emit through a holder they keep alive, so a result arriving after this reader is |---- #
+        # ----| gone is dropped instead of reaching a deleted object |---- #
+        self.signals = DBReadSignals()
+        self.signals.finished.connect(self.finished)
+        self.signals.failed.connect(self.failed)
+
+    def submit(self, key, function, *args):
+        future = Future()
+        self.thread_pool.start(DBReadTask(key, function, args, future, self.signals))
+        return future
@@ -0,0 +1,41 @@
+from PySide6.QtCore import QThread, Signal
+
+
+# ----| raised out of report_progress once the thread was asked to stop, the jobs all report between batches |---- #
+# ----| and commit each batch on its own, so they stop at a clean point and pick up from there next time |---- #
+class TaskStopped(Exception):
+    pass
+
+
+# ----| runs a long database job off the GUI thread, task is called as task(database_manager, report_progress) |---- #
+# ----| with the window's DBManager, which is safe to share between threads, so the job's writes queue up for the |---- #
+# ----| same writer as everything else, see database_manager/connection_pool.py |---- #
+# ----| stop() asks the job to end at its next report_progress, and waits for it |---- #
+class DBTaskThread(QThread):
+    progress = Signal(int, str)
+    task_finished = Signal(object)
+    task_failed = Signal(str)
+
+    def __init__(self, database_manager, task, parent=None):
+        super().__init__(parent)
+        self.database_manager = database_manager
+        self.task = task
+
+    def report_progress(self, percent, text):
+        if self.isInterruptionRequested():
+            raise TaskStopped()
+        self.progress.emit(percent, text)
+
+    def stop(self):
+        self.requestInterruption()
+        self.wait()
+
+    def run(self):
+        try:
+            result = self.task(self.database_manager, self.report_progress)
+        except TaskStopped:
+            return
+        except Exception as e:
+            self.task_failed.emit(str(e))
+        else:
+            self.task_finished.emit(result)
@@ -0,0 +1,92 @@
+from difflib import SequenceMatcher
+from PySide6.QtCore import Qt, QAbstractTableModel, QModelIndex
+
+DECK_HEADERS = ["Deck Name", "Total Cards", "Cards to Learn", "Reviews Due"]
+
+
+# ----| deck list for the main window, rows are keyed by deck id, a refresh is diffed against the rows already |---- #
+# ----| shown and only the inserted, removed and changed rows are signalled, so the view keeps its selection |---- #
+# ----| and scroll position |---- #
+class DeckListModel(QAbstractTableModel):
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        # ----| each row is [deck_id, name, total_cards, cards_to_learn, reviews_due] |---- #
+        self.rows = []
+        self.row_by_deck_id = {}
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.rows)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(DECK_HEADERS)
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role == Qt.DisplayRole and orientation == Qt.Horizontal:
+            return DECK_HEADERS[section]
+        return super().headerData(section, orientation, role)
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        if role == Qt.DisplayRole:
+            return str(self.rows[index.row()][index.column() + 1])
+        if role == Qt.TextAlignmentRole:
+            return Qt.AlignCenter
+        return None
+
+    def flags(self, index):
+        return Qt.ItemIsEnabled | Qt.ItemIsSelectable
+
+    def deck_at(self, row):
+        deck_id, name, *counts = self.rows[row]
+        return deck_id, name
+
+    def row_of(self, deck_id):
+        return self.row_by_deck_id.get(deck_id)
+
+    # ----| decks are (id, name, created, total, learn, due) rows as returned by DBManager.get_all_decks |---- #
+    def set_decks(self, decks):
+        new_rows = [[deck_id, name, total, learn, due] for deck_id, name, created, total, learn, due in decks]
+        old_ids = [row[0] for row in self.rows]
+        new_ids = [row[0] for row in new_rows]
+
+        if old_ids == new_ids:
+            self.update_rows(0, new_rows)
+        else:
+            # ----| applied from the end, so the rows before each change are still where the diff found them |---- #
+            matcher = SequenceMatcher(None, old_ids, new_ids, autojunk=False)
+            for tag, i1, i2, j1, j2 in reversed(matcher.get_opcodes()):
+                if tag == "equal":
+                    self.update_rows(i1, new_rows[j1:j2])
+                    continue
+                if i2 > i1:
+                    self.beginRemoveRows(QModelIndex(), i1, i2 - 1)
+                    del self.rows[i1:i2]
+                    self.endRemoveRows()
+                if j2 > j1:
+                    self.beginInsertRows(QModelIndex(), i1, i1 + j2 - j1 - 1)
+                    self.rows[i1:i1] = new_rows[j1:j2]
+                    self.endInsertRows()
+
+        self.row_by_deck_id = {row[0]: number for number, row in enumerate(self.rows)}
+
+    # ----| replaces the rows from first on with rows for the same decks, signalling the ones that differ |---- #
+    def update_rows(self, first, rows):
+        for offset, row in enumerate(rows):
+            number = first + offset
+            if self.rows[number] != row:
+                self.rows[number] = row
+                self.dataChanged.emit(self.index(number, 0), self.index(number, len(DECK_HEADERS) - 1))
+
+    # ----| deck_stats are (deck_id, total, learn, due) rows from DBManager.refresh_deck_stats, returns False |---- #
+    # ----| when one of the decks isn't listed, the list then needs a full set_decks |---- #
+    def update_stats(self, deck_stats):
+        if any(deck_id not in self.row_by_deck_id for deck_id, *_ in deck_stats):
+            return False
+        for deck_id, total, learn, due in deck_stats:
+            number = self.row_by_deck_id[deck_id]
+            row = self.rows[number][:2] + [total, learn, due]
+            if self.rows[number] != row:
+                self.rows[number] = row
+                self.dataChanged.emit(self.index(number, 1), self.index(number, len(DECK_HEADERS) - 1))
+        return True
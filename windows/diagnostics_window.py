@@ -0,0 +1,137 @@
+import os
+from PySide6.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QLabel, QCheckBox, QPushButton, QTableWidget,
+                               QTableWidgetItem, QHeaderView, QAbstractItemView, QFileDialog, QTabWidget)
+from PySide6.QtCore import Qt, QTimer, QUrl
+from PySide6.QtGui import QDesktopServices
+from database_manager.instrumentation import instrumentation, SLOW_CALL_MS
+
+METHOD_HEADERS = ["Method", "Calls", "Total ms", "Mean ms", "Max ms", "Rows", "Latency histogram"]
+STATEMENT_HEADERS = ["Statement", "Runs", "Total ms", "Mean ms", "Max ms", "Latency histogram"]
+
+
+def histogram_text(histogram):
+    return "  ".join(f"{label} {count}" for label, count in histogram.items() if count)
+
+
+# ----| hidden window for finding slow database calls, opened with Ctrl+Shift+D in the main window |---- #
+class DiagnosticsWindow(QWidget):
+    def __init__(self, log_folder):
+        super().__init__()
+        self.log_folder = log_folder
+        self.setWindowTitle("Diagnostics")
+        self.setMinimumSize(900, 550)
+        self.layout = QVBoxLayout()
+
+        # -------------------------|switch and summary|------------------------- #
+        self.enabled_checkbox = QCheckBox(f"Time database calls (calls over {SLOW_CALL_MS} ms go to the slow query log)")
+        self.enabled_checkbox.setChecked(instrumentation.enabled)
+        self.layout.addWidget(self.enabled_checkbox)
+
+        self.summary_label = QLabel()
+        self.layout.addWidget(self.summary_label)
+
+        # -------------------------|method and statement tables|------------------------- #
+        self.tabs = QTabWidget()
+        self.method_table = self.make_table(METHOD_HEADERS)
+        self.statement_table = self.make_table(STATEMENT_HEADERS)
+        self.tabs.addTab(self.method_table, "DBManager methods")
+        self.tabs.addTab(self.statement_table, "SQL statements")
+        self.layout.addWidget(self.tabs, stretch=1)
+
+        # -------------------------|buttons|------------------------- #
+        self.button_layout = QHBoxLayout()
+        self.reset_button = QPushButton("Reset")
+        self.dump_button = QPushButton("Save as JSON...")
+        self.log_button = QPushButton("Open log folder")
+        self.close_button = QPushButton("Close")
+        for button in (self.reset_button, self.dump_button, self.log_button):
+            self.button_layout.addWidget(button)
+        self.button_layout.addStretch()
+        self.button_layout.addWidget(self.close_button)
+        self.layout.addLayout(self.button_layout)
+
+        self.setLayout(self.layout)
+
+        # ----| the tables follow the numbers once a second while the window is open |---- #
+        self.refresh_timer = QTimer(self)
+        self.refresh_timer.setInterval(1000)
+        self.refresh_timer.timeout.connect(self.refresh)
+
+        self.enabled_checkbox.toggled.connect(self.toggle_enabled)
+        self.reset_button.clicked.connect(self.reset_clicked)
+        self.dump_button.clicked.connect(self.dump_clicked)
+        self.log_button.clicked.connect(self.open_log_folder)
+        self.close_button.clicked.connect(self.close)
+
+        self.refresh()
+
+    @staticmethod
+    def make_table(headers):
+        table = QTableWidget(0, len(headers))
+        table.setHorizontalHeaderLabels(headers)
+        table.setEditTriggers(QAbstractItemView.NoEditTriggers)
+        table.setSelectionBehavior(QAbstractItemView.SelectRows)
+        table.verticalHeader().hide()
+        header = table.horizontalHeader()
+        header.setSectionResizeMode(QHeaderView.ResizeToContents)
+        header.setSectionResizeMode(0, QHeaderView.Stretch)
+        return table
+
+    def showEvent(self, event):
+        super().showEvent(event)
+        self.refresh()
+        self.refresh_timer.start()
+
+    def hideEvent(self, event):
+        super().hideEvent(event)
+        self.refresh_timer.stop()
+
+    def toggle_enabled(self, checked):
+        if checked:
+            instrumentation.enable(self.log_folder)
+        else:
+            instrumentation.disable()
+        self.refresh()
+
+    def reset_clicked(self):
+        instrumentation.reset()
+        self.refresh()
+
+    def dump_clicked(self):
+        file_path, _ = QFileDialog.getSaveFileName(self, "Save Diagnostics", "diagnostics.json", "JSON (*.json)")
+        if file_path:
+            instrumentation.dump_json(file_path)
+
+    def open_log_folder(self):
+        os.makedirs(self.log_folder, exist_ok=True)
+        QDesktopServices.openUrl(QUrl.fromLocalFile(self.log_folder))
+
+    def refresh(self):
+        snapshot = instrumentation.snapshot()
+        calls = sum(stats["count"] for stats in snapshot["methods"].values())
+        state = "on" if snapshot["enabled"] else "off"
+        self.summary_label.setText(
+            f"Timing is {state}. Since {snapshot['since']}: {calls} call(s), "
+            f"{len(snapshot['statements'])} distinct statement(s), {snapshot['commits']} commit(s)."
+        )
+        self.fill_table(self.method_table, [
+            [name, stats["count"], stats["total_ms"], stats["mean_ms"], stats["max_ms"], stats["rows"],
+             histogram_text(stats["histogram"])]
+            for name, stats in snapshot["methods"].items()
+        ])
+        self.fill_table(self.statement_table, [
+            [sql, stats["count"], stats["total_ms"], stats["mean_ms"], stats["max_ms"], histogram_text(stats["histogram"])]
+            for sql, stats in snapshot["statements"].items()
+        ])
+
+    @staticmethod
+    def fill_table(table, rows):
+        table.setRowCount(len(rows))
+        for row, values in enumerate(rows):
+            for column, value in enumerate(values):
+                item = QTableWidgetItem(f"{value:.2f}" if isinstance(value, float) else str(value))
+                if column:
+                    item.setTextAlignment(Qt.AlignRight | Qt.AlignVCenter)
+                if column == 0:
+                    item.setToolTip(str(value))
+                table.setItem(row, column, item)
@@ -1,17 +1,20 @@
-from PySide6.QtGui import QStandardItemModel, QStandardItem, QTextDocument
 from PySide6.QtWidgets import (QWidget, QVBoxLayout, QLabel, QSizePolicy, QPushButton, QMessageBox,
                                QHBoxLayout, QTableView, QAbstractItemView, QInputDialog, QHeaderView, QDialog,
-                               QTextBrowser)
-from PySide6.QtCore import Qt, Signal, QTimer, QModelIndex, QUrl
-from datetime import datetime
-import re
-import os
+                               QTextBrowser, QLineEdit)
+from PySide6.QtGui import QTextDocument
+from PySide6.QtCore import Qt, Signal, QTimer, QModelIndex
 from windows.card_editor_window import CardEditorWindow
+from windows.card_table_model import CardTableModel
+from windows.card_prefetcher import prepare_side
+from windows.image_cache import ImageCache
+from windows.search_timer import make_search_timer
+
+PREVIEW_SIZE = (500, 400)
 
 
 class EditDeckWindow(QWidget):
     # ---------------| Custom signal to update list in main window |--------------- #
-    deck_edited = Signal()
+    deck_edited = Signal(int)
 
     def __init__(self, deck_name, deck_id, database_manager):
         super().__init__()
@@ -19,7 +22,9 @@ class EditDeckWindow(QWidget):
         self.deck_id = deck_id
         self.deck_name = deck_name
         self.editor = None
+        self.card_model = None
         self.database_manager = database_manager
+        self.image_cache = ImageCache(database_manager.image_folder_path, database_manager.thumbnail_folder_path)
         self.setWindowTitle("Edit a deck")
         self.setMinimumSize(805, 550)
         self.layout = QVBoxLayout()
@@ -40,6 +45,14 @@ class EditDeckWindow(QWidget):
 
         self.layout.addWidget(self.card_list_label)
 
+        # -------------------------|card search, filters the list as you type|------------------------- #
+        self.search_input = QLineEdit()
+        self.search_input.setPlaceholderText("Search cards in this deck...")
+        self.search_input.setClearButtonEnabled(True)
+        self.layout.addWidget(self.search_input)
+
+        self.search_timer = make_search_timer(self.search_input, self.refresh_card_list, self)
+
         # -------------------------|card list setup|------------------------- #
         self.card_list = QTableView()
         self.card_list.setSizePolicy(QSizePolicy.Expanding, QSizePolicy.Expanding)
@@ -146,16 +159,8 @@ class EditDeckWindow(QWidget):
     # -------------------------|cell click connection|------------------------- #
         self.card_list.clicked.connect(self.cell_click_handler)
 
-    @staticmethod
-    def html_to_plaintext(html_string):
-        html_string = re.sub(r"<img[^>]*>", "Image detected — click cell for preview", html_string, flags=re.IGNORECASE)
-        doc = QTextDocument()
-        doc.setHtml(html_string)
-        plain = doc.toPlainText()
-        return plain.replace("\u00A0", " ").replace("\n", " ").strip()
-
     def close_clicked(self):
-        self.deck_edited.emit()
+        self.deck_edited.emit(self.deck_id)
         self.close()
 
     def rename_deck(self):
@@ -180,56 +185,22 @@ class EditDeckWindow(QWidget):
         self.database_manager.rename_deck(name, self.deck_id)
         self.deck_name = name
         self.deck_name_label.setText("Deck renamed!")
-        self.deck_edited.emit()
+        self.deck_edited.emit(self.deck_id)
         QTimer.singleShot(1500, lambda: self.deck_name_label.setText(f"Editing deck: {self.deck_name}"))
 
     # -------------------------|method to refresh or populate card list|------------------------- #
     def refresh_card_list(self):
-        cards = self.database_manager.get_deck_cards(self.deck_id)
         header = self.card_list.horizontalHeader()
         header.setSectionsClickable(False)
         header.setHighlightSections(False)
 
-        if cards:
-            model = QStandardItemModel(len(cards), 4)
-            model.setHorizontalHeaderLabels(["Select", "Front", "Back", "Created"])
-            for row, (card_id, front, back, front_img, back_img, created) in enumerate(cards):
-
-                checkbox_item = QStandardItem(" ")
-                checkbox_item.setFlags(Qt.ItemIsUserCheckable | Qt.ItemIsEnabled)
-                checkbox_item.setCheckState(Qt.Unchecked)
-                checkbox_item.setData(card_id, Qt.UserRole)
-
-                front_text = self.html_to_plaintext(front)
-                back_text = self.html_to_plaintext(back)
-
-                front_item = QStandardItem(front_text)
-                front_item.setToolTip("Click to preview front side")
-                front_item.setData(front, Qt.UserRole + 1)
-                front_item.setData(front_img, Qt.UserRole + 2)
-
-                back_item = QStandardItem(back_text)
-                back_item.setToolTip("Click to preview back side")
-                back_item.setData(back, Qt.UserRole + 1)
-                back_item.setData(back_img, Qt.UserRole + 2)
-
-                creation_dt = datetime.strptime(created, "%Y-%m-%dT%H:%M:%S.%f")
-                formatted_time = creation_dt.strftime("%b %d, %Y %H:%M")
-                items = [
-                    checkbox_item,
-                    front_item,
-                    back_item,
-                    QStandardItem(formatted_time),
-                ]
-                for col, item in enumerate(items):
-                    item.setTextAlignment(Qt.AlignCenter)
-                    item.setFlags(item.flags() & ~Qt.ItemIsEditable)
-                    model.setItem(row, col, item)
-        else:
-            model = QStandardItemModel(0, 4)
-            model.setHorizontalHeaderLabels(["Select", "Front", "Back", "Created"])
-
-        self.card_list.setModel(model)
+        # ----| the first page is loaded right away, the rest is paged in by the model as the list scrolls |---- #
+        old_model = self.card_model
+        self.card_model = CardTableModel(self.database_manager, self.deck_id, self, self.search_input.text())
+        self.card_model.fetchMore()
+        self.card_list.setModel(self.card_model)
+        if old_model:
+            old_model.deleteLater()
         header.setSectionResizeMode(0, QHeaderView.ResizeToContents)
         header.setSectionResizeMode(1, QHeaderView.Stretch)
         header.setSectionResizeMode(2, QHeaderView.Stretch)
@@ -237,15 +208,7 @@ class EditDeckWindow(QWidget):
 
     # -------------------------|method to delete cards|------------------------- #
     def delete_cards(self):
-        model = self.card_list.model()
-        card_ids_to_delete = []
-
-        for row in range(model.rowCount()):
-            current_checkbox = model.item(row, 0)  # type: ignore
-            if current_checkbox.checkState() == Qt.Checked:
-                card_id = current_checkbox.data(Qt.UserRole)
-                if card_id:
-                    card_ids_to_delete.append(card_id)
+        card_ids_to_delete = sorted(self.card_model.checked_ids)
 
         if not card_ids_to_delete:
             QMessageBox.information(self, "Delete Cards", "No cards selected for deletion.")
@@ -263,25 +226,26 @@ class EditDeckWindow(QWidget):
             self.database_manager.delete_cards(self.deck_id, card_ids_to_delete)
             self.refresh_card_list()
             self.deck_name_label.setText("Cards deleted!")
-            self.deck_edited.emit()
+            self.deck_edited.emit(self.deck_id)
             QTimer.singleShot(1500, lambda: self.deck_name_label.setText(f"Editing deck: {self.deck_name}"))
 
     # -------------------------|method to handle cell preview, when clicked|------------------------- #
     def cell_click_handler(self, index: QModelIndex):
-        item = self.card_list.model().itemFromIndex(index)  # type: ignore
-        html = item.data(Qt.UserRole + 1)
-        image_filename = item.data(Qt.UserRole + 2)
+        if index.column() not in (1, 2):
+            return
+
+        # ----| the list only holds the display text, the card itself is read when it is previewed |---- #
+        card = self.database_manager.get_card(self.card_model.card_id_at(index.row()))
+        if not card:
+            return
+        _, front_html, back_html, front_image, back_image = card
+        html, image_filename = (front_html, front_image) if index.column() == 1 else (back_html, back_image)
 
         if not html:
             return
 
-        if image_filename:
-            image_path = os.path.join(self.database_manager.image_folder_path, image_filename)
-            if os.path.exists(image_path):
-                image_url = QUrl.fromLocalFile(image_path).toString()
-                html = html.replace(image_filename, image_url)
-            else:
-                html += f"<p><i>Image file '{image_filename}' not found</i></p>"
+        # ----| the image is decoded from the smallest cached copy that fits the preview |---- #
+        html, image_url, image = prepare_side(self.image_cache, html, image_filename, PREVIEW_SIZE[0] - 40)
 
         dialog = QDialog(self)
         dialog.setWindowTitle("Card Preview")
@@ -289,24 +253,18 @@ class EditDeckWindow(QWidget):
         layout = QVBoxLayout(dialog)
 
         viewer = QTextBrowser()
+        if image is not None:
+            viewer.document().addResource(QTextDocument.ImageResource, image_url, image)
         viewer.setHtml(html)
         viewer.setOpenExternalLinks(True)
         layout.addWidget(viewer)
 
         dialog.setLayout(layout)
-        dialog.resize(500, 400)
+        dialog.resize(*PREVIEW_SIZE)
         dialog.exec()
 
     def edit_clicked(self):
-        model = self.card_list.model()
-        selected_card_ids = []
-
-        for row in range(model.rowCount()):
-            checkbox_item = model.item(row, 0)  # type: ignore
-            if checkbox_item.checkState() == Qt.Checked:
-                card_id = checkbox_item.data(Qt.UserRole)
-                if card_id:
-                    selected_card_ids.append(row)
+        selected_card_ids = self.card_model.checked_ids
 
         if not selected_card_ids:
             QMessageBox.warning(self, "No Selection", "Please check a card to edit.")
@@ -316,19 +274,10 @@ class EditDeckWindow(QWidget):
             QMessageBox.information(self, "Multiple Selection", "Please select only one card to edit at a time.")
             return
 
-        row = selected_card_ids[0]
-
-        card_id_item = model.item(row, 0)  # type: ignore
-        card_id = card_id_item.data(Qt.UserRole)
-
-        front_item = model.item(row, 1)  # type: ignore
-        back_item = model.item(row, 2)   # type: ignore
-
-        front_html = front_item.data(Qt.UserRole + 1)
-        front_image = front_item.data(Qt.UserRole + 2)
-
-        back_html = back_item.data(Qt.UserRole + 1)
-        back_image = back_item.data(Qt.UserRole + 2)
+        card = self.database_manager.get_card(next(iter(selected_card_ids)))
+        if not card:
+            return
+        card_id, front_html, back_html, front_image, back_image = card
 
         editor = CardEditorWindow(
             self.deck_name,
@@ -340,5 +289,5 @@ class EditDeckWindow(QWidget):
             front_image=front_image,
             back_image=back_image
         )
-        editor.card_edited.connect(self.refresh_card_list)
+        editor.card_edited.connect(lambda: self.card_model.reload_card(card_id))
         editor.show()
@@ -0,0 +1,77 @@
+import os
+import uuid
+from PySide6.QtCore import Qt
+from PySide6.QtGui import QImageReader
+
+# ----| widths of the display copies kept for every card image, an image is shown from the smallest copy that is |---- #
+# ----| at least as wide as the space it gets, wider spaces fall back to the original |---- #
+THUMBNAIL_WIDTHS = (320, 800, 1600)
+THUMBNAIL_QUALITY = 90
+
+
+# ----| display size copies of the images in data/images, stored under data/images/.thumbs/<width>/ with the |---- #
+# ----| original's file name, made the first time a size is needed and made again once the original is newer |---- #
+# ----| plain Qt image classes and atomic renames only, so it is safe to use from the prefetch worker threads |---- #
+class ImageCache:
+    def __init__(self, image_folder_path, thumbnail_folder_path):
+        self.image_folder_path = image_folder_path
+        self.thumbnail_folder_path = thumbnail_folder_path
+
+    @staticmethod
+    def pick_width(max_width):
+        for width in THUMBNAIL_WIDTHS:
+            if width >= max_width:
+                return width
+        return None
+
+    # ----| path of the smallest stored copy of an image that fits max_width, the original when none is smaller |---- #
+    def display_path(self, image_filename, max_width):
+        original_path = os.path.join(self.image_folder_path, image_filename)
+        width = self.pick_width(max_width) if max_width > 0 else None
+        if width is None or not os.path.exists(original_path):
+            return original_path
+
+        thumbnail_path = os.path.join(self.thumbnail_folder_path, str(width), image_filename)
+        try:
+            if os.path.getmtime(thumbnail_path) >= os.path.getmtime(original_path):
+                return thumbnail_path
+        except OSError:
+            pass
+
+        return self.make_thumbnail(original_path, thumbnail_path, width)
+
+    def make_thumbnail(self, original_path, thumbnail_path, width):
+        reader = QImageReader(original_path)
+        size = reader.size()
+        # ----| an original that already fits is shown as is, there is nothing to save by copying it |---- #
+        if not size.isValid() or size.width() <= width:
+            return original_path
+
+        reader.setScaledSize(size.scaled(width, size.height(), Qt.KeepAspectRatio))
+        image = reader.read()
+        if image.isNull():
+            return original_path
+
+        # ----| written under a temporary name and renamed, so another thread never reads a half written file |---- #
+        os.makedirs(os.path.dirname(thumbnail_path), exist_ok=True)
+        name, ext = os.path.splitext(thumbnail_path)
+        temp_path = f"{name}.{uuid.uuid4().hex}.tmp{ext}"
+        try:
+            if not image.save(temp_path, None, THUMBNAIL_QUALITY):
+                return original_path
+            os.replace(temp_path, thumbnail_path)
+        except OSError as e:
+            print(f"Could not save thumbnail {thumbnail_path}: {e}")
+            return original_path
+        finally:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+        return thumbnail_path
+
+    # ----| decodes an image for display, from the smallest copy that fits and scaled down to max_width |---- #
+    def load(self, image_filename, max_width):
+        reader = QImageReader(self.display_path(image_filename, max_width))
+        size = reader.size()
+        if max_width > 0 and size.isValid() and size.width() > max_width:
+            reader.setScaledSize(size.scaled(max_width, size.height(), Qt.KeepAspectRatio))
+        return reader.read()
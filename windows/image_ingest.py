@@ -0,0 +1,134 @@
+import io
+import os
+from PySide6.QtCore import Qt, QObject, QRunnable, QThreadPool, QByteArray, QBuffer, QIODevice, Signal
+from PySide6.QtGui import QImage, QImageReader, QImageWriter, QImageIOHandler, QPainter, QColor
+from database_manager.image_store import store_image_file, store_image_stream
+
+# ----| a dropped image is only read at the size the editor shows it, the file itself is made card sized when |---- #
+# ----| the card is saved: decoded no larger than INGEST_MAX_DIMENSION on its longest side, encoded as |---- #
+# ----| INGEST_FORMAT at INGEST_QUALITY and stored by content (image_store.py), both on the thread pool |---- #
+INGEST_MAX_DIMENSION = 2048
+# ----| "jpg" or "webp", images with transparency go to png when the format can't keep it |---- #
+INGEST_FORMAT = "jpg"
+INGEST_QUALITY = 85
+FORMATS_WITH_ALPHA = ("png", "webp")
+SOURCE_FORMAT_NAMES = {"jpeg": "jpg", "jfif": "jpg"}
+PLACEHOLDER_SIZE = (240, 60)
+
+
+def placeholder_image(text="Loading image..."):
+    image = QImage(*PLACEHOLDER_SIZE, QImage.Format_RGB32)
+    image.fill(QColor("#3d3d3d"))
+    painter = QPainter(image)
+    painter.setPen(QColor("white"))
+    painter.drawText(image.rect(), Qt.AlignCenter, text)
+    painter.end()
+    return image
+
+
+def target_format(image, preferred_format):
+    writable = [bytes(name).decode() for name in QImageWriter.supportedImageFormats()]
+    image_format = preferred_format if preferred_format in writable else "jpg"
+    if image.hasAlphaChannel() and image_format not in FORMATS_WITH_ALPHA:
+        image_format = "png"
+    return image_format
+
+
+def encode_image(image, image_format, quality):
+    data = QByteArray()
+    buffer = QBuffer(data)
+    buffer.open(QIODevice.WriteOnly)
+    saved = image.save(buffer, image_format, quality)
+    buffer.close()
+    if not saved:
+        raise ValueError(f"Could not encode the image as {image_format}.")
+    return bytes(data)
+
+
+# ----| decodes an image straight to at most max_width wide, so only a bitmap that size is ever allocated |---- #
+def read_preview(source_path, max_width):
+    reader = QImageReader(source_path)
+    reader.setAutoTransform(True)
+    size = reader.size()
+    if size.isValid() and size.width() > max_width:
+        reader.setScaledSize(size.scaled(max_width, size.height(), Qt.KeepAspectRatio))
+    image = reader.read()
+    if image.isNull():
+        raise ValueError(f"Could not read {os.path.basename(source_path)}: {reader.errorString()}")
+    return image
+
+
+# ----| decodes, downscales, encodes and stores one image, returns the stored file name |---- #
+# ----| plain Qt image classes and file io only, so it runs on the thread pool |---- #
+def ingest_image(image_folder_path, source_path, max_dimension=INGEST_MAX_DIMENSION,
+                 preferred_format=INGEST_FORMAT, quality=INGEST_QUALITY):
+    reader = QImageReader(source_path)
+    # ----| phone photos are often stored sideways with an orientation tag, the stored copy is turned upright |---- #
+    reader.setAutoTransform(True)
+    source_format = bytes(reader.format()).decode().lower()
+    source_format = SOURCE_FORMAT_NAMES.get(source_format, source_format)
+    size = reader.size()
+
+    downscaled = size.isValid() and max(size.width(), size.height()) > max_dimension
+    if downscaled:
+        reader.setScaledSize(size.scaled(max_dimension, max_dimension, Qt.KeepAspectRatio))
+    image = reader.read()
+    if image.isNull():
+        raise ValueError(f"Could not read {os.path.basename(source_path)}: {reader.errorString()}")
+
+    image_format = target_format(image, preferred_format)
+    # ----| a file that is already small enough, upright and in the target format is kept byte for byte |---- #
+    if not downscaled and source_format == image_format \
+            and reader.transformation() == QImageIOHandler.TransformationNone:
+        return store_image_file(image_folder_path, source_path)
+
+    data = encode_image(image, image_format, quality)
+    return store_image_stream(image_folder_path, io.BytesIO(data), f"image.{image_format}")
+
+
+class ImageIngestSignals(QObject):
+    preview_ready = Signal(str, object)
+    finished = Signal(str, str)
+    failed = Signal(str, str)
+
+
+class ImagePreviewTask(QRunnable):
+    def __init__(self, token, source_path, max_width, signals):
+        super().__init__()
+        self.token = token
+        self.source_path = source_path
+        self.max_width = max_width
+        self.signals = signals
+
+    def run(self):
+        try:
+            image = read_preview(self.source_path, self.max_width)
+        except Exception as e:
+            self.signals.failed.emit(self.token, str(e))
+            return
+        self.signals.preview_ready.emit(self.token, image)
+
+
+class ImageIngestTask(QRunnable):
+    def __init__(self, token, image_folder_path, source_path, signals):
+        super().__init__()
+        self.token = token
+        self.image_folder_path = image_folder_path
+        self.source_path = source_path
+        self.signals = signals
+
+    def run(self):
+        try:
+            filename = ingest_image(self.image_folder_path, self.source_path)
+        except Exception as e:
+            self.signals.failed.emit(self.token, str(e))
+            return
+        self.signals.finished.emit(self.token, filename)
+
+
+def start_preview(token, source_path, max_width, signals):
+    QThreadPool.globalInstance().start(ImagePreviewTask(token, source_path, max_width, signals))
+
+
+def start_ingest(token, image_folder_path, source_path, signals):
+    QThreadPool.globalInstance().start(ImageIngestTask(token, image_folder_path, source_path, signals))
@@ -1,4 +1,5 @@
-from PySide6.QtWidgets import QPushButton,  QVBoxLayout, QHBoxLayout, QTableView, QLabel, QSizePolicy, QAbstractItemView
+from PySide6.QtWidgets import (QPushButton,  QVBoxLayout, QHBoxLayout, QTableView, QLabel, QSizePolicy, QAbstractItemView,
+                               QLineEdit)
 from PySide6.QtCore import Qt
 
 
@@ -8,6 +9,7 @@ def build_ui():
     label_layout = QHBoxLayout()
     button_layout = QHBoxLayout()
     deck_list_layout = QHBoxLayout()
+    search_layout = QHBoxLayout()
 
     # -------------------------|defining buttons|------------------------- #
     new_deck_button = QPushButton("New deck")
@@ -102,6 +104,13 @@ def build_ui():
     deck_list_label.setAlignment(Qt.AlignCenter)
     deck_list_label.setStyleSheet("color: white; background-color: #3d99f5; font-size: 25px;")
     label_layout.addWidget(deck_list_label)
+    # -------------------------|defining and adding search box to layout|------------------------- #
+    search_input = QLineEdit()
+    search_input.setPlaceholderText("Search all cards... (press Enter)")
+    search_input.setClearButtonEnabled(True)
+    search_input.setStyleSheet("font-size: 15px;")
+    search_layout.addWidget(search_input)
+
     # -------------------------|defining and adding list widget to layout|------------------------- #
 
     deck_list = QTableView()
@@ -112,6 +121,7 @@ def build_ui():
 
     # -------------------------|putting the layouts together and returning|------------------------- #
     master_layout.addLayout(label_layout)
+    master_layout.addLayout(search_layout)
     master_layout.addLayout(deck_list_layout)
     master_layout.addLayout(button_layout)
 
@@ -122,5 +132,6 @@ def build_ui():
         "edit_deck": edit_deck,
         "add_card": add_card_to_deck,
         "learn_deck": learn_deck,
-        "review": review_deck
+        "review": review_deck,
+        "search": search_input
     }
@@ -0,0 +1,14 @@
+from PySide6.QtCore import QTimer
+
+# ----| short pause after the last keystroke before searching, so typing a word runs one query |---- #
+SEARCH_DELAY_MS = 250
+
+
+# ----| calls search once the text of line_edit has stopped changing for SEARCH_DELAY_MS |---- #
+def make_search_timer(line_edit, search, parent):
+    timer = QTimer(parent)
+    timer.setSingleShot(True)
+    timer.setInterval(SEARCH_DELAY_MS)
+    timer.timeout.connect(search)
+    line_edit.textChanged.connect(timer.start)
+    return timer
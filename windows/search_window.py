@@ -0,0 +1,181 @@
+from PySide6.QtWidgets import (QWidget, QVBoxLayout, QLabel, QLineEdit, QTableView, QAbstractItemView, QHeaderView,
+                               QSizePolicy)
+from PySide6.QtCore import Qt, QAbstractTableModel, QModelIndex, Signal
+from windows.card_editor_window import CardEditorWindow
+from windows.card_table_model import side_text
+from windows.db_reader import DBReader
+from windows.search_timer import make_search_timer
+
+SEARCH_PAGE_SIZE = 100
+SEARCH_HEADERS = ["Deck", "Front", "Back"]
+
+
+# ----| search hits across every deck, newest first (see DBManager.search_cards), further pages are fetched as |---- #
+# ----| the list scrolls |---- #
+# ----| every page is searched on the reader's thread pool and added when it arrives, then page_loaded is emitted |---- #
+class SearchResultsModel(QAbstractTableModel):
+    page_loaded = Signal()
+
+    def __init__(self, database_manager, reader, query, parent=None):
+        super().__init__(parent)
+        self.database_manager = database_manager
+        self.reader = reader
+        self.query = query.strip()
+        # ----| each row is (card_id, deck_id, deck_name, front_text, back_text) |---- #
+        self.rows = []
+        self.exhausted = not self.query
+        self.loading = False
+        # ----| the message of a page that failed, no more pages are asked for until the search is run again |---- #
+        self.error = None
+        self.reader.finished.connect(self.add_page)
+        self.reader.failed.connect(self.page_failed)
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.rows)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(SEARCH_HEADERS)
+
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if role == Qt.DisplayRole and orientation == Qt.Horizontal:
+            return SEARCH_HEADERS[section]
+        return super().headerData(section, orientation, role)
+
+    def canFetchMore(self, parent=QModelIndex()):
+        return not parent.isValid() and not self.exhausted and not self.loading and not self.error
+
+    def fetchMore(self, parent=QModelIndex()):
+        if parent.isValid() or self.exhausted or self.loading or self.error:
+            return
+        self.loading = True
+        self.reader.submit(self, self.database_manager.search_cards, self.query, None, SEARCH_PAGE_SIZE, len(self.rows))
+
+    # ----| the reader is shared by the window's models, results of the ones it replaced are ignored |---- #
+    def add_page(self, key, hits):
+        if key is not self:
+            return
+        self.loading = False
+        if len(hits) < SEARCH_PAGE_SIZE:
+            self.exhausted = True
+        if hits:
+            self.insert_hits(hits)
+        self.page_loaded.emit()
+
+    def page_failed(self, key, message):
+        if key is not self:
+            return
+        self.loading = False
+        self.error = message
+        self.page_loaded.emit()
+
+    def insert_hits(self, hits):
+        first = len(self.rows)
+        self.beginInsertRows(QModelIndex(), first, first + len(hits) - 1)
+        for card_id, deck_id, deck_name, front_text, back_text, front_image, back_image, created in hits:
+            self.rows.append((
+                card_id, deck_id, deck_name, side_text(front_text, front_image), side_text(back_text, back_image)
+            ))
+        self.endInsertRows()
+
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        if role == Qt.DisplayRole:
+            return self.rows[index.row()][2 + index.column()]
+        if role == Qt.ToolTipRole:
+            return "Double click to edit the card"
+        return None
+
+    def flags(self, index):
+        return Qt.ItemIsEnabled | Qt.ItemIsSelectable
+
+    def hit_at(self, row):
+        return self.rows[row]
+
+
+class SearchWindow(QWidget):
+    def __init__(self, database_manager, query=""):
+        super().__init__()
+        self.database_manager = database_manager
+        self.reader = DBReader(database_manager, self)
+        self.results_model = None
+        self.editor = None
+        self.setWindowTitle("Search cards")
+        self.setMinimumSize(805, 550)
+        self.layout = QVBoxLayout()
+
+        # -------------------------|search box|------------------------- #
+        self.search_input = QLineEdit(query)
+        self.search_input.setPlaceholderText("Search all cards...")
+        self.search_input.setClearButtonEnabled(True)
+        self.search_input.setStyleSheet("font-size: 15px")
+        self.layout.addWidget(self.search_input)
+
+        self.result_label = QLabel()
+        self.result_label.setStyleSheet("font-size: 15px")
+        self.layout.addWidget(self.result_label)
+
+        # -------------------------|result list|------------------------- #
+        self.result_list = QTableView()
+        self.result_list.setSizePolicy(QSizePolicy.Expanding, QSizePolicy.Expanding)
+        self.result_list.setSelectionBehavior(QAbstractItemView.SelectRows)
+        self.result_list.setSelectionMode(QAbstractItemView.SingleSelection)
+        self.layout.addWidget(self.result_list, stretch=1)
+
+        self.setLayout(self.layout)
+
+        self.search_timer = make_search_timer(self.search_input, self.run_search, self)
+        self.search_input.returnPressed.connect(self.run_search)
+        self.result_list.doubleClicked.connect(self.edit_hit)
+
+        self.run_search()
+
+    def run_search(self):
+        # ----| Enter searches right away, the typing pause would only run the same search again |---- #
+        self.search_timer.stop()
+        old_model = self.results_model
+        self.results_model = SearchResultsModel(self.database_manager, self.reader, self.search_input.text(), self)
+        self.results_model.page_loaded.connect(self.update_result_label)
+        self.results_model.fetchMore()
+        self.result_list.setModel(self.results_model)
+        if old_model:
+            old_model.deleteLater()
+
+        header = self.result_list.horizontalHeader()
+        header.setSectionResizeMode(0, QHeaderView.ResizeToContents)
+        header.setSectionResizeMode(1, QHeaderView.Stretch)
+        header.setSectionResizeMode(2, QHeaderView.Stretch)
+        self.update_result_label()
+
+    def update_result_label(self):
+        if not self.results_model.query:
+            self.result_label.setText("Type to search the front and back of every card.")
+        elif self.results_model.error:
+            self.result_label.setText(f"Search failed: {self.results_model.error}. Press Enter to try again.")
+        elif self.results_model.loading and not self.results_model.rows:
+            self.result_label.setText("Searching...")
+        elif not self.results_model.rows:
+            self.result_label.setText("No matching cards.")
+        else:
+            more = "+" if self.results_model.canFetchMore() else ""
+            self.result_label.setText(f"{len(self.results_model.rows)}{more} matching card(s), newest first.")
+
+    def edit_hit(self, index):
+        card_id, deck_id, deck_name, front_text, back_text = self.results_model.hit_at(index.row())
+        card = self.database_manager.get_card(card_id)
+        if not card:
+            return
+        card_id, front_html, back_html, front_image, back_image = card
+
+        self.editor = CardEditorWindow(
+            deck_name,
+            deck_id,
+            self.database_manager,
+            card_id=card_id,
+            front_html=front_html,
+            back_html=back_html,
+            front_image=front_image,
+            back_image=back_image
+        )
+        self.editor.card_edited.connect(self.run_search)
+        self.editor.show()
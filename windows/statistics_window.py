@@ -0,0 +1,208 @@
+import math
+from PySide6.QtWidgets import QWidget, QVBoxLayout, QHBoxLayout, QLabel, QComboBox, QPushButton, QTabWidget
+from PySide6.QtCharts import (QChart, QChartView, QBarSet, QStackedBarSeries, QBarSeries, QHorizontalBarSeries,
+                              QLineSeries, QBarCategoryAxis, QValueAxis)
+from PySide6.QtGui import QPainter
+from PySide6.QtCore import Qt
+from database_manager.statistics import load_statistics
+from windows.db_reader import DBReader
+
+RANGES = [("Last 30 days", 30), ("Last 90 days", 90), ("Last year", 365), ("Last 2 years", 730)]
+
+
+def number_text(value, digits=1):
+    return "—" if value is None or math.isnan(value) else f"{value:.{digits}f}"
+
+
+# ----| reviews per day, retention, the coming workload and the time spent per deck, all read from the |---- #
+# ----| daily_stats rollup on the reader's thread pool (see database_manager/statistics.py), so the window |---- #
+# ----| opens straight away and the charts fill in when the numbers arrive |---- #
+class StatisticsWindow(QWidget):
+    def __init__(self, database_manager):
+        super().__init__()
+        self.database_manager = database_manager
+        self.setWindowTitle("Statistics")
+        self.setMinimumSize(900, 600)
+        self.layout = QVBoxLayout()
+
+        # ----| only the answer to the latest request is shown, older ones still running are ignored |---- #
+        self.reader = DBReader(database_manager, self)
+        self.reader.finished.connect(self.statistics_loaded)
+        self.reader.failed.connect(self.statistics_failed)
+        self.request = 0
+
+        # -------------------------|deck and period|------------------------- #
+        self.filter_layout = QHBoxLayout()
+        self.deck_combo = QComboBox()
+        self.range_combo = QComboBox()
+        for label, days in RANGES:
+            self.range_combo.addItem(label, days)
+        self.filter_layout.addWidget(QLabel("Deck:"))
+        self.filter_layout.addWidget(self.deck_combo, stretch=1)
+        self.filter_layout.addWidget(QLabel("Period:"))
+        self.filter_layout.addWidget(self.range_combo)
+        self.layout.addLayout(self.filter_layout)
+
+        self.summary_label = QLabel()
+        self.summary_label.setWordWrap(True)
+        self.layout.addWidget(self.summary_label)
+
+        # -------------------------|charts|------------------------- #
+        self.tabs = QTabWidget()
+        self.reviews_view = self.make_chart_view()
+        self.retention_view = self.make_chart_view()
+        self.forecast_view = self.make_chart_view()
+        self.deck_time_view = self.make_chart_view()
+        self.tabs.addTab(self.reviews_view, "Reviews")
+        self.tabs.addTab(self.retention_view, "Retention")
+        self.tabs.addTab(self.forecast_view, "Forecast")
+        self.tabs.addTab(self.deck_time_view, "Time per deck")
+        self.layout.addWidget(self.tabs, stretch=1)
+
+        self.button_layout = QHBoxLayout()
+        self.button_layout.addStretch()
+        self.close_button = QPushButton("Close")
+        self.button_layout.addWidget(self.close_button)
+        self.layout.addLayout(self.button_layout)
+
+        self.setLayout(self.layout)
+
+        self.fill_deck_combo()
+        self.deck_combo.currentIndexChanged.connect(self.refresh)
+        self.range_combo.currentIndexChanged.connect(self.refresh)
+        self.close_button.clicked.connect(self.close)
+
+    @staticmethod
+    def make_chart_view():
+        view = QChartView()
+        view.setRenderHint(QPainter.Antialiasing)
+        return view
+
+    # ----| keeps the chosen deck selected when the list of decks is read again |---- #
+    def fill_deck_combo(self):
+        deck_id = self.deck_combo.currentData()
+        self.deck_combo.blockSignals(True)
+        self.deck_combo.clear()
+        self.deck_combo.addItem("All decks", None)
+        for deck in self.database_manager.get_all_decks():
+            self.deck_combo.addItem(deck[1], deck[0])
+        index = self.deck_combo.findData(deck_id)
+        self.deck_combo.setCurrentIndex(max(index, 0))
+        self.deck_combo.blockSignals(False)
+
+    def refresh(self):
+        self.request += 1
+        self.summary_label.setText("Loading...")
+        self.reader.submit(self.request, load_statistics, self.database_manager,
+                           self.deck_combo.currentData(), self.range_combo.currentData())
+
+    def refresh_decks(self):
+        self.fill_deck_combo()
+        self.refresh()
+
+    def statistics_failed(self, request, message):
+        if request == self.request:
+            self.summary_label.setText(f"Could not load the statistics: {message}")
+
+    def statistics_loaded(self, request, statistics):
+        if request != self.request:
+            return
+
+        forecast = statistics["forecast"]
+        self.summary_label.setText(
+            f"{statistics['answers']} answer(s), {number_text(statistics['answers_per_day'])} per day, "
+            f"{number_text(statistics['overall_retention'])}% of reviews remembered, "
+            f"{number_text(statistics['minutes'])} minute(s) studied, "
+            f"{number_text(statistics['seconds_per_answer'])} s per answer. "
+            f"{forecast['overdue']} card(s) overdue."
+        )
+
+        period = "day" if statistics["bucket_size"] == 1 else f"{statistics['bucket_size']} days"
+        new_set = self.make_bar_set("New", statistics["new_answers"])
+        review_set = self.make_bar_set("Review", statistics["review_answers"])
+        self.set_bar_chart(self.reviews_view, QStackedBarSeries(), [new_set, review_set],
+                           statistics["labels"], f"Answers per {period}")
+
+        retention = QLineSeries()
+        retention.setName("Retention %")
+        for bucket, value in enumerate(statistics["retention"].tolist()):
+            if not math.isnan(value):
+                retention.append(bucket, value)
+        self.set_retention_chart(statistics["labels"], retention, period)
+
+        due_set = self.make_bar_set("Due", forecast["due"])
+        self.set_bar_chart(self.forecast_view, QBarSeries(), [due_set], forecast["labels"],
+                           "Cards due per day, overdue cards count for today")
+
+        deck_time = list(reversed(statistics["deck_time"]))
+        time_set = self.make_bar_set("Minutes", [minutes for _, minutes in deck_time])
+        self.set_bar_chart(self.deck_time_view, QHorizontalBarSeries(), [time_set],
+                           [name for name, _ in deck_time], "Minutes spent answering per deck")
+
+    @staticmethod
+    def make_bar_set(name, values):
+        bar_set = QBarSet(name)
+        bar_set.append([float(value) for value in values])
+        return bar_set
+
+    def set_bar_chart(self, view, series, bar_sets, labels, title):
+        for bar_set in bar_sets:
+            series.append(bar_set)
+        chart = QChart()
+        chart.setTitle(title)
+        chart.addSeries(series)
+
+        category_axis = QBarCategoryAxis()
+        category_axis.append(labels)
+        value_axis = QValueAxis()
+        value_axis.setLabelFormat("%d")
+        # ----| stacked bars reach as high as their sets added up |---- #
+        heights = [[bar_set.at(index) for index in range(bar_set.count())] for bar_set in bar_sets]
+        if isinstance(series, QStackedBarSeries):
+            heights = [[sum(column) for column in zip(*heights)]]
+        highest = max((height for row in heights for height in row), default=0)
+        value_axis.setRange(0, max(highest, 1))
+        value_axis.applyNiceNumbers()
+        # ----| many bars leave no room for a level date under each one |---- #
+        if len(labels) > 15 and not isinstance(series, QHorizontalBarSeries):
+            category_axis.setLabelsAngle(-90)
+
+        # ----| the categories run down the side for the horizontal chart |---- #
+        horizontal = isinstance(series, QHorizontalBarSeries)
+        chart.addAxis(category_axis, Qt.AlignLeft if horizontal else Qt.AlignBottom)
+        chart.addAxis(value_axis, Qt.AlignBottom if horizontal else Qt.AlignLeft)
+        series.attachAxis(category_axis)
+        series.attachAxis(value_axis)
+        chart.legend().setVisible(len(bar_sets) > 1)
+        self.set_chart(view, chart)
+
+    def set_retention_chart(self, labels, series, period):
+        chart = QChart()
+        chart.setTitle(f"Reviews remembered per {period}, in %, {labels[0]} to {labels[-1]}")
+        chart.addSeries(series)
+
+        # ----| the points sit on bucket numbers, the axis ticks show the first day of every bucket |---- #
+        bucket_axis = QValueAxis()
+        bucket_axis.setRange(0, max(len(labels) - 1, 1))
+        bucket_axis.setLabelsVisible(False)
+        percent_axis = QValueAxis()
+        percent_axis.setRange(0, 100)
+        percent_axis.setLabelFormat("%d")
+        chart.addAxis(bucket_axis, Qt.AlignBottom)
+        chart.addAxis(percent_axis, Qt.AlignLeft)
+        series.attachAxis(bucket_axis)
+        series.attachAxis(percent_axis)
+        chart.legend().setVisible(False)
+        self.set_chart(self.retention_view, chart)
+
+    # ----| the view does not own the chart it showed before, so it is deleted here |---- #
+    @staticmethod
+    def set_chart(view, chart):
+        old_chart = view.chart()
+        view.setChart(chart)
+        if old_chart is not None:
+            old_chart.deleteLater()
+
+    def showEvent(self, event):
+        super().showEvent(event)
+        self.refresh_decks()
@@ -1,27 +1,50 @@
-import os
+import time
 from collections import deque
 from PySide6.QtWidgets import (QWidget, QVBoxLayout, QLabel, QTextBrowser,
                                QPushButton, QHBoxLayout)
-from PySide6.QtCore import Qt, QUrl, Signal
+from PySide6.QtGui import QTextDocument
+from PySide6.QtCore import Qt, Signal, QTimer
+from database_manager import sm2
+from database_manager.db_manager import review_row
+from windows.card_prefetcher import CardPrefetcher
+from windows.image_cache import ImageCache
+
+
+# ----| an answer that took longer than this is logged with this time, the card was most likely left on screen |---- #
+MAX_ANSWER_MS = 60_000
 
 
 class StudyWindow(QWidget):
     # ---------------| Custom signal to update list in main window |--------------- #
-    card_stats_changed = Signal()
+    card_stats_changed = Signal(int)
 
-    def __init__(self, deck_name, deck_id, database_manager, mode, cards):
+    def __init__(self, deck_name, deck_id, database_manager, mode, cards, grade_writer=None):
         super().__init__()
         self.setWindowModality(Qt.ApplicationModal)
         self.deck_id = deck_id
         self.deck_name = deck_name
         self.database_manager = database_manager
+        self.grade_writer = grade_writer
         self.mode = mode
         self.cards = deque(cards)
         self.total_cards = len(self.cards)
         self.completed_count = 0
         self.showing_front = True
+        # ----| when the current card's front was first shown, for the answer time in the review log |---- #
+        self.card_shown_at = time.perf_counter()
         self.setMinimumSize(805, 550)
 
+        # ----| the next cards are prepared on worker threads while the current one is shown |---- #
+        self.image_cache = ImageCache(self.database_manager.image_folder_path,
+                                      self.database_manager.thumbnail_folder_path)
+        self.prefetcher = CardPrefetcher(self.image_cache, parent=self)
+
+        # ----| re-render the current side once a resize settles, so the image fits the new width |---- #
+        self.resize_timer = QTimer(self)
+        self.resize_timer.setSingleShot(True)
+        self.resize_timer.setInterval(150)
+        self.resize_timer.timeout.connect(self.redisplay_current_side)
+
         # ----|text modularity setup for learn/review |---- #
         if self.mode == "learn":
             self.setWindowTitle(f"Learning new cards")
@@ -107,8 +130,8 @@ class StudyWindow(QWidget):
     def show_card(self):
         if self.cards:
             card = self.cards[0]
-            front_html = self.patch_image_paths(card["front"], card.get("front_image"))
-            self.card_screen.setHtml(front_html)
+            self.display_side(card, "front")
+            self.card_shown_at = time.perf_counter()
             self.show_answer_button.setText("Show Answer")
             self.choice_widget.setEnabled(False)
             self.side_label.setText("Front")
@@ -131,7 +154,7 @@ class StudyWindow(QWidget):
     def flip_card(self):
         if self.cards:
             card = self.cards[0]
-            card_stats = self.database_manager.get_sm2_intervals(card["id"])
+            card_stats = sm2.preview_intervals(card)
             if card_stats:
                 for key in card_stats:
                     interval = int(card_stats[key])
@@ -146,16 +169,14 @@ class StudyWindow(QWidget):
                 self.easy_button.setText(f"Easy [{card_stats['easy_interval']}]")
 
             if self.showing_front:
-                back_html = self.patch_image_paths(card["back"], card.get("back_image"))
                 self.show_answer_button.setText("Show Question")
-                self.card_screen.setHtml(back_html)
+                self.display_side(card, "back")
                 self.choice_widget.setEnabled(True)
                 self.side_label.setText("Back")
                 self.set_card_background(False)
             else:
-                front_html = self.patch_image_paths(card["front"], card.get("front_image"))
                 self.show_answer_button.setText("Show Answer")
-                self.card_screen.setHtml(front_html)
+                self.display_side(card, "front")
                 self.choice_widget.setEnabled(False)
                 self.side_label.setText("Front")
                 self.set_card_background(True)
@@ -172,24 +193,36 @@ class StudyWindow(QWidget):
             if repeat:
                 self.cards.append(card)
             else:
-                self.database_manager.update_card_sm2(card["id"], grade=3, deck_id=self.deck_id)
+                self.save_grade(card, 3)
                 self.completed_count += 1
-                self.card_stats_changed.emit()
 
         elif self.mode == "review":
             if repeat:
                 self.cards.append(card)
-                self.database_manager.update_card_sm2(card["id"], grade=1, deck_id=self.deck_id)
-                self.card_stats_changed.emit()
+                self.save_grade(card, 1)
             else:
-                self.database_manager.update_card_sm2(card["id"], grade=grade, deck_id=self.deck_id)
+                self.save_grade(card, grade)
                 self.completed_count += 1
-                self.card_stats_changed.emit()
 
         self.set_card_background(True)
         self.update_progress_label()
         self.show_card()
 
+    # ----| the card is graded in memory and keeps its new state for when it comes round again, with a grade |---- #
+    # ----| writer the state is queued and written in the background and the main window hears about it from |---- #
+    # ----| the writer once it is on disk, otherwise it is written right away, either way together with its |---- #
+    # ----| review log row |---- #
+    def save_grade(self, card, grade):
+        answer_ms = min(int((time.perf_counter() - self.card_shown_at) * 1000), MAX_ANSWER_MS)
+        state = sm2.next_state(card, grade)
+        review = review_row(card["id"], self.deck_id, card, state, grade, answer_ms)
+        card.update(state)
+        if self.grade_writer:
+            self.grade_writer.submit(card["id"], state, self.deck_id, review)
+        else:
+            self.database_manager.save_card_states([(card["id"], state)], [review])
+            self.card_stats_changed.emit(self.deck_id)
+
     def update_progress_label(self):
         if self.mode == "learn":
             self.remaining_label.setText(
@@ -199,7 +232,7 @@ class StudyWindow(QWidget):
                 f"{self.completed_count}/{self.total_cards} cards reviewed")
 
     def close_clicked(self):
-        self.card_stats_changed.emit()
+        self.card_stats_changed.emit(self.deck_id)
         self.set_card_background(True)
         self.close()
 
@@ -209,15 +242,29 @@ class StudyWindow(QWidget):
         else:
             self.card_screen.setStyleSheet("background-color: #3B3B3B;")
 
-    # --------| method that fixes the html images to correctly show|------------- #
-    def patch_image_paths(self, html, image_filename):
-        if not html:
-            return ""
-        if image_filename:
-            image_path = os.path.join(self.database_manager.image_folder_path, image_filename)
-            if os.path.exists(image_path):
-                image_url = QUrl.fromLocalFile(image_path).toString()
-                html = html.replace(image_filename, image_url)
-            else:
-                html += f"<p><i>Image file '{image_filename}' not found</i></p>"
-        return html
+    # --------| shows a prepared card side, its image goes in as an already decoded document resource|------------- #
+    def display_side(self, card, side):
+        max_width = self.image_width()
+        html, image_url, image = self.prefetcher.get(card, side, max_width)
+
+        # ----| clearing the document also drops the previous card's image resource |---- #
+        self.card_screen.clear()
+        if image is not None:
+            self.card_screen.document().addResource(QTextDocument.ImageResource, image_url, image)
+        self.card_screen.setHtml(html)
+
+        self.prefetcher.prefetch(self.cards, max_width)
+
+    def image_width(self):
+        margin = int(self.card_screen.document().documentMargin()) * 2
+        # ----| before the window is first shown the viewport has no real size yet |---- #
+        width = self.card_screen.viewport().width() if self.isVisible() else self.minimumWidth()
+        return max(width - margin, 1)
+
+    def redisplay_current_side(self):
+        if self.cards:
+            self.display_side(self.cards[0], "front" if self.showing_front else "back")
+
+    def resizeEvent(self, event):
+        super().resizeEvent(event)
+        self.resize_timer.start()